@@ -6,7 +6,8 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('assets/icon.ico', 'assets')],
-    hiddenimports=[],
+    # NumPy is imported lazily by tolerances.py (Monte Carlo stack-up)
+    hiddenimports=['numpy'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -16,19 +17,19 @@ a = Analysis(
 )
 pyz = PYZ(a.pure)
 
+# One-folder build: a onefile exe unpacks itself to a temp dir on every
+# launch, which dominated cold start. UPX is off for the same reason (every
+# compressed Qt DLL has to be inflated at load time).
 exe = EXE(
     pyz,
     a.scripts,
-    a.binaries,
-    a.datas,
     [],
+    exclude_binaries=True,
     name='SWEquationsEditor',
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
+    upx=False,
     console=False,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -37,3 +38,12 @@ exe = EXE(
     entitlements_file=None,
     icon=['assets\\icon.ico'],
 )
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='SWEquationsEditor',
+)
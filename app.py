@@ -1,15 +1,32 @@
 import sys
 from pathlib import Path
 
-from PyQt6.QtGui import QIcon
-from PyQt6.QtWidgets import QApplication
-from main_window import MainWindow
-
 
 def main():
-    app = QApplication(sys.argv)
-    
-    # Handle command line arguments
+    # Batch exports run in worker processes; a frozen build must not start
+    # the editor again in each of them
+    import multiprocessing
+    multiprocessing.freeze_support()
+
+    # --profile[=SECONDS] records from startup on, loading the file included
+    profile_seconds = None
+    for arg in sys.argv[1:]:
+        if arg == '--profile' or arg.startswith('--profile='):
+            sys.argv.remove(arg)
+            import profiling
+            try:
+                profile_seconds = float(arg.partition('=')[2] or profiling.DEFAULT_SECONDS)
+            except ValueError:
+                print(f"Warning: Not a number of seconds: {arg}")
+            break
+
+    # Arguments are handled before Qt is imported so the window can come up
+    # as soon as possible; heavy modules load only once they are needed
+    if len(sys.argv) > 1:
+        import cli
+        if sys.argv[1] in cli.commands():
+            sys.exit(cli.main(sys.argv[1:]))
+
     start_path = None
     if len(sys.argv) > 1:
         try:
@@ -23,9 +40,20 @@ def main():
         except Exception as e:
             print(f"Warning: Could not parse file path: {e}")
             start_path = None
-    
+
+    session = None
+    if profile_seconds is not None:
+        session = profiling.ProfileSession()
+        session.start()
+
+    from PyQt6.QtWidgets import QApplication
+    app = QApplication(sys.argv)
+
+    from main_window import MainWindow
     win = MainWindow(start_path)
     win.show()
+    if session is not None:
+        win.start_profiling(profile_seconds, Path.cwd() / profiling.default_bundle_name(), session)
     sys.exit(app.exec())
 
 
@@ -0,0 +1,263 @@
+"""Offscreen GUI performance regression harness.
+
+Runs MainWindow under QT_QPA_PLATFORM=offscreen on a generated equation
+file and scripts the interactions that stress the view layer: scrolling
+(HighlightingDelegate.paint), typing a filter and switching sections
+(setRowHidden passes), editing and saving. Each scenario step is timed
+together with a synchronous repaint of the table ("frame"). A 5 ms probe
+timer keeps the event loop busy; the longest gap between any two of its
+callbacks is the latency, which also catches work arriving from the
+background linter. Peak memory is the child process's maximum resident
+set size.
+
+Medians over --runs fresh processes are compared with the stored
+baseline (gui_baseline.json next to this script). The script exits with
+status 1 when a metric regresses by more than --tolerance. Refresh the
+baseline on the machine that runs the check:
+
+    python benchmarks/gui_bench.py [--rows 20000] [--runs 3] [--update-baseline]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE = Path(__file__).resolve().with_name('gui_baseline.json')
+
+SECTIONS = 20
+PROBE_MS = 5
+# Allowed regression on top of --tolerance, so tiny timings don't flap
+SLACK = {'ms': 5.0, 'mb': 20.0}
+
+
+def generate(path, count):
+    """Layered equation set spread over SECTIONS sections"""
+    rng = random.Random(1)
+    lines = []
+    sections = {f'Group {s}': [] for s in range(SECTIONS)}
+    for i in range(count):
+        if i < 50 or rng.random() < 0.05:
+            lines.append(f'"v{i}"= {rng.randint(1, 100)}mm')
+        else:
+            a, b = rng.randrange(i), rng.randrange(i)
+            lines.append(f'"v{i}"= "v{a}" + sin("v{b}") * 2')
+        sections[f'Group {i * SECTIONS // count}'].append(f'v{i}')
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    sections['Unassigned'] = []
+    cfg = {'sections': sections, 'comments': {}, 'locked': False}
+    path.with_suffix('.cfg').write_text(json.dumps(cfg), encoding='utf-8')
+
+
+def peak_memory_mb():
+    try:
+        import resource
+    except ImportError:
+        return None  # Windows
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+# ------------ Child: one scripted session ------------
+def scenarios(win, lint_done):
+    """Generators of steps; each yields after a step so the event loop runs.
+    A step yields the frame time in ms, or None while waiting."""
+    from PyQt6.QtCore import Qt
+
+    def frame(action):
+        t = time.perf_counter()
+        action()
+        win.view.viewport().repaint()
+        return (time.perf_counter() - t) * 1000
+
+    def settle():
+        # Until the background linter delivers its result for the last edit
+        deadline = time.perf_counter() + 10
+        while not lint_done() and time.perf_counter() < deadline:
+            yield None
+
+    def scroll():
+        bar = win.view.verticalScrollBar()
+        for _ in range(40):
+            yield frame(lambda: bar.setValue(bar.value() + bar.pageStep()))
+        yield frame(lambda: bar.setValue(0))
+
+    def filtering():
+        for text in ('v', 'v1', 'v12', 'v123', 'v12', 'v1', 'v', ''):
+            yield frame(lambda: win.filter_edit.setText(text))
+
+    def sections():
+        for s in (0, 5, 10, 15, 19):
+            yield frame(lambda: win._select_section(f'Group {s}'))
+        yield frame(lambda: win._select_section(None))
+
+    def editing():
+        model = win.model
+        rows = model.rowCount()
+        for i in range(10):
+            row = (i * 7919) % rows
+            yield frame(lambda: model.setData(model.index(row, 1), f'{i + 1}mm', Qt.ItemDataRole.EditRole))
+        yield from settle()
+
+    def saving():
+        for _ in range(3):
+            yield frame(win.save_file)
+
+    return {'scroll': scroll, 'filter': filtering, 'sections': sections, 'edit': editing, 'save': saving}
+
+
+def child(path):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    sys.path.insert(0, str(ROOT))
+    from PyQt6.QtCore import Qt, QTimer
+    from PyQt6.QtWidgets import QApplication
+    app = QApplication(sys.argv[:1])
+    import main_window
+
+    results = {}
+    lint_runs = [0]
+    probe = {'last': None, 'gaps': []}
+
+    def tick():
+        # Called from every event loop callback, probe timer and driver steps alike
+        now = time.perf_counter()
+        if probe['last'] is not None:
+            probe['gaps'].append((now - probe['last']) * 1000)
+        probe['last'] = now
+
+    timer = QTimer()
+    timer.setTimerType(Qt.TimerType.PreciseTimer)
+    timer.timeout.connect(tick)
+
+    t0 = time.perf_counter()
+    win = main_window.MainWindow(Path(path))
+    win.resize(1400, 900)
+    win.show()
+    win.lint.updated.connect(lambda: lint_runs.__setitem__(0, lint_runs[0] + 1))
+    timer.start(PROBE_MS)
+
+    def run():
+        # Loaded: rows in the model and the first lint pass applied
+        while win.model is None or not win.model.rowCount() or not lint_runs[0]:
+            yield
+        results['load'] = {'total_ms': (time.perf_counter() - t0) * 1000}
+        seen = lint_runs[0]
+        for name, steps in scenarios(win, lambda: lint_runs[0] > seen).items():
+            probe['gaps'].clear()
+            probe['last'] = time.perf_counter()
+            frames = []
+            start = time.perf_counter()
+            for ms in steps():
+                if ms is not None:
+                    frames.append(ms)
+                yield
+            results[name] = {
+                'total_ms': (time.perf_counter() - start) * 1000,
+                'frame_p50_ms': statistics.median(frames),
+                'frame_max_ms': max(frames),
+                'latency_max_ms': max(probe['gaps'], default=0.0),
+            }
+            seen = lint_runs[0]
+        results['memory'] = {'peak_mb': peak_memory_mb()}
+
+    driver = run()
+
+    def step():
+        tick()
+        try:
+            next(driver)
+        except StopIteration:
+            timer.stop()
+            print(json.dumps(results))
+            win.close()
+            app.quit()
+            return
+        QTimer.singleShot(0, step)
+
+    QTimer.singleShot(0, step)
+    app.exec()
+
+
+# ------------ Parent: runs, baseline, verdict ------------
+def run_once(path):
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    out = subprocess.run([sys.executable, __file__, '--child', str(path)],
+                         env=env, capture_output=True, text=True, check=True, timeout=600)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def medians(runs):
+    merged = {}
+    for scenario in runs[0]:
+        merged[scenario] = {}
+        for metric in runs[0][scenario]:
+            values = [r[scenario][metric] for r in runs if r[scenario][metric] is not None]
+            merged[scenario][metric] = statistics.median(values) if values else None
+    return merged
+
+
+def compare(results, baseline, tolerance):
+    """Lines of the report and whether anything regressed"""
+    lines = []
+    failed = False
+    for scenario, metrics in results.items():
+        for metric, value in metrics.items():
+            base = baseline.get(scenario, {}).get(metric)
+            shown = '-' if value is None else f'{value:.1f}'
+            if value is None or base is None:
+                lines.append(f'{scenario:>9} {metric:<15} {shown:>10}')
+                continue
+            limit = base * (1 + tolerance) + SLACK[metric.rsplit('_', 1)[-1]]
+            status = 'ok' if value <= limit else 'REGRESSED'
+            failed |= value > limit
+            lines.append(f'{scenario:>9} {metric:<15} {shown:>10}  (baseline {base:.1f}, limit {limit:.1f})  {status}')
+    return lines, failed
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--rows', type=int, default=20000)
+    ap.add_argument('--runs', type=int, default=3)
+    ap.add_argument('--tolerance', type=float, default=0.5, help='allowed relative regression (0.5 = 50%%)')
+    ap.add_argument('--baseline', type=Path, default=BASELINE)
+    ap.add_argument('--update-baseline', action='store_true')
+    ap.add_argument('--child', help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    if args.child:
+        child(args.child)
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'gui_bench.txt'
+        generate(path, args.rows)
+        runs = [run_once(path) for _ in range(args.runs)]
+    results = medians(runs)
+
+    stored = json.loads(args.baseline.read_text(encoding='utf-8')) if args.baseline.exists() else {}
+    if args.update_baseline:
+        rounded = {s: {m: v if v is None else round(v, 1) for m, v in metrics.items()}
+                   for s, metrics in results.items()}
+        args.baseline.write_text(json.dumps({'rows': args.rows, 'scenarios': rounded}, indent=2) + '\n',
+                                 encoding='utf-8')
+        print(f'Baseline written to {args.baseline}')
+        stored = {}
+    elif stored and stored.get('rows') != args.rows:
+        print(f'Baseline was recorded with --rows {stored.get("rows")}; not comparing')
+        stored = {}
+
+    lines, failed = compare(results, stored.get('scenarios', {}), args.tolerance)
+    print('\n'.join(lines))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
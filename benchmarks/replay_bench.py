@@ -0,0 +1,118 @@
+"""Replays a profile bundle from Help > Record Performance Profile.
+
+A bundle carries the shape of the reporter's file but none of its content.
+This script generates a synthetic file with the same row count, section
+sizes, per-row expression lengths and reference fan-out, then runs the
+scripted GUI scenarios of gui_bench.py on it in fresh processes. That way
+a slowness report can be reproduced, and a fix checked, without the
+reporter's data. The bundle's recorded hot spots are printed alongside.
+
+With --baseline the medians are compared with a stored replay of the same
+bundle, and the script exits with status 1 on a regression:
+
+    python benchmarks/replay_bench.py profile.zip [--runs 3] [--baseline replay.json [--update-baseline]]
+"""
+import argparse
+import io
+import json
+import pstats
+import random
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import gui_bench  # noqa: E402
+from profiling import read_manifest  # noqa: E402
+
+HOT_SPOTS = 15
+PAD = ' + 0'
+
+
+def expression(i, length, fan_out, rng):
+    refs = rng.sample(range(i), min(fan_out, i)) if i else []
+    expr = ' + '.join(f'"v{j}"' for j in refs) or f'{rng.randint(1, 100)}mm'
+    while len(expr) + len(PAD) <= length:
+        expr += PAD
+    return expr
+
+
+def generate(path, stats, seed=1):
+    """Equation file and cfg of the shape stats describes; names are v0, v1, ...
+    and sections Group 0, Group 1, ... in decreasing size, as gui_bench expects"""
+    rng = random.Random(seed)
+    count = stats['rows']
+    lines = [f'"v{i}"= {expression(i, length, fan_out, rng)}'
+             for i, (length, fan_out) in enumerate(zip(stats['expression_lengths'], stats['fan_out']))]
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    sections = {}
+    start = 0
+    for s, size in enumerate(stats['section_sizes']):
+        sections[f'Group {s}'] = [f'v{i}' for i in range(start, min(start + size, count))]
+        start += size
+    sections.setdefault('Unassigned', [])
+    cfg = {'sections': sections, 'comments': {}, 'locked': False}
+    path.with_suffix('.cfg').write_text(json.dumps(cfg), encoding='utf-8')
+
+
+def hot_spots(bundle):
+    """The recorded profile's functions with the most time of their own"""
+    with zipfile.ZipFile(bundle) as z:
+        raw = z.read('cpu.prof')
+    with tempfile.TemporaryDirectory() as tmp:
+        prof = Path(tmp) / 'cpu.prof'
+        prof.write_bytes(raw)
+        out = io.StringIO()
+        pstats.Stats(str(prof), stream=out).sort_stats('tottime').print_stats(HOT_SPOTS)
+    return out.getvalue()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('bundle', type=Path)
+    ap.add_argument('--runs', type=int, default=3)
+    ap.add_argument('--tolerance', type=float, default=0.5, help='allowed relative regression (0.5 = 50%%)')
+    ap.add_argument('--baseline', type=Path, help='stored replay of this bundle to compare with')
+    ap.add_argument('--update-baseline', action='store_true')
+    args = ap.parse_args(argv)
+
+    manifest = read_manifest(args.bundle)
+    stats = manifest['stats']
+    print(f'Bundle recorded {manifest["created"]} over {manifest["duration_s"]:.1f} s on {manifest["platform"]}, '
+          f'Python {manifest["python"]}; peak traced memory {manifest["peak_traced_mb"]} MB')
+    print(f'File: {stats["rows"]} rows, {stats["sections"]} sections, '
+          f'{sum(stats["fan_out"])} references, max fan-in {stats["max_fan_in"]}')
+    print(hot_spots(args.bundle))
+    if not stats['rows']:
+        print('No file was open while recording; nothing to replay')
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'replay.txt'
+        generate(path, stats)
+        runs = [gui_bench.run_once(path) for _ in range(args.runs)]
+    results = gui_bench.medians(runs)
+
+    stored = {}
+    if args.baseline and args.update_baseline:
+        rounded = {s: {m: v if v is None else round(v, 1) for m, v in metrics.items()}
+                   for s, metrics in results.items()}
+        args.baseline.write_text(json.dumps({'bundle': manifest['created'], 'scenarios': rounded}, indent=2) + '\n',
+                                 encoding='utf-8')
+        print(f'Baseline written to {args.baseline}')
+    elif args.baseline and args.baseline.exists():
+        stored = json.loads(args.baseline.read_text(encoding='utf-8'))
+        if stored.get('bundle') != manifest['created']:
+            print('Baseline was recorded from another bundle; not comparing')
+            stored = {}
+
+    lines, failed = gui_bench.compare(results, stored.get('scenarios', {}), args.tolerance)
+    print('\n'.join(lines))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""Load test for the JSON-RPC evaluation service.
+
+Starts ``app.py serve`` on a free port. Several client connections then
+pipeline a mix of evaluate, dependents and sweep requests against one
+equations file, in windows of --depth requests. The script reports
+throughput and latency percentiles and compares them with budgets. It
+exits with status 1 when a budget is missed.
+
+    python benchmarks/service_bench.py [--file equations.txt | --generate 100000]
+                                       [--clients 8] [--requests 200] [--depth 16]
+"""
+import argparse
+import json
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+BUDGETS = {
+    'p50': 0.050,   # seconds from a window being sent to the answer
+    'p99': 0.500,
+    'min_rps': 200,  # requests per second over all clients
+}
+
+
+def generate(path, count):
+    """Layered equation set: inputs, then rows referencing earlier rows"""
+    rng = random.Random(1)
+    lines = []
+    for i in range(count):
+        if i < 50 or rng.random() < 0.05:
+            lines.append(f'"v{i}"= {rng.randint(1, 100)}mm')
+        else:
+            a, b = rng.randrange(i), rng.randrange(i)
+            lines.append(f'"v{i}"= "v{a}" + "v{b}" / 2')
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+
+def names_of(path):
+    sys.path.insert(0, str(ROOT))
+    from parsing import parse_equations
+    return [e['name'] for e in parse_equations(path.read_text(encoding='utf-8'))]
+
+
+def make_requests(path, names, count, rng):
+    requests = []
+    for i in range(count):
+        kind = rng.random()
+        if kind < 0.6:
+            method, params = 'evaluate', {'path': str(path), 'names': rng.sample(names, min(10, len(names)))}
+        elif kind < 0.9:
+            method, params = 'dependents', {'path': str(path), 'names': [rng.choice(names)], 'transitive': False}
+        else:
+            method, params = 'sweep', {'path': str(path), 'input': rng.choice(names),
+                                       'values': [float(v) for v in range(1, 11)],
+                                       'outputs': rng.sample(names, min(3, len(names)))}
+        requests.append({'jsonrpc': '2.0', 'id': i, 'method': method, 'params': params})
+    return requests
+
+
+def client(port, requests, depth, latencies, errors):
+    with socket.create_connection(('127.0.0.1', port), timeout=120) as sock:
+        f = sock.makefile('rwb')
+        for start in range(0, len(requests), depth):
+            window = requests[start:start + depth]
+            for r in window:
+                f.write(json.dumps(r).encode('utf-8') + b'\n')
+            f.flush()
+            sent = time.perf_counter()
+            for _ in window:
+                response = json.loads(f.readline())
+                latencies.append(time.perf_counter() - sent)
+                if 'error' in response:
+                    errors.append(response['error'])
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--file', type=Path, default=ROOT / 'example' / 'equations.txt')
+    ap.add_argument('--generate', type=int, metavar='N', help='use a generated file of N equations')
+    ap.add_argument('--clients', type=int, default=8)
+    ap.add_argument('--requests', type=int, default=200, help='per client')
+    ap.add_argument('--depth', type=int, default=16, help='requests in flight per client')
+    for key, budget in BUDGETS.items():
+        ap.add_argument(f'--{key.replace("_", "-")}-budget', type=float, default=budget)
+    args = ap.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'equations.txt'
+        if args.generate:
+            generate(path, args.generate)
+        else:
+            path.write_bytes(args.file.read_bytes())
+        names = names_of(path)
+
+        server = subprocess.Popen([sys.executable, str(ROOT / 'app.py'), 'serve', '--port', '0', str(path)],
+                                  stdout=subprocess.PIPE, text=True)
+        try:
+            line = server.stdout.readline()
+            if not line.startswith('listening on '):
+                print('server did not start', file=sys.stderr)
+                return 1
+            port = int(line.rsplit(':', 1)[1])
+
+            rng = random.Random(2)
+            work = [make_requests(path, names, args.requests, rng) for _ in range(args.clients)]
+            latencies, errors = [], []
+            threads = [threading.Thread(target=client, args=(port, w, args.depth, latencies, errors))
+                       for w in work]
+            start = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            elapsed = time.perf_counter() - start
+        finally:
+            server.terminate()
+            server.wait()
+
+    total = args.clients * args.requests
+    latencies.sort()
+    results = {
+        'p50': statistics.median(latencies),
+        'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        'min_rps': total / elapsed,
+    }
+    print(f'{len(names)} equations, {args.clients} clients x {args.requests} requests, depth {args.depth}: '
+          f'{elapsed:.2f} s, {len(errors)} error(s)')
+    failed = bool(errors)
+    for key, value in results.items():
+        budget = getattr(args, f'{key}_budget')
+        over = value < budget if key == 'min_rps' else value > budget
+        failed |= over
+        shown = f'{value:8.0f} req/s' if key == 'min_rps' else f'{value * 1000:8.1f} ms'
+        limit = f'{budget:.0f} req/s' if key == 'min_rps' else f'{budget * 1000:.0f} ms'
+        print(f'{key:>7}: {shown}  (budget {limit})  {"OVER BUDGET" if over else "ok"}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""Cold-start benchmark for the editor.
+
+Launches fresh interpreters that import the app, build MainWindow and wait
+until the window is shown and the file's rows are in the model. Medians
+over several runs are compared against time budgets; the script exits with
+status 1 when any budget is exceeded, so it can gate CI.
+
+    python benchmarks/startup_bench.py [--file equations.txt] [--runs 5]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Seconds, measured from process launch
+BUDGETS = {
+    'import': 0.6,   # main_window imported
+    'shown': 1.5,    # window shown and first events processed
+    'loaded': 2.5,   # rows of the file available in the model
+}
+# Wall-clock time the parent spawned the child; marks are measured from it
+LAUNCH_ENV = 'SW_STARTUP_BENCH_LAUNCH'
+
+
+def child(path):
+    t0 = float(os.environ[LAUNCH_ENV])
+    sys.path.insert(0, str(ROOT))
+    from PyQt6.QtCore import QTimer
+    from PyQt6.QtWidgets import QApplication
+    app = QApplication(sys.argv[:1])
+    import main_window
+    marks = {'import': time.time() - t0}
+    win = main_window.MainWindow(Path(path))
+    win.show()
+    app.processEvents()
+    marks['shown'] = time.time() - t0
+
+    def poll():
+        if win.model is not None and win.model.rowCount():
+            marks['loaded'] = time.time() - t0
+            print(json.dumps(marks))
+            win.close()
+            app.quit()
+        else:
+            QTimer.singleShot(1, poll)
+
+    QTimer.singleShot(0, poll)
+    app.exec()
+
+
+def run_once(path):
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    # Interpreter start-up counts too, so the clock starts before the spawn;
+    # shutdown after the last mark does not
+    env[LAUNCH_ENV] = repr(time.time())
+    out = subprocess.run(
+        [sys.executable, __file__, '--child', str(path)],
+        env=env, capture_output=True, text=True, check=True, timeout=120
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--file', type=Path, default=ROOT / 'example' / 'equations.txt')
+    ap.add_argument('--runs', type=int, default=5)
+    ap.add_argument('--child', help=argparse.SUPPRESS)
+    for key, budget in BUDGETS.items():
+        ap.add_argument(f'--{key}-budget', type=float, default=budget)
+    args = ap.parse_args(argv)
+
+    if args.child:
+        child(args.child)
+        return 0
+
+    # Work on a copy: loading rewrites the cfg sidecar
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / args.file.name
+        shutil.copy(args.file, path)
+        cfg = args.file.with_suffix('.cfg')
+        if cfg.exists():
+            shutil.copy(cfg, path.with_suffix('.cfg'))
+        run_once(path)  # warm the OS file cache
+        runs = [run_once(path) for _ in range(args.runs)]
+
+    failed = False
+    for key in BUDGETS:
+        median = statistics.median(r[key] for r in runs)
+        budget = getattr(args, f'{key}_budget')
+        status = 'ok' if median <= budget else 'OVER BUDGET'
+        failed |= median > budget
+        print(f'{key:>7}: {median * 1000:8.1f} ms  (budget {budget * 1000:.0f} ms)  {status}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
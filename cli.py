@@ -0,0 +1,268 @@
+"""Headless commands, run as ``python app.py <command> ...``.
+
+Command implementations import their modules lazily so that nothing here
+pulls in Qt.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+
+def cmd_search(args):
+    from search_index import SearchIndex
+    index = SearchIndex(args.index) if args.index else SearchIndex.for_root(args.root)
+    try:
+        if not args.no_update:
+            index.update_directory(args.root)
+        for hit in index.search(args.query, limit=args.limit):
+            try:
+                where = hit['path'].relative_to(args.root.resolve())
+            except ValueError:
+                where = hit['path']
+            comment = f"  # {hit['comment']}" if hit['comment'] else ''
+            print(f"{where}:{hit['row'] + 1}: \"{hit['name']}\"= {hit['expr']}{comment}")
+    finally:
+        index.close()
+    return 0
+
+
+def cmd_merge_driver(args):
+    """git merge driver: merges into the ours file, exits 1 on conflicts"""
+    import merge
+    from config_io import load_cfg, save_cfg
+    path = args.path or args.ours
+    if path.suffix.lower() == '.cfg':
+        merged, conflicts = merge.merge_cfg(load_cfg(args.base), load_cfg(args.ours), load_cfg(args.theirs))
+        save_cfg(args.ours, merged)
+    else:
+        texts = [p.read_text(encoding='utf-8') for p in (args.base, args.ours, args.theirs)]
+        text, conflicts = merge.merge_texts(*texts)
+        args.ours.write_text(text, encoding='utf-8')
+    for c in conflicts:
+        print(f'{path}: {merge.describe(c)}', file=sys.stderr)
+    return 1 if conflicts else 0
+
+
+def cmd_normalize(args):
+    """Rewrite expressions into canonical form; --check only reports"""
+    from expressions import normalize_expression
+    from parsing import LINE_RE
+    changed = []
+    for path in args.files:
+        lines = path.read_text(encoding='utf-8').splitlines()
+        out = []
+        for line in lines:
+            m = LINE_RE.match(line)
+            if m:
+                line = f"\"{m.group('var')}\"= {normalize_expression(m.group('expr'))}"
+            out.append(line)
+        if out != lines:
+            changed.append(path)
+            if not args.check:
+                path.write_text('\n'.join(out) + '\n', encoding='utf-8')
+    for path in changed:
+        print(f'{"would normalize" if args.check else "normalized"} {path}')
+    return 1 if args.check and changed else 0
+
+
+def _equation_rows(path):
+    from parsing import iter_equations
+    with open(path, encoding='utf-8') as f:
+        for e in iter_equations(f):
+            yield e['name'], e['expr']
+
+
+def cmd_export(args):
+    """Stream an equations file out as CSV, JSON Lines or a design table"""
+    import interchange
+    from config_io import cfg_path_for, load_cfg
+    fields = tuple(args.fields.split(',')) if args.fields else interchange.FIELDS
+    fmt = args.format or interchange.format_for(args.output)
+    cfg = load_cfg(cfg_path_for(args.file))
+    values = None
+    if 'value' in fields:
+        # Values need the whole reference graph; everything else streams
+        from evaluation import evaluate
+        values, _ = evaluate(_equation_rows(args.file))
+
+    def make_records():
+        return interchange.records(_equation_rows(args.file), cfg, values)
+
+    try:
+        count = interchange.export(args.output, fmt, make_records, fields)
+    except interchange.InterchangeError as e:
+        print(f'{args.output}: {e}', file=sys.stderr)
+        return 1
+    print(f'exported {count} equation(s) to {args.output}')
+    return 0
+
+
+def cmd_import(args):
+    """Add or update equations from CSV, JSON Lines or a design table.
+
+    A new equations file is written as records stream in; an existing one is
+    loaded, updated by name and rewritten. Sections and comments go to the
+    .cfg sidecar.
+    """
+    import interchange
+    from config_io import cfg_path_for, load_cfg, reconcile_cfg_with_txt, save_cfg
+    from parsing import parse_equations, serialize_equations
+    records = interchange.read(args.source, args.format)
+    cfgp = cfg_path_for(args.file)
+    cfg = load_cfg(cfgp)
+    section_of = {n: sec for sec, names in cfg['sections'].items() for n in names}
+    comments = cfg['comments']
+    added = updated = 0
+
+    def note(rec):
+        if rec.get('section'):
+            section_of[rec['name']] = rec['section']
+        if rec.get('comment'):
+            comments[rec['name']] = rec['comment']
+
+    try:
+        if args.file.exists():
+            eqs = parse_equations(args.file.read_text(encoding='utf-8'))
+            position = {e['name']: i for i, e in enumerate(eqs)}
+            for rec in records:
+                i = position.get(rec['name'])
+                if i is None:
+                    position[rec['name']] = len(eqs)
+                    eqs.append({'name': rec['name'], 'expr': rec['expression']})
+                    added += 1
+                else:
+                    eqs[i]['expr'] = rec['expression']
+                    updated += 1
+                note(rec)
+            args.file.write_text(serialize_equations(eqs), encoding='utf-8')
+            names = set(position)
+        else:
+            names = set()
+            partial = args.file.with_name(args.file.name + '.part')
+            try:
+                with open(partial, 'w', encoding='utf-8') as f:
+                    for rec in records:
+                        if rec['name'] in names:
+                            print(f"{args.source}: skipped repeated \"{rec['name']}\"", file=sys.stderr)
+                            continue
+                        names.add(rec['name'])
+                        f.write(f"\"{rec['name']}\"= {rec['expression']}\n")
+                        added += 1
+                        note(rec)
+                partial.replace(args.file)
+            finally:
+                # Gone after a successful replace; a failed import leaves nothing behind
+                partial.unlink(missing_ok=True)
+    except (interchange.InterchangeError, OSError) as e:
+        print(f'{args.source}: {e}', file=sys.stderr)
+        return 1
+
+    sections = {sec: [] for sec in cfg['sections']}
+    for name, sec in section_of.items():
+        sections.setdefault(sec, []).append(name)
+    cfg['sections'] = sections
+    save_cfg(cfgp, reconcile_cfg_with_txt(cfg, names))
+    print(f'{args.file}: {added} added, {updated} updated')
+    return 0
+
+
+def cmd_serve(args):
+    """JSON-RPC evaluation service for scripts; runs until interrupted"""
+    import service
+
+    def ready(address):
+        print(f'listening on {address}', flush=True)
+
+    service.serve(args.files, host=args.host, port=args.port, unix=args.unix, ready=ready)
+    return 0
+
+
+def cmd_configurations(args):
+    """Write each configuration's resolved equations file"""
+    import configurations
+    from config_io import cfg_path_for, load_cfg
+    cfg = load_cfg(cfg_path_for(args.file))
+    available = configurations.names(cfg)
+    if not args.export:
+        for name in available:
+            print(f'{name}: {len(cfg[configurations.CONFIGURATIONS_KEY][name])} override(s)')
+        return 0
+    unknown = [c for c in args.only or () if c not in available]
+    if unknown:
+        print(f'{args.file}: no configuration {unknown[0]!r}', file=sys.stderr)
+        return 1
+    for name, out, count in configurations.export_all(args.file, cfg, args.out, args.only, jobs=args.jobs):
+        print(f'{name}: {count} equation(s) to {out}')
+    return 0
+
+
+def build_parser():
+    ap = argparse.ArgumentParser(prog='SWEquationsEditor', description='SolidWorks equations editor commands')
+    sub = ap.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('search', help='full-text search over equation files under a folder')
+    p.add_argument('query', help='words to find; each matches as a prefix')
+    p.add_argument('--root', type=Path, default=Path.cwd(), help='folder to index (default: current)')
+    p.add_argument('--index', type=Path, help='index database (default: per-folder cache file)')
+    p.add_argument('--limit', type=int, default=20)
+    p.add_argument('--no-update', action='store_true', help='query without refreshing changed files')
+    p.set_defaults(func=cmd_search)
+
+    p = sub.add_parser('merge-driver', help='three-way merge of an equations .txt or .cfg (git merge driver)')
+    p.add_argument('base', type=Path, help='common ancestor (%%O)')
+    p.add_argument('ours', type=Path, help='our version, overwritten with the result (%%A)')
+    p.add_argument('theirs', type=Path, help='their version (%%B)')
+    p.add_argument('--path', type=Path, help='path in the repository (%%P); picks .txt or .cfg handling')
+    p.set_defaults(func=cmd_merge_driver)
+
+    p = sub.add_parser('normalize', help='rewrite expressions in canonical form')
+    p.add_argument('files', type=Path, nargs='+', help='equations .txt files')
+    p.add_argument('--check', action='store_true', help='list files that would change and exit 1')
+    p.set_defaults(func=cmd_normalize)
+
+    formats = ('csv', 'jsonl', 'design-table')
+    p = sub.add_parser('export', help='write equations as CSV, JSON Lines or a design table')
+    p.add_argument('file', type=Path, help='equations .txt file')
+    p.add_argument('output', type=Path)
+    p.add_argument('--format', choices=formats, help='default: from the output suffix (csv or jsonl)')
+    p.add_argument('--fields', help='comma-separated subset of name,expression,section,comment,value')
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser('import', help='add or update equations from CSV, JSON Lines or a design table')
+    p.add_argument('source', type=Path)
+    p.add_argument('file', type=Path, help='equations .txt file, created if missing')
+    p.add_argument('--format', choices=formats, help='default: from the source suffix (csv or jsonl)')
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser('configurations', help='list configurations or export their resolved equations files')
+    p.add_argument('file', type=Path, help='equations .txt file')
+    p.add_argument('--export', action='store_true', help='write "FILE [configuration].txt" for each one')
+    p.add_argument('--out', type=Path, help='folder for exported files (default: next to FILE)')
+    p.add_argument('--only', nargs='+', metavar='NAME', help='export just these configurations')
+    p.add_argument('--jobs', type=int, help='worker processes (default: one per CPU)')
+    p.set_defaults(func=cmd_configurations)
+
+    p = sub.add_parser('serve', help='local JSON-RPC service evaluating equation files')
+    p.add_argument('files', type=Path, nargs='*', help='equations files to load up front')
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=8765, help='0 picks a free port')
+    p.add_argument('--unix', type=Path, help='listen on a Unix domain socket instead of TCP')
+    p.set_defaults(func=cmd_serve)
+
+    return ap
+
+
+def commands():
+    parser = build_parser()
+    for action in parser._subparsers._group_actions:
+        return set(action.choices)
+    return set()
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args) or 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
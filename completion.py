@@ -0,0 +1,120 @@
+from bisect import bisect_left, insort
+
+from expressions import CONSTANTS, FUNCTIONS, SW_FILE_PROPERTIES
+
+VARIABLE = 'variable'
+PROPERTY = 'property'
+FUNCTION = 'function'
+CONSTANT = 'constant'
+
+
+def _word_keys(name):
+    """Lower-cased keys for the whole name and for each later word in it"""
+    lowered = name.casefold()
+    keys = [lowered]
+    for i, ch in enumerate(lowered):
+        if i and lowered[i - 1] in ' _-' and ch not in ' _-':
+            keys.append(lowered[i:])
+    return keys
+
+
+class PrefixIndex:
+    """Sorted index over names answering prefix queries by bisection.
+
+    Every name is indexed under its full text and under the start of each
+    later word, so "pan" finds both "panel width" and "outer panel
+    thickness". Adds and removals are incremental.
+    """
+
+    def __init__(self, names=()):
+        names = set(names)
+        self._names = names
+        self._sorted = sorted(names, key=str.casefold)
+        self._keys = sorted((key, name) for name in names for key in _word_keys(name))
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        return name in self._names
+
+    def names(self):
+        """All names in case-insensitive order"""
+        return self._sorted
+
+    def add(self, name):
+        if name in self._names:
+            return
+        self._names.add(name)
+        insort(self._sorted, name, key=str.casefold)
+        for key in _word_keys(name):
+            insort(self._keys, (key, name))
+
+    def discard(self, name):
+        if name not in self._names:
+            return
+        self._names.discard(name)
+        i = bisect_left(self._sorted, name.casefold(), key=str.casefold)
+        while self._sorted[i] != name:
+            i += 1
+        del self._sorted[i]
+        for key in _word_keys(name):
+            i = bisect_left(self._keys, (key, name))
+            del self._keys[i]
+
+    def rename(self, old, new):
+        self.discard(old)
+        self.add(new)
+
+    def complete(self, prefix, limit=50):
+        """Names matching prefix, whole-name matches before word matches.
+
+        Within each group shorter names rank first, then alphabetical.
+        """
+        prefix = prefix.casefold()
+        if not prefix:
+            return self._sorted[:limit]
+        start = bisect_left(self._keys, (prefix,))
+        whole, word = [], []
+        seen = set()
+        # Scan a bounded window so a one-letter prefix stays cheap
+        for key, name in self._keys[start:start + limit * 8]:
+            if not key.startswith(prefix):
+                break
+            if name in seen:
+                continue
+            seen.add(name)
+            (whole if name.casefold() == key else word).append(name)
+        whole.sort(key=lambda n: (len(n), n.casefold()))
+        word.sort(key=lambda n: (len(n), n.casefold()))
+        return (whole + word)[:limit]
+
+
+# Built-in vocabulary never changes, so one index serves every editor
+_BUILTINS = {
+    PROPERTY: PrefixIndex(SW_FILE_PROPERTIES),
+    FUNCTION: PrefixIndex(FUNCTIONS),
+    CONSTANT: PrefixIndex(CONSTANTS),
+}
+
+
+def complete(prefix, variables, quoted, limit=50):
+    """Ranked (kind, text) completions for the token being typed.
+
+    Inside quotes only variables and SW properties make sense; for a bare
+    identifier functions and constants rank first, then variables (which
+    are inserted quoted).
+    """
+    if quoted:
+        kinds = [(VARIABLE, variables), (PROPERTY, _BUILTINS[PROPERTY])]
+    else:
+        kinds = [(FUNCTION, _BUILTINS[FUNCTION]), (CONSTANT, _BUILTINS[CONSTANT]), (VARIABLE, variables)]
+    results = []
+    for kind, index in kinds:
+        if index is None:
+            continue
+        for name in index.complete(prefix, limit - len(results)):
+            results.append((kind, name))
+        if len(results) >= limit:
+            break
+    return results
@@ -11,6 +11,8 @@ DEFAULT_CFG = {
     'last_opened': None,
 }
 CFG_VERSION = 1
+# Settings kept per variable name; they follow renames and deletions
+PER_NAME_KEYS = ('comments', 'tolerances', 'spec_limits', 'ranges')
 
 
 def cfg_path_for(txt_path: Path) -> Path:
@@ -38,6 +40,26 @@ def save_cfg(path: Path, cfg: dict):
         json.dump(cfg, f, indent=2)
 
 
+def _per_name_maps(cfg: dict):
+    for key in PER_NAME_KEYS:
+        if cfg.get(key):
+            yield cfg[key]
+    # Configuration overlays map names to expressions too
+    yield from cfg.get('configurations', {}).values()
+
+
+def rename_in_cfg(cfg: dict, old: str, new: str):
+    for entries in _per_name_maps(cfg):
+        if old in entries:
+            entries[new] = entries.pop(old)
+
+
+def forget_in_cfg(cfg: dict, names):
+    for entries in _per_name_maps(cfg):
+        for name in names:
+            entries.pop(name, None)
+
+
 def reconcile_cfg_with_txt(cfg: dict, eq_names: set):
     # Remove names not in txt
     for sec in list(cfg['sections'].keys()):
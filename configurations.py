@@ -0,0 +1,94 @@
+"""Named configurations layered over the base equations.
+
+A SolidWorks part's configurations usually differ in a few driving
+values. Each configuration here is an overlay in the cfg sidecar that
+overrides the expressions of some names and shares every other row with
+the base equations file::
+
+    "configurations": {"Long": {"total length": "700mm"}}
+
+The base file stays the one SolidWorks reads. A resolved file per
+configuration is written on demand, several at once in worker processes.
+"""
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+CONFIGURATIONS_KEY = 'configurations'
+ACTIVE_KEY = 'active_configuration'
+BASE_LABEL = '(Base)'
+
+_UNSAFE = re.compile(r'[\\/:*?"<>|]+')
+
+
+def names(cfg):
+    return list((cfg or {}).get(CONFIGURATIONS_KEY, {}))
+
+
+def overrides_for(cfg, configuration):
+    """The {name: expr} overlay of a configuration; empty for the base"""
+    if configuration is None:
+        return {}
+    return cfg.setdefault(CONFIGURATIONS_KEY, {}).setdefault(configuration, {})
+
+
+def resolve(rows, overrides):
+    """(name, expr) rows with the overlay applied; names the base lacks are ignored"""
+    if not overrides:
+        return iter(rows)
+    return ((name, overrides.get(name, expr)) for name, expr in rows)
+
+
+def export_path(path: Path, configuration, out_dir=None) -> Path:
+    """'part.txt' exported as configuration 'Long' becomes 'part [Long].txt'"""
+    path = Path(path)
+    label = _UNSAFE.sub('_', configuration).strip() or '_'
+    return Path(out_dir or path.parent) / f'{path.stem} [{label}]{path.suffix}'
+
+
+def write_resolved(out: Path, rows, overrides):
+    """Write the resolved equations file; returns the number of equations"""
+    count = 0
+    partial = out.with_name(out.name + '.part')
+    with open(partial, 'w', encoding='utf-8', newline='\n') as f:
+        for name, expr in resolve(rows, overrides):
+            f.write(f'"{name}"= {expr}\n')
+            count += 1
+    os.replace(partial, out)
+    return count
+
+
+def _base_rows(path):
+    from parsing import iter_equations
+    with open(path, encoding='utf-8') as f:
+        for e in iter_equations(f):
+            yield e['name'], e['expr']
+
+
+def _export_one(source, rows, overrides, out):
+    # Runs in a worker process; without rows the base file is streamed there
+    return write_resolved(Path(out), rows if rows is not None else _base_rows(source), overrides)
+
+
+def export_all(path: Path, cfg, out_dir=None, only=None, rows=None, jobs=None):
+    """Write every configuration's resolved file; returns [(configuration, out, count)].
+
+    rows are the base (name, expr) rows when they differ from the file on
+    disk (unsaved edits). Configurations are written in parallel worker
+    processes when there is more than one.
+    """
+    wanted = [c for c in names(cfg) if only is None or c in only]
+    if rows is not None:
+        rows = list(rows)
+    tasks = [(c, export_path(path, c, out_dir)) for c in wanted]
+    if out_dir is not None:
+        Path(out_dir).mkdir(parents=True, exist_ok=True)
+    if len(tasks) <= 1 or jobs == 1:
+        counts = [_export_one(path, rows, cfg[CONFIGURATIONS_KEY][c], out) for c, out in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(_export_one, str(path), rows, cfg[CONFIGURATIONS_KEY][c], str(out))
+                       for c, out in tasks]
+            counts = [f.result() for f in futures]
+    return [(c, out, count) for (c, out), count in zip(tasks, counts)]
@@ -2,6 +2,8 @@ from PyQt6.QtGui import QTextDocument, QColor
 from PyQt6.QtWidgets import QStyledItemDelegate, QComboBox
 from PyQt6.QtCore import Qt, QRegularExpression, QRectF
 
+from expressions import CONSTANTS, FUNCTIONS, SW_FILE_PROPERTIES
+
 
 class SectionComboDelegate(QStyledItemDelegate):
     def __init__(self, get_sections_callable, parent=None):
@@ -37,22 +39,10 @@ class HighlightingDelegate(QStyledItemDelegate):
         self.quote_re = QRegularExpression(r'"([^"]+)"')  # Quoted strings
         self.identifier_re = QRegularExpression(r'\b([a-zA-Z_][a-zA-Z0-9_]*)\b')  # Unquoted identifiers
 
-        # Define the categories from editors.py
-        self.SW_FILE_PROPERTIES = [
-            'SW-Mass', 'SW-Volume', 'SW-SurfaceArea',
-            'SW-CenterofMassX', 'SW-CenterofMassY', 'SW-CenterofMassZ',
-            'SW-Density', 'SW-Px', 'SW-Py', 'SW-Pz',
-            'SW-Lxx', 'SW-Lxy', 'SW-Lxz', 'SW-Lyx', 'SW-Lyy', 'SW-Lyz', 'SW-Lzx', 'SW-Lzy', 'SW-Lzz'
-        ]
-        
-        self.FUNCTIONS = {
-            'sin': ('',), 'cos': ('',), 'tan': ('',), 'sec': ('',), 'cosec': ('',), 'cotan': ('',),
-            'arcsin': ('',), 'arccos': ('',), 'arctan': ('',), 'arcsec': ('',), 'arccotan': ('',),
-            'abs': ('',), 'exp': ('',), 'log': ('',), 'ln': ('',), 'sqr': ('',), 'sqrt': ('',),
-            'int': ('',), 'sgn': ('',), 'max': ('', ''), 'min': ('', ''), 'if': ('', '', ''),
-        }
-        
-        self.CONSTANTS = ['pi', 'e']
+        # Shared categories from expressions.py
+        self.SW_FILE_PROPERTIES = SW_FILE_PROPERTIES
+        self.FUNCTIONS = FUNCTIONS
+        self.CONSTANTS = CONSTANTS
 
     def paint(self, painter, option, index):
         text = index.data()  # Get the text from the model
@@ -64,7 +54,9 @@ class HighlightingDelegate(QStyledItemDelegate):
         doc.setPlainText(text)
 
         # Apply highlighting
-        known = set(self.get_known_names())
+        known = self.get_known_names()
+        if not isinstance(known, (set, frozenset)):
+            known = set(known)
         
         # Highlight quoted strings (variable names and SW file properties in equations)
         cursor = doc.find(self.quote_re)
@@ -100,6 +92,10 @@ class HighlightingDelegate(QStyledItemDelegate):
 
         # Render the QTextDocument
         painter.save()
+        background = index.data(Qt.ItemDataRole.BackgroundRole)
+        if background is not None:
+            # Rows overridden by the active configuration
+            painter.fillRect(option.rect, background)
         painter.translate(option.rect.topLeft())
         doc.setTextWidth(option.rect.width())
         doc.drawContents(painter, QRectF(0, 0, option.rect.width(), option.rect.height()))
@@ -0,0 +1,144 @@
+from collections import deque
+
+from expressions import references
+
+
+def build_graph(rows):
+    """Map each name to the set of defined names its expression references.
+
+    rows is an iterable of (name, expr) pairs. References to names that are
+    not defined (SW properties, dimensions, typos) are left out.
+    """
+    rows = list(rows)
+    defined = {name for name, _ in rows}
+    return {name: {r for r in references(expr) if r in defined} for name, expr in rows}
+
+
+def invert(graph):
+    """Dependents map: name -> names whose expressions reference it"""
+    dependents = {name: set() for name in graph}
+    for name, refs in graph.items():
+        for r in refs:
+            dependents[r].add(name)
+    return dependents
+
+
+def find_cycles(graph):
+    """Strongly connected components that form reference cycles.
+
+    Iterative Tarjan so deep chains in large files do not hit the recursion
+    limit. Self-references count as a cycle of one.
+    """
+    index = {}
+    low = {}
+    on_stack = set()
+    stack = []
+    cycles = []
+    counter = 0
+    for root in graph:
+        if root in index:
+            continue
+        work = [(root, iter(graph[root]))]
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, children = work[-1]
+            advanced = False
+            for child in children:
+                if child not in index:
+                    index[child] = low[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(graph[child])))
+                    advanced = True
+                    break
+                if child in on_stack:
+                    low[node] = min(low[node], index[child])
+            if advanced:
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                if len(component) > 1 or node in graph[node]:
+                    cycles.append(component[::-1])
+    return cycles
+
+
+def topological_order(graph):
+    """Names ordered so every name comes after the names it references.
+
+    Names on a cycle (and everything downstream of one) are omitted; use
+    find_cycles to report them.
+    """
+    pending = {name: len(refs) for name, refs in graph.items()}
+    dependents = invert(graph)
+    ready = deque(name for name, n in pending.items() if n == 0)
+    order = []
+    while ready:
+        name = ready.popleft()
+        order.append(name)
+        for d in dependents[name]:
+            pending[d] -= 1
+            if pending[d] == 0:
+                ready.append(d)
+    return order
+
+
+def condensed_order(graph, cycles=None):
+    """Every name, ordered over the graph with each cycle collapsed to one node.
+
+    A name comes after every name it references outside its own cycle, and
+    the members of a cycle are adjacent. cycles defaults to find_cycles(graph);
+    cycles outside the graph are ignored.
+    """
+    if cycles is None:
+        cycles = find_cycles(graph)
+    component = {name: (name,) for name in graph}
+    for cycle in cycles:
+        if cycle[0] not in graph:
+            continue
+        members = tuple(cycle)
+        for name in members:
+            component[name] = members
+    pending = {}
+    dependents = {}
+    components = list(dict.fromkeys(component.values()))
+    for members in components:
+        refs = {component[r] for n in members for r in graph[n]} - {members}
+        pending[members] = len(refs)
+        for r in refs:
+            dependents.setdefault(r, []).append(members)
+    ready = deque(members for members in components if pending[members] == 0)
+    order = []
+    while ready:
+        members = ready.popleft()
+        order.extend(members)
+        for d in dependents.get(members, ()):
+            pending[d] -= 1
+            if pending[d] == 0:
+                ready.append(d)
+    return order
+
+
+def downstream(dependents, names):
+    """All names transitively depending on any of names (excluding them)"""
+    seen = set()
+    queue = deque(names)
+    while queue:
+        for d in dependents.get(queue.popleft(), ()):
+            if d not in seen:
+                seen.add(d)
+                queue.append(d)
+    return seen - set(names)
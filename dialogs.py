@@ -1,17 +1,21 @@
-from PyQt6.QtWidgets import QDialog, QFormLayout, QLineEdit, QComboBox, QDialogButtonBox
+from PyQt6.QtGui import QDoubleValidator
+from PyQt6.QtWidgets import QDialog, QFormLayout, QLabel, QLineEdit, QComboBox, QDialogButtonBox
 from editors import ExpressionEditor
 
 
 class AddEditDialog(QDialog):
-    def __init__(self, parent=None, name='', expr='', sections=None, current_section='Unassigned', comment='', get_known_names_callable=lambda: ()):
+    def __init__(self, parent=None, name='', expr='', sections=None, current_section='Unassigned', comment='', get_known_names_callable=lambda: (),
+                 get_dimensions_callable=None, name_index=None):
         super().__init__(parent)
         self.setWindowTitle('Add / Edit Equation')
         self.setMinimumWidth(1200)
-        self.setMinimumHeight(150)
+        self.setMinimumHeight(170)
         form = QFormLayout(self)
 
         self.name_edit = QLineEdit(name)
-        self.expr_editor = ExpressionEditor(get_known_names_callable, initial_text=expr)
+        self.expr_editor = ExpressionEditor(get_known_names_callable, initial_text=expr,
+                                            get_dimensions_callable=get_dimensions_callable,
+                                            name_index=name_index)
 
         self.section_combo = QComboBox()
         self.section_combo.setEditable(False)
@@ -41,4 +45,39 @@ class AddEditDialog(QDialog):
             self.expr_editor.text().strip(),
             self.section_combo.currentText().strip(),
             self.comment_edit.text().strip()
-        )
\ No newline at end of file
+        )
+
+
+class RangeDialog(QDialog):
+    """Minimum and maximum of an input, in document units; both empty clears the range"""
+
+    def __init__(self, parent=None, name='', bounds=None):
+        super().__init__(parent)
+        self.setWindowTitle('Input Range')
+        form = QFormLayout(self)
+        form.addRow(QLabel(f'Range of "{name}" (mm, deg):'))
+        self.min_edit = QLineEdit()
+        self.max_edit = QLineEdit()
+        for edit, value in zip((self.min_edit, self.max_edit), bounds or (None, None)):
+            edit.setValidator(QDoubleValidator())
+            if value is not None:
+                edit.setText(f'{value:g}')
+        form.addRow('Minimum:', self.min_edit)
+        form.addRow('Maximum:', self.max_edit)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        form.addRow(buttons)
+
+    def values(self):
+        """(minimum, maximum), or None to clear; a single bound gives a point"""
+        bounds = []
+        for edit in (self.min_edit, self.max_edit):
+            try:
+                bounds.append(float(edit.text()))
+            except ValueError:
+                pass
+        if not bounds:
+            return None
+        return min(bounds), max(bounds)
@@ -0,0 +1,101 @@
+from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtGui import QColor
+from PyQt6.QtWidgets import QHBoxLayout, QLabel, QPushButton, QTreeWidget, QTreeWidgetItem, QVBoxLayout, QWidget
+
+from diffing import ADDED, AFFECTED_LIMIT, CHANGED, COMMENT, KINDS, MOVED, REMOVED, RENAMED, diff_equations, summarize
+
+NAME_ROLE = Qt.ItemDataRole.UserRole
+MAX_PANEL_ITEMS = 5000
+KIND_COLORS = {
+    ADDED: QColor(120, 220, 120),
+    REMOVED: QColor(255, 100, 100),
+    RENAMED: QColor(120, 180, 255),
+    CHANGED: QColor(255, 200, 80),
+}
+
+
+def _describe(c):
+    if c.kind == ADDED:
+        return f'"{c.name}"= {c.new}'
+    if c.kind == REMOVED:
+        return f'"{c.name}"= {c.old}'
+    if c.kind == RENAMED:
+        return f'"{c.old_name}" → "{c.name}"' + ('' if c.old == c.new else f': {c.old} → {c.new}')
+    if c.kind == MOVED:
+        return f'"{c.name}": {c.old} → {c.new}'
+    if c.kind == COMMENT:
+        return f'"{c.name}": {c.old or "(none)"} → {c.new or "(none)"}'
+    return f'"{c.name}": {c.old} → {c.new}'
+
+
+class DiffPanel(QWidget):
+    """Changes between the open equations and another version of them"""
+    activated = pyqtSignal(str)  # variable name
+    refreshRequested = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.label = ''
+        self.old_rows = None
+        self.old_cfg = None
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        top = QHBoxLayout()
+        self.summary = QLabel('Nothing compared')
+        self.summary.setWordWrap(True)
+        top.addWidget(self.summary, 1)
+        refresh = QPushButton('Refresh')
+        refresh.clicked.connect(self.refreshRequested.emit)
+        top.addWidget(refresh)
+        layout.addLayout(top)
+
+        self.tree = QTreeWidget()
+        self.tree.setHeaderHidden(True)
+        self.tree.itemActivated.connect(self._on_activated)
+        layout.addWidget(self.tree)
+
+    def set_base(self, label, rows, cfg):
+        """The version the open file is compared against"""
+        self.label = label
+        self.old_rows = rows
+        self.old_cfg = cfg
+
+    def compare(self, rows, cfg):
+        if self.old_rows is None:
+            return
+        changes = diff_equations(self.old_rows, rows, self.old_cfg, cfg)
+        self.show_changes(changes)
+
+    def show_changes(self, changes):
+        self.tree.clear()
+        self.summary.setText(f'Compared with {self.label}: {summarize(changes)}')
+        groups = {}
+        for c in changes[:MAX_PANEL_ITEMS]:
+            group = groups.get(c.kind)
+            if group is None:
+                group = groups[c.kind] = QTreeWidgetItem([c.kind.capitalize()])
+            item = QTreeWidgetItem([_describe(c)])
+            item.setData(0, NAME_ROLE, None if c.kind == REMOVED else c.name)
+            if c.kind in KIND_COLORS:
+                item.setForeground(0, KIND_COLORS[c.kind])
+            if c.affected:
+                more = '+' if len(c.affected) >= AFFECTED_LIMIT else ''
+                child = QTreeWidgetItem([f'Affects {len(c.affected)}{more}: '
+                                         + ', '.join(f'"{n}"' for n in c.affected[:10])
+                                         + (' …' if len(c.affected) > 10 else '')])
+                child.setToolTip(0, '\n'.join(c.affected))
+                child.setData(0, NAME_ROLE, c.affected[0])
+                item.addChild(child)
+            group.addChild(item)
+        for kind in KINDS:
+            if kind in groups:
+                group = groups[kind]
+                group.setText(0, f'{kind.capitalize()} ({group.childCount()})')
+                self.tree.addTopLevelItem(group)
+                group.setExpanded(True)
+
+    def _on_activated(self, item, column):
+        name = item.data(0, NAME_ROLE)
+        if name:
+            self.activated.emit(name)
@@ -0,0 +1,166 @@
+"""Semantic diff between two versions of an equation set and its cfg."""
+import json
+import subprocess
+from collections import deque, namedtuple
+from pathlib import Path
+
+from config_io import cfg_path_for, load_cfg
+from expressions import references
+from parsing import parse_equations
+
+Change = namedtuple('Change', 'kind name old_name old new affected')
+
+ADDED = 'added'
+REMOVED = 'removed'
+RENAMED = 'renamed'
+CHANGED = 'changed'
+MOVED = 'moved'
+COMMENT = 'comment'
+KINDS = (CHANGED, ADDED, REMOVED, RENAMED, MOVED, COMMENT)
+# Downstream names listed per change; a change near the root of a long chain
+# would otherwise list (and walk) the whole file
+AFFECTED_LIMIT = 100
+
+
+def _section_of(cfg):
+    return {n: sec for sec, names in (cfg or {}).get('sections', {}).items() for n in names}
+
+
+def diff_equations(old_rows, new_rows, old_cfg=None, new_cfg=None):
+    """Changes from old to new; rows are (name, expr) pairs.
+
+    Rows are compared as hashed (name, expr) pairs, so unchanged rows drop
+    out with one set operation and only the difference is examined. An
+    equation that disappeared under one name and reappeared with the same
+    expression under another is reported as a rename. Each change carries
+    the new-side names downstream of it.
+    """
+    old_pairs = set(old_rows)
+    new_pairs = set(new_rows)
+    gone = old_pairs - new_pairs
+    came = new_pairs - old_pairs
+    old_names = {n for n, _ in gone}
+    new_names = {n for n, _ in came}
+    old_expr = dict(gone)
+    new_expr = dict(came)
+
+    changes = []
+    for name in old_names & new_names:
+        changes.append(Change(CHANGED, name, name, old_expr[name], new_expr[name], ()))
+    removed = old_names - new_names
+    added = new_names - old_names
+    # Renames: a removed and an added name sharing the exact expression
+    by_expr = {}
+    for name in removed:
+        by_expr.setdefault(old_expr[name], []).append(name)
+    renamed = {}
+    for name in sorted(added):
+        candidates = by_expr.get(new_expr[name])
+        if candidates:
+            renamed[name] = candidates.pop()
+    for new_name, old_name in renamed.items():
+        changes.append(Change(RENAMED, new_name, old_name, old_expr[old_name], new_expr[new_name], ()))
+    removed -= set(renamed.values())
+    for name in added - renamed.keys():
+        changes.append(Change(ADDED, name, None, None, new_expr[name], ()))
+    for name in removed:
+        changes.append(Change(REMOVED, name, name, old_expr[name], None, ()))
+
+    if old_cfg is not None and new_cfg is not None:
+        old_sec, new_sec = _section_of(old_cfg), _section_of(new_cfg)
+        old_com, new_com = old_cfg.get('comments', {}), new_cfg.get('comments', {})
+        old_of = {new: old for new, old in renamed.items()}
+        for name in new_sec.keys() | new_com.keys():
+            if name in added and name not in renamed:
+                continue
+            was = old_of.get(name, name)
+            if was in old_sec and name in new_sec and old_sec[was] != new_sec[name]:
+                changes.append(Change(MOVED, name, was, old_sec[was], new_sec[name], ()))
+            if old_com.get(was, '') != new_com.get(name, ''):
+                changes.append(Change(COMMENT, name, was, old_com.get(was, ''), new_com.get(name, ''), ()))
+
+    if changes:
+        changes = _with_affected(changes, new_rows)
+    changes.sort(key=lambda c: (KINDS.index(c.kind), c.name.casefold()))
+    return changes
+
+
+def _with_affected(changes, new_rows):
+    # Reference graph keyed by quoted name, defined or not, so dependents of
+    # removed names (now dangling) are found too
+    users = {}
+    for name, expr in new_rows:
+        for r in references(expr):
+            users.setdefault(r, set()).add(name)
+    result = []
+    for c in changes:
+        if c.kind in (MOVED, COMMENT):
+            result.append(c)
+            continue
+        roots = {c.name, c.old_name} - {None}
+        result.append(c._replace(affected=_downstream(users, roots, AFFECTED_LIMIT)))
+    return result
+
+
+def _downstream(users, roots, limit):
+    # Breadth-first, so the closest dependents are the ones kept
+    seen = set(roots)
+    found = []
+    queue = deque(roots)
+    while queue and len(found) < limit:
+        for d in users.get(queue.popleft(), ()):
+            if d not in seen:
+                seen.add(d)
+                found.append(d)
+                queue.append(d)
+    return tuple(found[:limit])
+
+
+def load_version(path: Path):
+    """(rows, cfg) of an equations file on disk"""
+    path = Path(path)
+    eqs = parse_equations(path.read_text(encoding='utf-8'))
+    return [(e['name'], e['expr']) for e in eqs], load_cfg(cfg_path_for(path))
+
+
+def load_revision(path: Path, revision: str):
+    """(rows, cfg) of path as committed at a git revision.
+
+    Raises RuntimeError with git's message when the file is not in that
+    revision or git is unavailable.
+    """
+    path = Path(path).resolve()
+
+    def show(p):
+        try:
+            out = subprocess.run(['git', 'show', f'{revision}:./{p.name}'], cwd=p.parent,
+                                 capture_output=True, check=False)
+        except OSError as e:
+            raise RuntimeError(f'git is not available: {e}') from e
+        if out.returncode != 0:
+            return None, out.stderr.decode('utf-8', 'replace').strip()
+        return out.stdout.decode('utf-8'), None
+
+    text, error = show(path)
+    if text is None:
+        raise RuntimeError(error or f'{path.name} not found at {revision}')
+    eqs = parse_equations(text)
+    cfg_text, _ = show(cfg_path_for(path))
+    cfg = {'sections': {'Unassigned': []}, 'comments': {}}
+    if cfg_text:
+        try:
+            cfg = json.loads(cfg_text)
+        except ValueError:
+            pass
+    cfg.setdefault('sections', {'Unassigned': []})
+    cfg.setdefault('comments', {})
+    return [(e['name'], e['expr']) for e in eqs], cfg
+
+
+def summarize(changes) -> str:
+    counts = {}
+    for c in changes:
+        counts[c.kind] = counts.get(c.kind, 0) + 1
+    if not counts:
+        return 'No differences'
+    return ', '.join(f'{counts[k]} {k}' for k in KINDS if k in counts)
@@ -1,45 +1,29 @@
-from PyQt6.QtGui import QTextDocument
-from PyQt6.QtWidgets import QWidget, QHBoxLayout, QPlainTextEdit, QComboBox, QPushButton, QLabel, QLineEdit, QVBoxLayout
+from PyQt6.QtCore import QEvent, QModelIndex, QTimer, Qt
+from PyQt6.QtGui import QStandardItem, QStandardItemModel, QTextDocument
+from PyQt6.QtWidgets import (
+    QWidget, QHBoxLayout, QPlainTextEdit, QComboBox, QPushButton, QLabel, QLineEdit, QVBoxLayout, QCompleter
+)
+from completion import CONSTANT, FUNCTION, PrefixIndex, complete
+from expressions import CONSTANTS, FUNCTIONS, SW_FILE_PROPERTIES
 from highlighter import ExpressionHighlighter
+from linting import ERROR, lint_expression
 
 
 class ExpressionEditor(QWidget):
     CATEGORIES = ['Variables', 'File Properties', 'Functions', 'Constants']
-    SW_FILE_PROPERTIES = [
-        'SW-Mass', 'SW-Volume', 'SW-SurfaceArea',
-        'SW-CenterofMassX', 'SW-CenterofMassY', 'SW-CenterofMassZ',
-        'SW-Density', 'SW-Px', 'SW-Py', 'SW-Pz',
-        'SW-Lxx', 'SW-Lxy', 'SW-Lxz', 'SW-Lyx', 'SW-Lyy', 'SW-Lyz', 'SW-Lzx', 'SW-Lzy', 'SW-Lzz'
-    ]
-    FUNCTIONS = {
-        'sin': ('',),
-        'cos': ('',),
-        'tan': ('',),
-        'sec': ('',),
-        'cosec': ('',),
-        'cotan': ('',),
-        'arcsin': ('',),
-        'arccos': ('',),
-        'arctan': ('',),
-        'arcsec': ('',),
-        'arccotan': ('',),
-        'abs': ('',),
-        'exp': ('',),
-        'log': ('',),
-        'ln': ('',),
-        'sqr': ('',),
-        'sqrt': ('',),
-        'int': ('',),
-        'sgn': ('',),
-        'max': ('', ''),
-        'min': ('', ''),
-        'if': ('', '', ''),
-    }
-    CONSTANTS = ['pi', 'e']
-
-    def __init__(self, get_known_names_callable, parent=None, initial_text=''):
+    SW_FILE_PROPERTIES = SW_FILE_PROPERTIES
+    FUNCTIONS = FUNCTIONS
+    CONSTANTS = CONSTANTS
+
+    COMPLETION_LIMIT = 50
+
+    def __init__(self, get_known_names_callable, parent=None, initial_text='', get_dimensions_callable=None,
+                 name_index=None):
         super().__init__(parent)
         self.get_known_names = get_known_names_callable
+        self.get_dimensions = get_dimensions_callable or dict
+        # Sorted name index maintained by the model; built on demand otherwise
+        self._name_index = name_index
 
         # Layout
         outer = QVBoxLayout(self)
@@ -53,6 +37,24 @@ class ExpressionEditor(QWidget):
         self.edit.setPlainText(initial_text)
         outer.addWidget(self.edit, 1)
 
+        # Live diagnostics for the expression being typed
+        self.diagnostics_label = QLabel('')
+        self.diagnostics_label.setWordWrap(True)
+        outer.addWidget(self.diagnostics_label)
+        self._lint_timer = QTimer(self)
+        self._lint_timer.setSingleShot(True)
+        self._lint_timer.setInterval(150)
+        self._lint_timer.timeout.connect(self._lint)
+        self.edit.textChanged.connect(self._lint_timer.start)
+
+        # Inline autocomplete popup, fed from the prefix index on each keystroke
+        self._completion_model = QStandardItemModel(self)
+        self.completer = QCompleter(self._completion_model, self)
+        self.completer.setWidget(self.edit)
+        self.completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.completer.activated[QModelIndex].connect(self._insert_completion)
+        self.edit.installEventFilter(self)
+
         # Row 2: insertion controls
         insert_row = QWidget()
         irl = QHBoxLayout(insert_row)
@@ -81,13 +83,110 @@ class ExpressionEditor(QWidget):
 
         # Set up syntax highlighting directly on the QPlainTextEdit
         self._highlighter = ExpressionHighlighter(self.edit.document(), self.get_known_names)
+        self._lint()
+
+    def _lint(self):
+        text = self.text().strip()
+        if not text:
+            self.diagnostics_label.setText('')
+            return
+        known = self.get_known_names()
+        if not isinstance(known, (set, frozenset)):
+            known = set(known)
+        diagnostics, _ = lint_expression(text, known, self.get_dimensions())
+        if not diagnostics:
+            self.diagnostics_label.setText('')
+            self.diagnostics_label.setToolTip('')
+            return
+        errors = any(d.severity == ERROR for d in diagnostics)
+        self.diagnostics_label.setStyleSheet('color: #ff6464;' if errors else 'color: #ffc850;')
+        self.diagnostics_label.setText('; '.join(d.message for d in diagnostics))
+        self.diagnostics_label.setToolTip('\n'.join(f'{d.severity}: {d.message}' for d in diagnostics))
+
+    # ------------ Autocomplete ------------
+    def _variables(self):
+        if self._name_index is None:
+            self._name_index = PrefixIndex(self.get_known_names())
+        return self._name_index
+
+    def eventFilter(self, obj, event):
+        if obj is self.edit and event.type() == QEvent.Type.KeyPress:
+            popup = self.completer.popup()
+            key = event.key()
+            if popup.isVisible() and key in (Qt.Key.Key_Enter, Qt.Key.Key_Return, Qt.Key.Key_Escape,
+                                             Qt.Key.Key_Tab, Qt.Key.Key_Backtab):
+                # Leave these to the completer instead of the text edit
+                event.ignore()
+                return True
+            if key == Qt.Key.Key_Space and event.modifiers() & Qt.KeyboardModifier.ControlModifier:
+                self._update_completions(force=True)
+                return True
+            if event.text() or key == Qt.Key.Key_Backspace:
+                # Run after the edit has applied the keystroke
+                QTimer.singleShot(0, self._update_completions)
+        return super().eventFilter(obj, event)
+
+    def _current_token(self):
+        """(quoted, prefix, start column) of the token left of the cursor"""
+        cursor = self.edit.textCursor()
+        before = cursor.block().text()[:cursor.positionInBlock()]
+        if before.count('"') % 2 == 1:
+            start = before.rfind('"') + 1
+            return True, before[start:], start
+        start = len(before)
+        while start > 0 and (before[start - 1].isalnum() or before[start - 1] == '_'):
+            start -= 1
+        return False, before[start:], start
+
+    def _update_completions(self, force=False):
+        popup = self.completer.popup()
+        quoted, prefix, _ = self._current_token()
+        if not quoted and not force and (not prefix or prefix[0].isdigit()):
+            popup.hide()
+            return
+        results = complete(prefix, self._variables(), quoted, self.COMPLETION_LIMIT)
+        if not results:
+            popup.hide()
+            return
+        self._completion_model.clear()
+        for kind, name in results:
+            item = QStandardItem(name)
+            item.setData(kind, Qt.ItemDataRole.UserRole)
+            item.setToolTip(kind)
+            self._completion_model.appendRow(item)
+        rect = self.edit.cursorRect()
+        rect.setWidth(popup.sizeHintForColumn(0) + popup.verticalScrollBar().sizeHint().width())
+        self.completer.complete(rect)
+        popup.setCurrentIndex(self._completion_model.index(0, 0))
+
+    def _insert_completion(self, index):
+        name = index.data(Qt.ItemDataRole.DisplayRole)
+        kind = index.data(Qt.ItemDataRole.UserRole)
+        quoted, prefix, start = self._current_token()
+        cursor = self.edit.textCursor()
+        block_pos = cursor.block().position()
+        cursor.setPosition(block_pos + start - (1 if quoted else 0))
+        cursor.setPosition(block_pos + start + len(prefix), cursor.MoveMode.KeepAnchor)
+        after = cursor.block().text()[start + len(prefix):]
+        if quoted and after.startswith('"'):
+            # Replace the existing closing quote rather than doubling it
+            cursor.movePosition(cursor.MoveOperation.Right, cursor.MoveMode.KeepAnchor, 1)
+        if kind == FUNCTION:
+            inner = ', '.join([''] * len(self.FUNCTIONS.get(name, ('',))))
+            cursor.insertText(f'{name}({inner})')
+            cursor.movePosition(cursor.MoveOperation.Left, cursor.MoveMode.MoveAnchor, len(inner) + 1)
+        elif kind == CONSTANT:
+            cursor.insertText(name)
+        else:
+            cursor.insertText(f'"{name}"')
+        self.edit.setTextCursor(cursor)
 
     def _refresh_item_combo(self):
         cat = self.category_combo.currentText()
         self.item_combo.clear()
         if cat == 'Variables':
-            # Known names come from the model
-            self.item_combo.addItems(sorted(self.get_known_names()))
+            # Already sorted by the name index
+            self.item_combo.addItems(self._variables().names())
         elif cat == 'File Properties':
             self.item_combo.addItems(self.SW_FILE_PROPERTIES)
         elif cat == 'Functions':
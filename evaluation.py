@@ -0,0 +1,597 @@
+"""Numeric evaluation of equation sets.
+
+Expressions are compiled once into closures and run in dependency order.
+Arithmetic uses Python operators, so any number-like type flows through the
+same compiled graph; functions, comparisons, powers and if() go through a
+backend object. FLOAT evaluates plain values in document units (mm, deg);
+DUAL propagates derivatives for sensitivity analysis.
+"""
+import gc
+import math
+import operator
+from collections import namedtuple
+from contextlib import contextmanager
+from functools import lru_cache
+
+from dependencies import downstream, find_cycles, invert, topological_order
+from expressions import CONSTANT_VALUES, FUNCTIONS, UNITS, references, try_parse
+
+RAD = math.pi / 180.0
+DEG = 180.0 / math.pi
+
+
+class EvaluationError(ValueError):
+    pass
+
+
+# ------------ Float backend ------------
+def _inverse(x):
+    if x == 0:
+        raise EvaluationError('Division by zero')
+    return 1.0 / x
+
+
+def _sgn(x):
+    return (x > 0) - (x < 0)
+
+
+# Trig functions take and inverse trig functions return degrees
+FLOAT_FUNCTIONS = {
+    'sin': lambda x: math.sin(x * RAD),
+    'cos': lambda x: math.cos(x * RAD),
+    'tan': lambda x: math.tan(x * RAD),
+    'sec': lambda x: _inverse(math.cos(x * RAD)),
+    'cosec': lambda x: _inverse(math.sin(x * RAD)),
+    'cotan': lambda x: _inverse(math.tan(x * RAD)),
+    'arcsin': lambda x: math.asin(x) * DEG,
+    'arccos': lambda x: math.acos(x) * DEG,
+    'arctan': lambda x: math.atan(x) * DEG,
+    'arcsec': lambda x: math.acos(_inverse(x)) * DEG,
+    'arccotan': lambda x: math.atan(_inverse(x)) * DEG,
+    'abs': abs,
+    'exp': math.exp,
+    'log': math.log,
+    'ln': math.log,
+    'sqr': lambda x: x * x,
+    'sqrt': math.sqrt,
+    'int': lambda x: float(math.floor(x)),
+    'sgn': lambda x: float(_sgn(x)),
+    # Exactly two arguments, as in SolidWorks; Python's max() would take any number
+    'max': lambda a, b: max(a, b),
+    'min': lambda a, b: min(a, b),
+}
+BINARY = {'+': operator.add, '-': operator.sub, '*': operator.mul, '/': operator.truediv}
+COMPARE = {
+    '<': operator.lt, '>': operator.gt, '=': operator.eq,
+    '<=': operator.le, '>=': operator.ge, '<>': operator.ne,
+}
+
+
+class FloatBackend:
+    def call(self, func, args):
+        return FLOAT_FUNCTIONS[func](*args)
+
+    def pow(self, a, b):
+        return math.pow(a, b)
+
+    def compare(self, op, a, b):
+        return 1.0 if COMPARE[op](a, b) else 0.0
+
+    def select(self, cond, when_true, when_false):
+        # Branches are thunks so the unused one is never evaluated
+        return when_true() if cond != 0 else when_false()
+
+
+# ------------ Dual numbers ------------
+def _scaled(grad, k):
+    return {n: d * k for n, d in grad.items()} if k != 1.0 else grad
+
+
+def _combine(ga, ka, gb, kb):
+    """ka * ga + kb * gb over sparse gradients"""
+    if not gb or kb == 0:
+        return _scaled(ga, ka) if ka != 0 else {}
+    if not ga or ka == 0:
+        return _scaled(gb, kb)
+    out = _scaled(ga, ka)
+    if out is ga:
+        out = dict(ga)
+    for n, d in gb.items():
+        out[n] = out.get(n, 0.0) + d * kb
+    return out
+
+
+class Dual:
+    """A value with its partial derivatives with respect to named inputs.
+
+    The gradient is a sparse dict, so a pass seeded with every input carries
+    only the inputs each equation actually depends on.
+    """
+    __slots__ = ('val', 'grad')
+
+    def __init__(self, val, grad=None):
+        self.val = float(val)
+        self.grad = grad or {}
+
+    def __repr__(self):
+        return f'Dual({self.val!r}, {self.grad!r})'
+
+    def __add__(self, other):
+        if isinstance(other, Dual):
+            return Dual(self.val + other.val, _combine(self.grad, 1.0, other.grad, 1.0))
+        return Dual(self.val + other, self.grad)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, Dual):
+            return Dual(self.val - other.val, _combine(self.grad, 1.0, other.grad, -1.0))
+        return Dual(self.val - other, self.grad)
+
+    def __rsub__(self, other):
+        return Dual(other - self.val, _scaled(self.grad, -1.0))
+
+    def __mul__(self, other):
+        if isinstance(other, Dual):
+            return Dual(self.val * other.val, _combine(self.grad, other.val, other.grad, self.val))
+        return Dual(self.val * other, _scaled(self.grad, other))
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        if isinstance(other, Dual):
+            if other.val == 0:
+                raise EvaluationError('Division by zero')
+            q = self.val / other.val
+            return Dual(q, _combine(self.grad, 1.0 / other.val, other.grad, -q / other.val))
+        if other == 0:
+            raise EvaluationError('Division by zero')
+        return Dual(self.val / other, _scaled(self.grad, 1.0 / other))
+
+    def __rtruediv__(self, other):
+        if self.val == 0:
+            raise EvaluationError('Division by zero')
+        return Dual(other / self.val, _scaled(self.grad, -other / (self.val * self.val)))
+
+    def __neg__(self):
+        return Dual(-self.val, _scaled(self.grad, -1.0))
+
+
+def _value(x):
+    return x.val if isinstance(x, Dual) else x
+
+
+# Derivative of each one-argument function at x
+DERIVATIVES = {
+    'sin': lambda x: math.cos(x * RAD) * RAD,
+    'cos': lambda x: -math.sin(x * RAD) * RAD,
+    'tan': lambda x: RAD / math.cos(x * RAD) ** 2,
+    'sec': lambda x: math.tan(x * RAD) / math.cos(x * RAD) * RAD,
+    'cosec': lambda x: -1.0 / (math.sin(x * RAD) * math.tan(x * RAD)) * RAD,
+    'cotan': lambda x: -RAD / math.sin(x * RAD) ** 2,
+    'arcsin': lambda x: DEG / math.sqrt(1 - x * x),
+    'arccos': lambda x: -DEG / math.sqrt(1 - x * x),
+    'arctan': lambda x: DEG / (1 + x * x),
+    'arcsec': lambda x: DEG / (abs(x) * math.sqrt(x * x - 1)),
+    'arccotan': lambda x: -DEG / (1 + x * x),
+    'abs': lambda x: float(_sgn(x)),
+    'exp': math.exp,
+    'log': lambda x: 1.0 / x,
+    'ln': lambda x: 1.0 / x,
+    'sqr': lambda x: 2.0 * x,
+    'sqrt': lambda x: 0.5 / math.sqrt(x),
+    'int': lambda x: 0.0,
+    'sgn': lambda x: 0.0,
+}
+
+
+class DualBackend(FloatBackend):
+    def call(self, func, args):
+        if func in ('max', 'min'):
+            a, b = args
+            pick_a = (_value(a) >= _value(b)) == (func == 'max')
+            return a if pick_a else b
+        (x,) = args
+        if not isinstance(x, Dual):
+            return FLOAT_FUNCTIONS[func](x)
+        value = FLOAT_FUNCTIONS[func](x.val)
+        try:
+            slope = DERIVATIVES[func](x.val)
+        except ZeroDivisionError:
+            raise EvaluationError(f'{func}() is not differentiable at {x.val:g}')
+        return Dual(value, _scaled(x.grad, slope))
+
+    def pow(self, a, b):
+        if not isinstance(a, Dual) and not isinstance(b, Dual):
+            return math.pow(a, b)
+        av, bv = _value(a), _value(b)
+        value = math.pow(av, bv)
+        ga = a.grad if isinstance(a, Dual) else {}
+        gb = b.grad if isinstance(b, Dual) else {}
+        da = bv * math.pow(av, bv - 1) if ga else 0.0
+        db = value * math.log(av) if gb else 0.0
+        return Dual(value, _combine(ga, da, gb, db))
+
+    def compare(self, op, a, b):
+        return super().compare(op, _value(a), _value(b))
+
+    def select(self, cond, when_true, when_false):
+        return super().select(_value(cond), when_true, when_false)
+
+
+FLOAT = FloatBackend()
+DUAL = DualBackend()
+
+
+# ------------ Compilation ------------
+def compile_ast(node):
+    """Closure computing node as fn(env, backend); env maps names to values"""
+    kind = node[0]
+    if kind == 'num':
+        value = node[1] * (UNITS[node[2]][0] if node[2] else 1.0)
+        return lambda env, b: value
+    if kind == 'ref':
+        name = node[1]
+        return lambda env, b: env[name]
+    if kind == 'const':
+        value = CONSTANT_VALUES[node[1]]
+        return lambda env, b: value
+    if kind == 'ident':
+        raise EvaluationError(f'Unknown identifier {node[1]}')
+    if kind == 'neg':
+        x = compile_ast(node[1])
+        return lambda env, b: -x(env, b)
+    if kind == 'call':
+        func, args = node[1], node[2]
+        if func not in FLOAT_FUNCTIONS and func != 'if':
+            raise EvaluationError(f'Unknown function {func}()')
+        arity = len(FUNCTIONS[func])
+        if len(args) != arity:
+            raise EvaluationError(f'{func}() takes {arity} argument{"s" if arity != 1 else ""}, got {len(args)}')
+        if func == 'if':
+            c, t, f = (compile_ast(a) for a in args)
+            return lambda env, b: b.select(c(env, b), lambda: t(env, b), lambda: f(env, b))
+        fns = [compile_ast(a) for a in args]
+        if len(fns) == 1:
+            (x,) = fns
+            return lambda env, b: b.call(func, (x(env, b),))
+        return lambda env, b: b.call(func, [fn(env, b) for fn in fns])
+    op = node[1]
+    if op in ('+', '-', '*', '/'):
+        group = ('+', '-') if op in ('+', '-') else ('*', '/')
+        first, tail = _flatten(node, group)
+        if len(tail) > 1:
+            return _compile_chain(first, tail)
+    left, right = compile_ast(node[2]), compile_ast(node[3])
+    if op == '+':
+        return lambda env, b: left(env, b) + right(env, b)
+    if op == '-':
+        return lambda env, b: left(env, b) - right(env, b)
+    if op == '*':
+        return lambda env, b: left(env, b) * right(env, b)
+    if op == '/':
+        return lambda env, b: left(env, b) / right(env, b)
+    if op == '^':
+        return lambda env, b: b.pow(left(env, b), right(env, b))
+    return lambda env, b: b.compare(op, left(env, b), right(env, b))
+
+
+def _flatten(node, ops):
+    # a + b - c + ... parses as a left-leaning tree; walk its spine iteratively
+    # so long sums neither recurse deeply here nor when evaluated
+    tail = []
+    while node[0] == 'bin' and node[1] in ops:
+        tail.append((node[1], node[3]))
+        node = node[2]
+    tail.reverse()
+    return node, tail
+
+
+def _compile_chain(first, tail):
+    start = compile_ast(first)
+    steps = [(op, compile_ast(operand)) for op, operand in tail]
+    steps = [(BINARY[op], fn) for op, fn in steps]
+
+    def chain(env, b):
+        acc = start(env, b)
+        for combine, fn in steps:
+            acc = combine(acc, fn(env, b))
+        return acc
+    return chain
+
+
+# ------------ Constant folding ------------
+def _number(value):
+    return ('num', value, None)
+
+
+def _constant(node):
+    # Folded constants are unit-free numbers already in document units
+    return node[1] if node[0] == 'num' and node[2] is None else None
+
+
+def fold(node):
+    """Fold constant subtrees of an AST into numbers in document units.
+
+    References stay symbolic. if() with a constant condition folds to the
+    chosen branch. Subtrees whose evaluation fails (e.g. division by zero)
+    are left as they are, so the error surfaces when the row is evaluated.
+    """
+    kind = node[0]
+    if kind == 'num':
+        return _number(node[1] * (UNITS[node[2]][0] if node[2] else 1.0))
+    if kind == 'const':
+        return _number(CONSTANT_VALUES[node[1]])
+    if kind in ('ref', 'ident'):
+        return node
+    if kind == 'neg':
+        x = fold(node[1])
+        value = _constant(x)
+        return _number(-value) if value is not None else ('neg', x)
+    if kind == 'call':
+        func = node[1]
+        args = tuple(fold(a) for a in node[2])
+        values = [_constant(a) for a in args]
+        if func == 'if' and len(args) == 3 and values[0] is not None:
+            return args[1] if values[0] != 0 else args[2]
+        if func in FLOAT_FUNCTIONS and None not in values:
+            try:
+                return _number(float(FLOAT_FUNCTIONS[func](*values)))
+            except (ArithmeticError, ValueError, TypeError):
+                pass
+        return ('call', func, args)
+    op = node[1]
+    group = ('+', '-') if op in ('+', '-') else ('*', '/') if op in ('*', '/') else (op,)
+    first, tail = _flatten(node, group) if op in ('+', '-', '*', '/') else (node[2], [(op, node[3])])
+    acc = fold(first)
+    for op, operand in tail:
+        right = fold(operand)
+        a, b = _constant(acc), _constant(right)
+        if a is not None and b is not None:
+            try:
+                if op == '^':
+                    acc = _number(math.pow(a, b))
+                elif op in COMPARE:
+                    acc = _number(FLOAT.compare(op, a, b))
+                else:
+                    acc = _number(BINARY[op](a, b))
+                continue
+            except (ArithmeticError, ValueError):
+                pass
+        acc = ('bin', op, acc, right)
+    return acc
+
+
+Compiled = namedtuple('Compiled', 'fn constant value error')
+
+
+@lru_cache(maxsize=65536)
+def compile_expression(expr: str) -> Compiled:
+    """Parse, fold and compile expr once per distinct expression text.
+
+    Rows sharing an expression share the result, and rebuilding a Program
+    after an edit recompiles only expressions that actually changed.
+    """
+    ast, error = try_parse(expr)
+    if error is not None:
+        return Compiled(None, False, None, str(error))
+    try:
+        folded = fold(ast)
+        value = _constant(folded)
+        if value is not None:
+            return Compiled(lambda env, b: value, True, value, None)
+        return Compiled(compile_ast(folded), False, None, None)
+    except EvaluationError as e:
+        return Compiled(None, False, None, str(e))
+
+
+@contextmanager
+def gc_paused():
+    # Compiling builds hundreds of thousands of small closures; the cyclic
+    # collector rescanning them dominated large files by an order of magnitude
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class Program:
+    """An equation set compiled for repeated evaluation.
+
+    Reference cycles are found once at construction. Plain values are
+    computed on demand and cached, so a run that overrides some names (dual
+    seeds, sampled inputs) only evaluates the live part of the graph
+    downstream of them; everything else is reused as a constant.
+    """
+
+    def __init__(self, rows):
+        with gc_paused():
+            self.exprs = dict(rows)
+            self.refs = {n: tuple(dict.fromkeys(references(x))) for n, x in self.exprs.items()}
+            self.graph = {n: {r for r in refs if r in self.exprs} for n, refs in self.refs.items()}
+            self.errors = {}
+            for component in find_cycles(self.graph):
+                for n in component:
+                    self.errors[n] = 'Circular reference'
+            self.order = topological_order(self.graph)
+            self._position = {n: i for i, n in enumerate(self.order)}
+        self._dependents = None
+        self._values = {}
+        self._value_errors = {}
+
+    def code(self, name):
+        compiled = compile_expression(self.exprs[name])
+        if compiled.error is not None:
+            raise EvaluationError(compiled.error)
+        return compiled.fn
+
+    def is_constant(self, name):
+        """True if the expression folds to a number without references"""
+        return compile_expression(self.exprs[name]).constant
+
+    def inputs(self):
+        """Driving values: equations that reference no other equation"""
+        return [n for n in self.order if not self.graph[n]]
+
+    def upstream(self, names):
+        """names plus everything they transitively reference"""
+        seen = set(names)
+        stack = list(seen)
+        while stack:
+            for r in self.graph.get(stack.pop(), ()):
+                if r not in seen:
+                    seen.add(r)
+                    stack.append(r)
+        return seen
+
+    def downstream(self, names):
+        """names plus everything transitively referencing them"""
+        if self._dependents is None:
+            self._dependents = invert(self.graph)
+        return set(names) | downstream(self._dependents, names)
+
+    def run(self, backend=FLOAT, overrides=None, names=None):
+        """Evaluate in dependency order; returns (values, errors).
+
+        overrides replaces the value of some names (e.g. dual seeds); only
+        names downstream of them are evaluated with backend, the rest are
+        cached plain values. names restricts the result to a subset closed
+        under upstream.
+        """
+        overrides = overrides or {}
+        scope = self.exprs.keys() if names is None else names
+        with gc_paused():
+            live = self._downstream_within(overrides, scope) if overrides else set()
+            self._ensure_values([n for n in scope if n not in live])
+            values = {n: self._values[n] for n in scope if n not in live and n in self._values}
+            errors = {n: self._value_errors[n] for n in scope if n not in live and n in self._value_errors}
+            if live:
+                errors.update((n, self.errors[n]) for n in live if n in self.errors)
+                self._run(self._ordered(live), backend, overrides, values, errors)
+                for name in live:
+                    if name not in values and name not in errors:
+                        errors[name] = 'Depends on a circular reference'
+        return values, errors
+
+    def sweep(self, name, points, outputs, backend=FLOAT):
+        """[(values, errors)] of outputs for each value of name in points.
+
+        Names the outputs need that do not depend on name are evaluated
+        once; each point re-runs only the part between name and the outputs.
+        """
+        scope = self.upstream(outputs)
+        live = self._downstream_within([name], scope)
+        fixed, fixed_errors = self.run(backend, names=scope - live)
+        results = []
+        with gc_paused():
+            order = self._ordered(live)
+            frontier = {r: fixed[r] for n in live for r in self.graph[n] if r not in live and r in fixed}
+            for value in points:
+                values = dict(frontier)
+                errors = {n: self.errors[n] for n in live if n in self.errors}
+                self._run(order, backend, {name: value}, values, errors)
+                out, out_errors = {}, {}
+                for o in outputs:
+                    found, found_errors = (values, errors) if o in live else (fixed, fixed_errors)
+                    if o in found:
+                        out[o] = found[o]
+                    else:
+                        out_errors[o] = found_errors.get(o, 'Depends on a circular reference')
+                results.append((out, out_errors))
+        return results
+
+    def _ordered(self, names):
+        # Dependency order of a subset without scanning the whole order;
+        # names on a cycle have no position and are left out
+        position = self._position
+        return sorted((n for n in names if n in position), key=position.__getitem__)
+
+    def _downstream_within(self, names, scope):
+        # scope is closed under upstream, so every name in it downstream of
+        # names is reached without leaving it; the rest of the graph is never
+        # walked
+        if self._dependents is None:
+            self._dependents = invert(self.graph)
+        live = {n for n in names if n in scope}
+        stack = list(live)
+        while stack:
+            for d in self._dependents.get(stack.pop(), ()):
+                if d in scope and d not in live:
+                    live.add(d)
+                    stack.append(d)
+        return live
+
+    def _ensure_values(self, names):
+        pending = {n for n in names if n not in self._values and n not in self._value_errors}
+        if not pending:
+            return
+        needed = self.upstream(pending)
+        order = self._ordered(n for n in needed if n not in self._values and n not in self._value_errors)
+        self._value_errors.update((n, e) for n, e in self.errors.items() if n in needed)
+        self._run(order, FLOAT, {}, self._values, self._value_errors)
+        for name in needed:
+            if name not in self._values and name not in self._value_errors:
+                self._value_errors[name] = 'Depends on a circular reference'
+
+    def _run(self, order, backend, overrides, values, errors):
+        for name in order:
+            if name in overrides:
+                values[name] = overrides[name]
+                continue
+            missing = next((r for r in self.refs[name] if r not in values), None)
+            if missing is not None:
+                errors[name] = (f'Depends on "{missing}", which has no value' if missing in self.exprs
+                                else f'Cannot evaluate "{missing}"')
+                continue
+            try:
+                values[name] = self.code(name)(values, backend)
+            except EvaluationError as e:
+                errors[name] = str(e)
+            except (ArithmeticError, ValueError) as e:
+                errors[name] = f'Math error: {e}'
+
+
+def format_value(value, dim=None) -> str:
+    """value with the document unit implied by its dimension, e.g. '3.175 mm'"""
+    text = f'{value:.6g}'
+    if not dim:
+        return text
+    units = []
+    for unit, exp in zip(('mm', 'deg'), dim):
+        if exp:
+            units.append(unit if exp == 1 else f'{unit}^{exp}')
+    return f'{text} {"·".join(units)}' if units else text
+
+
+def evaluate(rows):
+    """Values of (name, expr) rows in document units; returns (values, errors)"""
+    return Program(rows).run()
+
+
+def sensitivities(program: Program, output: str):
+    """Value of output and its partial derivatives w.r.t. every input it depends on.
+
+    One forward pass over the live part of the upstream subgraph with each
+    input seeded as a dual number yields all partials at once. Returns
+    (value, [(input, derivative)]) ranked by magnitude; raises
+    EvaluationError if output cannot be evaluated.
+    """
+    if output not in program.exprs:
+        raise EvaluationError(f'Unknown name "{output}"')
+    with gc_paused():
+        subset = program.upstream([output])
+    inputs = [n for n in subset if not program.graph[n]]
+    plain, _ = program.run(FLOAT, names=set(inputs))
+    seeds = {n: Dual(plain[n], {n: 1.0}) for n in inputs if n in plain}
+    values, errors = program.run(DUAL, overrides=seeds, names=subset)
+    if output not in values:
+        raise EvaluationError(errors.get(output, f'Cannot evaluate "{output}"'))
+    result = values[output]
+    if not isinstance(result, Dual):
+        return result, []
+    ranked = [(n, d) for n, d in result.grad.items() if n != output]
+    ranked.sort(key=lambda item: (-abs(item[1]), item[0].casefold()))
+    return result.val, ranked
@@ -0,0 +1,318 @@
+import math
+import re
+from functools import lru_cache
+
+# Shared vocabulary of the SolidWorks expression language. The tuple length of
+# each FUNCTIONS entry is the function's argument count.
+SW_FILE_PROPERTIES = [
+    'SW-Mass', 'SW-Volume', 'SW-SurfaceArea',
+    'SW-CenterofMassX', 'SW-CenterofMassY', 'SW-CenterofMassZ',
+    'SW-Density', 'SW-Px', 'SW-Py', 'SW-Pz',
+    'SW-Lxx', 'SW-Lxy', 'SW-Lxz', 'SW-Lyx', 'SW-Lyy', 'SW-Lyz', 'SW-Lzx', 'SW-Lzy', 'SW-Lzz'
+]
+FUNCTIONS = {
+    'sin': ('',), 'cos': ('',), 'tan': ('',), 'sec': ('',), 'cosec': ('',), 'cotan': ('',),
+    'arcsin': ('',), 'arccos': ('',), 'arctan': ('',), 'arcsec': ('',), 'arccotan': ('',),
+    'abs': ('',), 'exp': ('',), 'log': ('',), 'ln': ('',), 'sqr': ('',), 'sqrt': ('',),
+    'int': ('',), 'sgn': ('',), 'max': ('', ''), 'min': ('', ''), 'if': ('', '', ''),
+}
+CONSTANTS = ['pi', 'e']
+CONSTANT_VALUES = {'pi': math.pi, 'e': math.e}
+
+# Dimensions are (length exponent, angle exponent)
+LENGTH = (1, 0)
+ANGLE = (0, 1)
+DIMENSIONLESS = (0, 0)
+
+# Unit suffix -> (factor to document units, dimension). Values are evaluated
+# in the MMGS defaults: millimetres and degrees.
+UNITS = {
+    'mm': (1.0, LENGTH),
+    'cm': (10.0, LENGTH),
+    'm': (1000.0, LENGTH),
+    'um': (0.001, LENGTH),
+    'in': (25.4, LENGTH),
+    'ft': (304.8, LENGTH),
+    'deg': (1.0, ANGLE),
+    'rad': (180.0 / math.pi, ANGLE),
+}
+
+COMPARISONS = ('<', '>', '=', '<=', '>=', '<>')
+
+REF_RE = re.compile(r'"([^"]+)"')
+TOKEN_RE = re.compile(r'''
+    (?P<ws>\s+)
+  | (?P<num>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)(?P<unit>[a-zA-Z]+)?
+  | (?P<ref>"[^"]*")
+  | (?P<ident>[a-zA-Z_][a-zA-Z0-9_]*)
+  | (?P<op><=|>=|<>|[-+*/^(),<>=])
+''', re.VERBOSE)
+
+
+class ExpressionError(ValueError):
+    def __init__(self, message, pos=0):
+        super().__init__(message)
+        self.pos = pos
+
+
+def references(expr: str):
+    """Quoted names in expr, in order of appearance (tolerates broken syntax)"""
+    return REF_RE.findall(expr)
+
+
+def rename_references(expr: str, renames) -> str:
+    """expr with quoted names renamed by the {old: new} map"""
+    return REF_RE.sub(lambda m: f'"{renames.get(m.group(1), m.group(1))}"', expr)
+
+
+def check_parentheses(expr: str):
+    """Raise ExpressionError for the first unbalanced parenthesis"""
+    stack = []
+    in_quote = False
+    for i, ch in enumerate(expr):
+        if ch == '"':
+            in_quote = not in_quote
+        elif in_quote:
+            continue
+        elif ch == '(':
+            stack.append(i)
+        elif ch == ')':
+            if not stack:
+                raise ExpressionError("Unmatched ')'", i)
+            stack.pop()
+    if in_quote:
+        raise ExpressionError('Unterminated quoted name', expr.rfind('"'))
+    if stack:
+        raise ExpressionError("Unclosed '('", stack[-1])
+
+
+def tokenize(expr: str):
+    tokens = []
+    pos = 0
+    while pos < len(expr):
+        m = TOKEN_RE.match(expr, pos)
+        if not m:
+            raise ExpressionError(f'Unexpected character {expr[pos]!r}', pos)
+        kind = m.lastgroup
+        if kind == 'unit':
+            kind = 'num'
+        if kind != 'ws':
+            tokens.append((kind, m, pos))
+        pos = m.end()
+    return tokens
+
+
+class _Parser:
+    # AST nodes are plain tuples:
+    #   ('num', value, unit)  ('ref', name)  ('const', name)  ('ident', name)
+    #   ('call', func, (args...))  ('neg', operand)  ('bin', op, left, right)
+
+    def __init__(self, expr):
+        self.expr = expr
+        self.tokens = tokenize(expr)
+        self.i = 0
+
+    def peek(self):
+        return self.tokens[self.i] if self.i < len(self.tokens) else None
+
+    def peek_op(self, *ops):
+        tok = self.peek()
+        return tok is not None and tok[0] == 'op' and tok[1].group() in ops
+
+    def next(self):
+        tok = self.peek()
+        if tok is None:
+            raise ExpressionError('Unexpected end of expression', len(self.expr))
+        self.i += 1
+        return tok
+
+    def expect(self, op):
+        tok = self.next()
+        if tok[0] != 'op' or tok[1].group() != op:
+            raise ExpressionError(f'Expected {op!r}', tok[2])
+
+    def parse(self):
+        if not self.tokens:
+            raise ExpressionError('Empty expression', 0)
+        node = self.comparison()
+        tok = self.peek()
+        if tok is not None:
+            raise ExpressionError(f'Unexpected {tok[1].group()!r}', tok[2])
+        return node
+
+    def comparison(self):
+        node = self.additive()
+        if self.peek_op(*COMPARISONS):
+            op = self.next()[1].group()
+            node = ('bin', op, node, self.additive())
+        return node
+
+    def additive(self):
+        node = self.term()
+        while self.peek_op('+', '-'):
+            op = self.next()[1].group()
+            node = ('bin', op, node, self.term())
+        return node
+
+    def term(self):
+        node = self.unary()
+        while self.peek_op('*', '/'):
+            op = self.next()[1].group()
+            node = ('bin', op, node, self.unary())
+        return node
+
+    def unary(self):
+        if self.peek_op('-'):
+            self.next()
+            return ('neg', self.unary())
+        if self.peek_op('+'):
+            self.next()
+            return self.unary()
+        return self.power()
+
+    def power(self):
+        node = self.primary()
+        if self.peek_op('^'):
+            self.next()
+            node = ('bin', '^', node, self.unary())
+        return node
+
+    def primary(self):
+        kind, m, pos = self.next()
+        if kind == 'num':
+            unit = m.group('unit')
+            if unit is not None and unit not in UNITS:
+                raise ExpressionError(f'Unknown unit {unit!r}', m.start('unit'))
+            return ('num', float(m.group('num')), unit)
+        if kind == 'ref':
+            name = m.group()[1:-1]
+            if not name:
+                raise ExpressionError('Empty quoted name', pos)
+            return ('ref', name)
+        if kind == 'ident':
+            name = m.group()
+            if self.peek_op('('):
+                self.next()
+                args = []
+                if not self.peek_op(')'):
+                    args.append(self.comparison())
+                    while self.peek_op(','):
+                        self.next()
+                        args.append(self.comparison())
+                self.expect(')')
+                return ('call', name, tuple(args))
+            if name in CONSTANT_VALUES:
+                return ('const', name)
+            return ('ident', name)
+        if m.group() == '(':
+            node = self.comparison()
+            self.expect(')')
+            return node
+        raise ExpressionError(f'Unexpected {m.group()!r}', pos)
+
+
+def parse(expr: str):
+    """Parse expr into a tuple AST, raising ExpressionError on bad syntax"""
+    check_parentheses(expr)
+    return _Parser(expr).parse()
+
+
+@lru_cache(maxsize=65536)
+def try_parse(expr: str):
+    """Cached parse returning (ast, None) or (None, ExpressionError)"""
+    try:
+        return parse(expr), None
+    except ExpressionError as e:
+        return None, e
+
+
+def walk(node):
+    """Yield node and all of its descendants"""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        kind = node[0]
+        if kind == 'bin':
+            stack.append(node[3])
+            stack.append(node[2])
+        elif kind == 'neg':
+            stack.append(node[1])
+        elif kind == 'call':
+            stack.extend(reversed(node[2]))
+
+
+# Binding strength of each operator for format_ast; unary minus sits between
+# */ and ^ as in the parser
+_PRECEDENCE = {'+': 2, '-': 2, '*': 3, '/': 3, '^': 5}
+_UNARY = 4
+
+
+def _precedence(node):
+    if node[0] == 'bin':
+        return _PRECEDENCE.get(node[1], 1)
+    if node[0] == 'neg':
+        return _UNARY
+    return 6
+
+
+def _format_number(value, unit):
+    text = repr(value)
+    if text.endswith('.0'):
+        text = text[:-2]
+    return text + (unit or '')
+
+
+def format_ast(node) -> str:
+    """Canonical text of an AST: single spaces around binary operators
+    (except ^), minimal parentheses, numbers without trailing zeros.
+
+    parse(format_ast(ast)) == ast for every parsed expression.
+    """
+    kind = node[0]
+    if kind == 'num':
+        return _format_number(node[1], node[2])
+    if kind == 'ref':
+        return f'"{node[1]}"'
+    if kind in ('const', 'ident'):
+        return node[1]
+    if kind == 'call':
+        return f'{node[1]}({", ".join(format_ast(a) for a in node[2])})'
+    if kind == 'neg':
+        operand = node[1]
+        text = format_ast(operand)
+        return f'-({text})' if _precedence(operand) <= _UNARY else f'-{text}'
+    op = node[1]
+    prec = _precedence(node)
+    if op == '^':
+        left, right = node[2], node[3]
+        lt, rt = format_ast(left), format_ast(right)
+        if _precedence(left) <= prec:
+            lt = f'({lt})'
+        if _precedence(right) < _UNARY:
+            rt = f'({rt})'
+        return f'{lt}^{rt}'
+    # Left-associative chains are formatted iteratively so long sums do not
+    # hit the recursion limit
+    operands = []
+    while node[0] == 'bin' and node[1] != '^' and _precedence(node) == prec and prec > 1:
+        operands.append((node[1], node[3]))
+        node = node[2]
+    if not operands:
+        operands.append((op, node[3]))
+        node = node[2]
+    text = format_ast(node)
+    if _precedence(node) < prec:
+        text = f'({text})'
+    for op, right in reversed(operands):
+        rt = format_ast(right)
+        if _precedence(right) <= prec:
+            rt = f'({rt})'
+        text = f'{text} {op} {rt}'
+    return text
+
+
+def normalize_expression(expr: str) -> str:
+    """expr in canonical form; expressions that do not parse are kept as is"""
+    ast, error = try_parse(expr)
+    return expr if error is not None else format_ast(ast)
@@ -8,6 +8,16 @@ def is_bundled():
     return hasattr(sys, '_MEIPASS')
 
 
+def file_signature(path: Path):
+    """(mtime, size) of a file, or None if it can't be read; a cheap
+    check that the content on disk is still the one loaded"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
 class FileHandleLock:
     def __init__(self, path: Path):
         self.path = path
@@ -15,6 +25,7 @@ class FileHandleLock:
         self.locked = False
         self.readonly = False
         self._lock_len = 0
+        self.signature = None
 
     def acquire(self):
         try:
@@ -28,7 +39,8 @@ class FileHandleLock:
             except Exception:
                 self.file = None
                 return False
-        
+        self.signature = file_signature(self.path)
+
         # In bundled environments, file locking might not work as expected
         # So we'll be more lenient with locking failures
         try:
@@ -56,6 +68,15 @@ class FileHandleLock:
                 self.readonly = True
             return True
 
+    def try_acquire(self):
+        """Non-blocking attempt at a writable, exclusively locked handle.
+        Returns True if both were obtained; otherwise the handle is closed again."""
+        self.acquire()
+        if self.file is not None and self.locked and not self.readonly:
+            return True
+        self.release()
+        return False
+
     def release(self):
         if self.file is None:
             return
@@ -0,0 +1,384 @@
+"""Layered layout of the reference graph for the graph view.
+
+Each equation sits in the layer of its dependency depth: inputs in layer
+0, everything else one layer below the deepest name it references. The
+members of a reference cycle share one layer, below the deepest name the
+cycle references from outside. Inside
+a layer, names are ordered by the barycenter of their neighbours (a few
+Sugiyama-style sweeps) with the section as tie-break, so sections stay
+together. Wide layers wrap onto rows of ROW_WIDTH slots.
+
+GraphLayout keeps the graph, the layer orders and per-layer section
+statistics between runs. A run diffs the rows against the previous one;
+small edits only move the names whose layer changed, inserting them at
+the barycenter of their references, and every other name keeps its place.
+Only the layers an edit touched are re-indexed, so an edit costs the
+size of the layers involved rather than the whole file.
+
+Positions follow from (layer, index) alone, so a GraphSnapshot needs no
+coordinate arrays: the rows in view are found by bisection and the
+columns in view by arithmetic, which is all the viewport culling needs.
+"""
+import math
+from bisect import bisect_left, bisect_right
+from collections import Counter, namedtuple
+
+from dependencies import condensed_order, downstream, find_cycles
+from expressions import references
+
+UNASSIGNED = 'Unassigned'
+
+# Layout units: one node slot is DX wide, one row DY tall
+DX = 160.0
+DY = 60.0
+LAYER_GAP = 60.0
+ROW_WIDTH = 64  # slots per row before a layer wraps
+
+# section, centre, radius in layout units, member count; a cluster covers
+# about the area its members take up in the layout
+Cluster = namedtuple('Cluster', 'section x y radius count')
+
+
+class GraphSnapshot:
+    """Immutable layout result, safe to hand from the worker to the view"""
+
+    def __init__(self, layers, layer_of, index, refs, sections, layer_stats, cluster_edges, edge_count):
+        self.layers = layers          # per layer, a tuple of names in drawing order
+        self.layer_of = layer_of
+        self.index = index            # name -> index within its layer
+        self.refs = refs              # name -> defined names it references
+        self.sections = sections      # name -> section
+        self.cluster_edges = cluster_edges  # (section, section) -> references between them
+        self.edge_count = edge_count
+        self.count = len(layer_of)
+
+        self._y0 = []
+        self._offsets = []
+        self._rows = []  # (y, layer, first index) per row, top to bottom
+        y = 0.0
+        for k, layer in enumerate(layers):
+            self._y0.append(y)
+            self._offsets.append((min(len(layer), ROW_WIDTH) - 1) / 2)
+            for first in range(0, len(layer), ROW_WIDTH):
+                self._rows.append((y, k, first))
+                y += DY
+            y += LAYER_GAP
+        self._row_ys = [r[0] for r in self._rows]
+        half = max(self._offsets, default=0.0) * DX
+        self.bounds = (-half - DX, -DY, half + DX, max(y - LAYER_GAP, 0.0))
+
+        # Per-section centroids, combined from the per-layer sums
+        totals = {}
+        for k, stats in enumerate(layer_stats):
+            for section, (sx, srow, count) in stats.items():
+                acc = totals.setdefault(section, [0.0, 0.0, 0])
+                acc[0] += sx
+                acc[1] += srow + self._y0[k] * count
+                acc[2] += count
+        self.clusters = {s: Cluster(s, sx / count, sy / count, math.sqrt(count * DX * DY / math.pi), count)
+                         for s, (sx, sy, count) in totals.items() if count}
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, name):
+        return name in self.layer_of
+
+    def position(self, name):
+        k = self.layer_of[name]
+        row, col = divmod(self.index[name], ROW_WIDTH)
+        return (col - self._offsets[k]) * DX, self._y0[k] + row * DY
+
+    def section(self, name):
+        return self.sections.get(name, UNASSIGNED)
+
+    def visible(self, left, top, right, bottom):
+        """(name, x, y) of every node inside the rectangle, row by row"""
+        found = []
+        for r in range(bisect_left(self._row_ys, top), bisect_right(self._row_ys, bottom)):
+            y, k, first = self._rows[r]
+            layer = self.layers[k]
+            width = min(ROW_WIDTH, len(layer) - first)
+            offset = self._offsets[k]
+            lo = max(0, math.ceil(left / DX + offset))
+            hi = min(width - 1, math.floor(right / DX + offset))
+            found.extend((layer[first + col], (col - offset) * DX, y) for col in range(lo, hi + 1))
+        return found
+
+    def nearest(self, x, y, radius):
+        """Name closest to (x, y) within radius, or None"""
+        best = None
+        best_d = radius * radius
+        for n, nx, ny in self.visible(x - radius, y - radius, x + radius, y + radius):
+            d = (nx - x) ** 2 + (ny - y) ** 2
+            if d <= best_d:
+                best, best_d = n, d
+        return best
+
+
+class GraphLayout:
+    # Above this fraction of changed rows a full relayout is cheaper
+    FULL_LAYOUT_RATIO = 0.25
+    SWEEPS = 2
+
+    def __init__(self):
+        self._exprs = {}
+        self._quoted = {}   # name -> quoted names in its expression
+        self._users = {}    # quoted name (defined or not) -> names referencing it
+        self.refs = {}      # name -> defined names it references
+        self.users = {}     # name -> defined names referencing it
+        self.layer_of = {}
+        self.layers = []    # per layer, names in drawing order
+        self._index = {}    # name -> index within its layer
+        self._pos = {}      # name -> relative position within its layer, 0..1
+        self._sections = {}
+        self._tuples = []   # per layer, a tuple of names or None once the layer changed
+        self._stats = []    # per layer, section -> [sum of x, sum of row offsets, count]
+        self._cluster_edges = Counter()
+        self._edge_count = 0
+        self.full_layouts = 0
+
+    def run(self, rows, sections):
+        """Lay out (name, expr) rows; sections maps names to their section"""
+        exprs = dict(rows)
+        old = self._exprs
+        edited = {n for n, x in exprs.items() if old.get(n) != x}
+        removed = old.keys() - exprs.keys()
+        if not old or len(edited) + len(removed) > len(exprs) * self.FULL_LAYOUT_RATIO:
+            self._sections = sections
+            self._full(exprs)
+        else:
+            if edited or removed:
+                self._incremental(exprs, edited, removed)
+            if sections != self._sections:
+                # Membership only recolours and regroups; nothing moves
+                self._sections = sections
+                self._restat(range(len(self.layers)))
+                self._count_all_edges()
+        return self.snapshot()
+
+    def _section(self, name):
+        return self._sections.get(name, UNASSIGNED)
+
+    # ------------ Graph bookkeeping ------------
+    def _link(self, name):
+        quoted = tuple(references(self._exprs[name]))
+        self._quoted[name] = quoted
+        for r in quoted:
+            self._users.setdefault(r, set()).add(name)
+
+    def _unlink(self, name):
+        for r in self._quoted.pop(name, ()):
+            users = self._users.get(r)
+            if users is not None:
+                users.discard(name)
+                if not users:
+                    del self._users[r]
+
+    def _resolve(self, name):
+        self._unresolve(name)
+        refs = frozenset(r for r in self._quoted[name] if r in self._exprs and r != name)
+        self.refs[name] = refs
+        for r in refs:
+            self.users.setdefault(r, set()).add(name)
+        self._count_edges(name, refs, 1)
+
+    def _unresolve(self, name):
+        refs = self.refs.pop(name, ())
+        for r in refs:
+            users = self.users.get(r)
+            if users is not None:
+                users.discard(name)
+        self._count_edges(name, refs, -1)
+
+    def _count_edges(self, name, refs, sign):
+        self._edge_count += sign * len(refs)
+        section = self._section(name)
+        for r in refs:
+            other = self._section(r)
+            if other != section:
+                self._cluster_edges[(section, other)] += sign
+
+    def _count_all_edges(self):
+        section = self._sections.get
+        edges = Counter()
+        count = 0
+        for n, refs in self.refs.items():
+            count += len(refs)
+            a = section(n, UNASSIGNED)
+            for r in refs:
+                b = section(r, UNASSIGNED)
+                if a != b:
+                    edges[(a, b)] += 1
+        self._cluster_edges = edges
+        self._edge_count = count
+
+    def _layer(self, members):
+        """Layer of a name, or of all members of one cycle, given as a collection"""
+        return 1 + max((self.layer_of[r] for n in members for r in self.refs[n]
+                        if r not in members and r in self.layer_of), default=-1)
+
+    # ------------ Full layout ------------
+    def _full(self, exprs):
+        self.full_layouts += 1
+        self._exprs = exprs
+        self._quoted = {n: tuple(references(x)) for n, x in exprs.items()}
+        self._users = {}
+        for n, quoted in self._quoted.items():
+            for r in quoted:
+                self._users.setdefault(r, set()).add(n)
+        self.refs = {n: frozenset(r for r in quoted if r in exprs and r != n) for n, quoted in self._quoted.items()}
+        self.users = {}
+        for n, refs in self.refs.items():
+            for r in refs:
+                self.users.setdefault(r, set()).add(n)
+        self._count_all_edges()
+
+        cycles = find_cycles(self.refs)
+        members = {n: frozenset(c) for c in cycles for n in c}
+        order = condensed_order(self.refs, cycles)
+        self.layer_of = {}
+        self._index = {}
+        self._pos = {}
+        for n in order:
+            self.layer_of[n] = self._layer(members.get(n, (n,)))
+        self.layers = [[] for _ in range(max(self.layer_of.values(), default=-1) + 1)]
+        for n in order:
+            self.layers[self.layer_of[n]].append(n)
+        self._tuples = [None] * len(self.layers)
+        self._stats = [None] * len(self.layers)
+
+        section = self._section
+        pos = self._pos
+        if self.layers:
+            self.layers[0].sort(key=lambda n: (section(n), n))
+        for k in range(len(self.layers)):
+            self._reposition(k)
+        for sweep in range(self.SWEEPS):
+            downward = sweep % 2 == 0
+            neighbours = self.refs if downward else self.users
+
+            def key(n):
+                positions = [pos[r] for r in neighbours.get(n, ())]
+                return (sum(positions) / len(positions) if positions else pos[n], section(n), n)
+
+            layer_ids = range(1, len(self.layers)) if downward else range(len(self.layers) - 2, -1, -1)
+            for k in layer_ids:
+                self.layers[k].sort(key=key)
+                self._reposition(k)
+        self._reindex(range(len(self.layers)))
+
+    def _barycenter(self, neighbours, name):
+        positions = [self._pos[r] for r in neighbours or () if r in self._pos]
+        if not positions:
+            return self._pos.get(name, 0.5)
+        return sum(positions) / len(positions)
+
+    def _reposition(self, k):
+        layer = self.layers[k]
+        span = max(len(layer) - 1, 1)
+        self._pos.update(zip(layer, [i / span for i in range(len(layer))]))
+
+    def _reindex(self, layer_ids):
+        layer_ids = list(layer_ids)
+        for k in layer_ids:
+            layer = self.layers[k]
+            self._index.update(zip(layer, range(len(layer))))
+            self._reposition(k)
+            self._tuples[k] = None
+        self._restat(layer_ids)
+
+    def _restat(self, layer_ids):
+        section = self._sections.get
+        for k in layer_ids:
+            layer = self.layers[k]
+            offset = (min(len(layer), ROW_WIDTH) - 1) / 2
+            stats = {}
+            for i, n in enumerate(layer):
+                s = section(n, UNASSIGNED)
+                acc = stats.get(s)
+                if acc is None:
+                    acc = stats[s] = [0.0, 0.0, 0]
+                acc[0] += i % ROW_WIDTH
+                acc[1] += i // ROW_WIDTH
+                acc[2] += 1
+            # Slot sums to layout units
+            self._stats[k] = {s: [(sx - offset * count) * DX, srow * DY, count]
+                              for s, (sx, srow, count) in stats.items()}
+
+    # ------------ Incremental layout ------------
+    def _incremental(self, exprs, edited, removed):
+        old = self._exprs
+        added = edited - old.keys()
+        touched = set(edited)
+        for n in added | removed:
+            # Names whose references start or stop resolving
+            touched |= self._users.get(n, set())
+        touched -= removed
+        self._exprs = exprs
+
+        dirty = set()
+        for n in removed:
+            self._unlink(n)
+            self._unresolve(n)
+            self.users.pop(n, None)
+            k = self.layer_of.pop(n)
+            self.layers[k].remove(n)
+            self._index.pop(n, None)
+            self._pos.pop(n, None)
+            dirty.add(k)
+        for n in touched:
+            if n in edited:
+                self._unlink(n)
+                self._link(n)
+            self._resolve(n)
+
+        # Layers only change downstream of an edit; recompute them there in
+        # dependency order and move just the names whose layer differs
+        # A cycle with a member downstream of the edit lies entirely inside it
+        affected = touched | downstream(self.users, touched)
+        graph = {n: self.refs[n] & affected for n in affected}
+        cycles = find_cycles(graph)
+        members = {n: frozenset(c) for c in cycles for n in c}
+        order = condensed_order(graph, cycles)
+        for n in order:
+            layer = self._layer(members.get(n, (n,)))
+            current = self.layer_of.get(n)
+            if layer == current:
+                continue
+            if current is not None:
+                self.layers[current].remove(n)
+                dirty.add(current)
+            self._insert(n, layer)
+            dirty.add(layer)
+
+        while self.layers and not self.layers[-1]:
+            self.layers.pop()
+        del self._tuples[len(self.layers):]
+        del self._stats[len(self.layers):]
+        self._reindex(k for k in dirty if k < len(self.layers))
+
+    def _insert(self, name, layer):
+        """Place name in layer next to the barycenter of what it references"""
+        while len(self.layers) <= layer:
+            self.layers.append([])
+            self._tuples.append(None)
+            self._stats.append({})
+        names = self.layers[layer]
+        target = self._barycenter(self.refs[name], name)
+        # Positions run evenly from 0 to 1 across a layer
+        i = min(max(round(target * len(names)), 0), len(names))
+        names.insert(i, name)
+        self.layer_of[name] = layer
+        self._pos[name] = target
+
+    # ------------ Output ------------
+    def snapshot(self):
+        for k, layer in enumerate(self.layers):
+            if self._tuples[k] is None:
+                self._tuples[k] = tuple(layer)
+        # Shallow copies: refs values are frozensets and section stats are
+        # replaced rather than mutated, so nothing shared changes afterwards
+        return GraphSnapshot(list(self._tuples), dict(self.layer_of), dict(self._index), dict(self.refs),
+                             self._sections, list(self._stats),
+                             {k: v for k, v in self._cluster_edges.items() if v > 0}, self._edge_count)
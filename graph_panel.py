@@ -0,0 +1,378 @@
+import math
+import time
+import zlib
+
+from PyQt6.QtCore import QLineF, QModelIndex, QObject, QPointF, QRectF, Qt, QThread, QTimer, pyqtSignal, pyqtSlot
+from PyQt6.QtGui import QColor, QPainter, QPen, QPolygonF
+from PyQt6.QtWidgets import QHBoxLayout, QLabel, QPushButton, QVBoxLayout, QWidget
+
+from graph_layout import DX, DY, UNASSIGNED, GraphLayout
+from models import SECTION_COLUMN
+
+# Level of detail by zoom (screen pixels per layout unit): section clusters
+# below CLUSTER_SCALE or when more than MAX_DOTS nodes are in view, plain
+# dots below LABEL_SCALE, labelled boxes above
+CLUSTER_SCALE = 0.03
+LABEL_SCALE = 0.45
+MAX_DOTS = 6000
+MIN_SCALE = 0.002
+MAX_SCALE = 4.0
+# Edges are drawn from the nodes in view while there are at most this many;
+# as dots only edges with both ends in view are drawn
+MAX_EDGE_NODES = 5000
+
+NODE_W = DX * 0.85
+NODE_H = DY * 0.55
+
+UNASSIGNED_COLOR = QColor(130, 130, 130)
+SELECTED_COLOR = QColor(255, 220, 90)
+# Opaque: blending long edges costs more than everything else in a frame
+EDGE_COLOR = QColor(70, 70, 70)
+CLUSTER_EDGE_COLOR = QColor(120, 120, 120, 90)
+BACKGROUND = QColor(18, 18, 18)
+
+_colors = {}
+
+
+def section_color(section):
+    """A stable colour per section name"""
+    color = _colors.get(section)
+    if color is None:
+        if section == UNASSIGNED:
+            color = UNASSIGNED_COLOR
+        else:
+            color = QColor.fromHsv(zlib.crc32(section.encode('utf-8')) % 360, 150, 215)
+        _colors[section] = color
+    return color
+
+
+class LayoutWorker(QObject):
+    finished = pyqtSignal(object, float, int)  # GraphSnapshot, seconds, generation
+
+    def __init__(self):
+        super().__init__()
+        self.layout = GraphLayout()
+        # Set from the GUI thread; requests queued behind a newer one are
+        # skipped, the next run diffs against whatever was laid out last
+        self.latest = 0
+
+    @pyqtSlot(object, object, int)
+    def run(self, rows, sections, generation):
+        if generation != self.latest:
+            return
+        start = time.perf_counter()
+        snapshot = self.layout.run(rows, sections)
+        self.finished.emit(snapshot, time.perf_counter() - start, generation)
+
+
+class GraphView(QWidget):
+    """Pan and zoom view of a GraphSnapshot that only draws what is in view"""
+    activated = pyqtSignal(str)  # variable name
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.snapshot = None
+        self.scale = 0.5
+        self.cx = 0.0
+        self.cy = 0.0
+        self.selected = None
+        self._press = None
+        self._dragged = False
+        self.setMinimumSize(200, 150)
+        self.setMouseTracking(False)
+
+    def set_snapshot(self, snapshot):
+        first = self.snapshot is None
+        self.snapshot = snapshot
+        if first:
+            self.fit()
+        self.update()
+
+    def clear(self):
+        # The next snapshot is fitted to the view again
+        self.snapshot = None
+        self.selected = None
+        self.update()
+
+    # ------------ Coordinates ------------
+    def to_screen(self, x, y):
+        return QPointF((x - self.cx) * self.scale + self.width() / 2,
+                       (y - self.cy) * self.scale + self.height() / 2)
+
+    def to_world(self, point):
+        return ((point.x() - self.width() / 2) / self.scale + self.cx,
+                (point.y() - self.height() / 2) / self.scale + self.cy)
+
+    def fit(self):
+        if self.snapshot is None:
+            return
+        left, top, right, bottom = self.snapshot.bounds
+        self.cx = (left + right) / 2
+        self.cy = (top + bottom) / 2
+        self.scale = max(MIN_SCALE, min(MAX_SCALE, self.width() / max(right - left, 1),
+                                        self.height() / max(bottom - top, 1)))
+        self.update()
+
+    def center_on(self, name):
+        self.selected = name
+        if self.snapshot is not None and name in self.snapshot:
+            self.cx, self.cy = self.snapshot.position(name)
+            self.scale = max(self.scale, LABEL_SCALE)
+        self.update()
+
+    # ------------ Painting ------------
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), BACKGROUND)
+        snapshot = self.snapshot
+        if snapshot is None:
+            painter.setPen(Qt.GlobalColor.gray)
+            painter.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, 'Laying out…')
+            painter.end()
+            return
+        placed = self._in_view()
+        if placed is None:
+            self._paint_clusters(painter, snapshot)
+        else:
+            self._paint_nodes(painter, snapshot, placed)
+        painter.end()
+
+    def _in_view(self):
+        """Nodes to draw individually, or None when sections are drawn as clusters"""
+        if self.snapshot is None or self.scale < CLUSTER_SCALE:
+            return None
+        left, top = self.to_world(QPointF(0, 0))
+        right, bottom = self.to_world(QPointF(self.width(), self.height()))
+        placed = self.snapshot.visible(left - DX, top - DY, right + DX, bottom + DY)
+        return placed if len(placed) <= MAX_DOTS else None
+
+    def _paint_clusters(self, painter, snapshot):
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        clusters = snapshot.clusters
+        if snapshot.cluster_edges:
+            heaviest = max(snapshot.cluster_edges.values())
+            for (a, b), count in snapshot.cluster_edges.items():
+                if a in clusters and b in clusters:
+                    painter.setPen(QPen(CLUSTER_EDGE_COLOR, 1 + 5 * math.log1p(count) / math.log1p(heaviest)))
+                    painter.drawLine(self.to_screen(clusters[a].x, clusters[a].y),
+                                     self.to_screen(clusters[b].x, clusters[b].y))
+        for cluster in clusters.values():
+            centre = self.to_screen(cluster.x, cluster.y)
+            radius = max(cluster.radius * self.scale, 4.0)
+            color = section_color(cluster.section)
+            painter.setPen(QPen(color.lighter(130), 1))
+            painter.setBrush(QColor(color.red(), color.green(), color.blue(), 120))
+            painter.drawEllipse(centre, radius, radius)
+            painter.setPen(Qt.GlobalColor.white)
+            painter.drawText(QRectF(centre.x() - 100, centre.y() - 10, 200, 20), Qt.AlignmentFlag.AlignCenter,
+                             f'{cluster.section} ({cluster.count})')
+
+    def _paint_nodes(self, painter, snapshot, placed):
+        scale = self.scale
+        ox = self.width() / 2 - self.cx * scale
+        oy = self.height() / 2 - self.cy * scale
+        screen = {n: QPointF(x * scale + ox, y * scale + oy) for n, x, y in placed}
+        names = [n for n, _, _ in placed]
+        position = snapshot.position
+
+        # Edges from the nodes in view, drawn as one batch
+        labelled = self.scale >= LABEL_SCALE
+        if len(names) <= MAX_EDGE_NODES:
+            lines = []
+            for n in names:
+                start = screen[n]
+                for r in snapshot.refs.get(n, ()):
+                    end = screen.get(r)
+                    if end is not None:
+                        lines.append(QLineF(start, end))
+                    elif labelled:
+                        lines.append(QLineF(start, self.to_screen(*position(r))))
+            painter.setPen(QPen(EDGE_COLOR, 1))
+            painter.drawLines(lines)
+        by_section = {}
+        section_of = snapshot.sections.get
+        for n in names:
+            by_section.setdefault(section_of(n, UNASSIGNED), []).append(n)
+        if not labelled:
+            size = max(2.0, NODE_H * self.scale)
+            for section, members in by_section.items():
+                painter.setPen(QPen(section_color(section), size))
+                painter.drawPoints(QPolygonF([screen[n] for n in members]))
+        else:
+            w = NODE_W * self.scale
+            h = NODE_H * self.scale
+            metrics = painter.fontMetrics()
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+            for section, members in by_section.items():
+                color = section_color(section)
+                painter.setBrush(color.darker(250))
+                painter.setPen(QPen(color, 1))
+                for n in members:
+                    p = screen[n]
+                    painter.drawRoundedRect(QRectF(p.x() - w / 2, p.y() - h / 2, w, h), 4, 4)
+            painter.setPen(Qt.GlobalColor.white)
+            for n in names:
+                p = screen[n]
+                rect = QRectF(p.x() - w / 2 + 3, p.y() - h / 2, w - 6, h)
+                text = metrics.elidedText(n, Qt.TextElideMode.ElideRight, int(rect.width()))
+                painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, text)
+        if self.selected in screen:
+            p = screen[self.selected]
+            size = max(NODE_W * self.scale, 8.0)
+            painter.setBrush(Qt.BrushStyle.NoBrush)
+            painter.setPen(QPen(SELECTED_COLOR, 2))
+            painter.drawRect(QRectF(p.x() - size / 2, p.y() - size / 4, size, size / 2))
+
+    # ------------ Interaction ------------
+    def wheelEvent(self, event):
+        steps = event.angleDelta().y() / 120
+        if not steps:
+            return
+        anchor = event.position()
+        x, y = self.to_world(anchor)
+        self.scale = max(MIN_SCALE, min(MAX_SCALE, self.scale * 1.25 ** steps))
+        # Keep the point under the cursor fixed
+        self.cx = x - (anchor.x() - self.width() / 2) / self.scale
+        self.cy = y - (anchor.y() - self.height() / 2) / self.scale
+        self.update()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            self._press = (event.position(), self.cx, self.cy)
+            self._dragged = False
+
+    def mouseMoveEvent(self, event):
+        if self._press is None:
+            return
+        start, cx, cy = self._press
+        delta = event.position() - start
+        if abs(delta.x()) + abs(delta.y()) > 4:
+            self._dragged = True
+        if self._dragged:
+            self.cx = cx - delta.x() / self.scale
+            self.cy = cy - delta.y() / self.scale
+            self.update()
+
+    def mouseReleaseEvent(self, event):
+        if self._press is None:
+            return
+        self._press = None
+        if self._dragged or self.snapshot is None:
+            return
+        x, y = self.to_world(event.position())
+        if self._in_view() is None:
+            # Clicking a cluster zooms into it
+            for cluster in self.snapshot.clusters.values():
+                if (cluster.x - x) ** 2 + (cluster.y - y) ** 2 <= cluster.radius ** 2:
+                    self.cx, self.cy = cluster.x, cluster.y
+                    self.scale = max(self.scale * 4, CLUSTER_SCALE * 2)
+                    self.update()
+                    return
+            return
+        name = self.snapshot.nearest(x, y, max(NODE_W / 2, 6 / self.scale))
+        if name is not None:
+            self.selected = name
+            self.update()
+            self.activated.emit(name)
+
+
+class GraphPanel(QWidget):
+    """Dependency graph of the open file, laid out on a worker thread"""
+    DEBOUNCE_MS = 300
+
+    activated = pyqtSignal(str)  # variable name
+    requested = pyqtSignal(object, object, int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.model = None
+        self.generation = 0
+        self.stale = False
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        bar = QHBoxLayout()
+        self.summary = QLabel('')
+        bar.addWidget(self.summary, 1)
+        fit_button = QPushButton('Fit')
+        bar.addWidget(fit_button)
+        layout.addLayout(bar)
+        self.view = GraphView()
+        self.view.activated.connect(self.activated)
+        fit_button.clicked.connect(self.view.fit)
+        layout.addWidget(self.view, 1)
+
+        self.thread = QThread(self)
+        self.worker = LayoutWorker()
+        self.worker.moveToThread(self.thread)
+        self.requested.connect(self.worker.run)
+        self.worker.finished.connect(self._on_finished)
+        self.thread.start()
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(self.DEBOUNCE_MS)
+        self.timer.timeout.connect(self._dispatch)
+
+    def _signals(self, model):
+        return (model.dataChanged, model.rowsInserted, model.rowsRemoved, model.modelReset, model.sectionsChanged)
+
+    def set_model(self, model):
+        if self.model is not None:
+            for signal in self._signals(self.model):
+                try:
+                    signal.disconnect(self._on_model_changed)
+                except TypeError:
+                    pass
+        if model is not self.model:
+            self.view.clear()
+        self.model = model
+        for signal in self._signals(model):
+            signal.connect(self._on_model_changed)
+        self.schedule()
+
+    def _on_model_changed(self, *args):
+        # Only names, expressions and sections change the graph
+        if len(args) > 1 and isinstance(args[1], QModelIndex):  # dataChanged
+            columns = range(args[0].column(), args[1].column() + 1)
+            if 0 not in columns and 1 not in columns and SECTION_COLUMN not in columns:
+                return
+            if len(args) > 2 and list(args[2]) == [Qt.ItemDataRole.BackgroundRole]:
+                return
+        self.schedule()
+
+    def schedule(self):
+        if self.isVisible():
+            self.timer.start()
+        else:
+            # Laid out when the panel is shown again
+            self.stale = True
+
+    def _dispatch(self):
+        if self.model is None:
+            return
+        self.stale = False
+        self.generation += 1
+        self.worker.latest = self.generation
+        self.summary.setText('Laying out…')
+        self.requested.emit(self.model.snapshot(), dict(self.model.name_to_section), self.generation)
+
+    def _on_finished(self, snapshot, seconds, generation):
+        if generation != self.generation:
+            return
+        self.view.set_snapshot(snapshot)
+        self.summary.setText(f'{len(snapshot)} variables, {snapshot.edge_count} references, '
+                             f'{len(snapshot.layers)} layers ({seconds * 1000:.0f} ms)')
+
+    def show_name(self, name):
+        self.view.center_on(name)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.stale:
+            self._dispatch()
+
+    def shutdown(self):
+        self.timer.stop()
+        self.thread.quit()
+        self.thread.wait()
@@ -1,6 +1,8 @@
 from PyQt6.QtGui import QSyntaxHighlighter, QTextCharFormat, QColor
 from PyQt6.QtCore import QRegularExpression
 
+from expressions import CONSTANTS, FUNCTIONS, SW_FILE_PROPERTIES
+
 
 class ExpressionHighlighter(QSyntaxHighlighter):
     def __init__(self, doc, get_known_names_callable):
@@ -24,25 +26,15 @@ class ExpressionHighlighter(QSyntaxHighlighter):
         self.constant_format = QTextCharFormat()
         self.constant_format.setForeground(QColor(100, 255, 100))  # green for constants
 
-        # Define the categories from editors.py
-        self.SW_FILE_PROPERTIES = [
-            'SW-Mass', 'SW-Volume', 'SW-SurfaceArea',
-            'SW-CenterofMassX', 'SW-CenterofMassY', 'SW-CenterofMassZ',
-            'SW-Density', 'SW-Px', 'SW-Py', 'SW-Pz',
-            'SW-Lxx', 'SW-Lxy', 'SW-Lxz', 'SW-Lyx', 'SW-Lyy', 'SW-Lyz', 'SW-Lzx', 'SW-Lzy', 'SW-Lzz'
-        ]
-        
-        self.FUNCTIONS = {
-            'sin': ('',), 'cos': ('',), 'tan': ('',), 'sec': ('',), 'cosec': ('',), 'cotan': ('',),
-            'arcsin': ('',), 'arccos': ('',), 'arctan': ('',), 'arcsec': ('',), 'arccotan': ('',),
-            'abs': ('',), 'exp': ('',), 'log': ('',), 'ln': ('',), 'sqr': ('',), 'sqrt': ('',),
-            'int': ('',), 'sgn': ('',), 'max': ('', ''), 'min': ('', ''), 'if': ('', '', ''),
-        }
-        
-        self.CONSTANTS = ['pi', 'e']
+        # Shared categories from expressions.py
+        self.SW_FILE_PROPERTIES = SW_FILE_PROPERTIES
+        self.FUNCTIONS = FUNCTIONS
+        self.CONSTANTS = CONSTANTS
 
     def highlightBlock(self, text: str):
-        known = set(self.get_known_names())
+        known = self.get_known_names()
+        if not isinstance(known, (set, frozenset)):
+            known = set(known)
         
         # Highlight quoted strings (variable names and SW file properties in equations)
         it = self.quote_re.globalMatch(text)
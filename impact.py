@@ -0,0 +1,138 @@
+"""Impact analysis: what a variable drives and what drives it.
+
+The ImpactIndex keeps the reference graph as adjacency lists over dense
+integer ids. Transitive closures are computed on demand as byte masks
+(one byte per id), so membership tests for painting rows are a single
+index, and the most recently used closures are cached. Edits update the
+adjacency of the changed names only and drop just the cached closures
+that an edit can reach; everything else stays cached across edits.
+"""
+from collections import OrderedDict, namedtuple
+
+UPSTREAM = 'upstream'
+DOWNSTREAM = 'downstream'
+
+# mask: bytearray over ids (1 = member); members: ids in discovery order
+Closure = namedtuple('Closure', 'mask members')
+
+
+class ImpactIndex:
+    CACHE_SIZE = 64
+
+    def __init__(self, graph):
+        """graph maps each name to the defined names its expression references"""
+        self._ids = {}
+        self._names = []
+        self._refs = []
+        self._users = []
+        self._free = []
+        self._cache = OrderedDict()  # (direction, id) -> Closure
+        for name in graph:
+            self._id(name)
+        for name, refs in graph.items():
+            self._set_refs(self._ids[name], [self._id(r) for r in refs])
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, name):
+        return name in self._ids
+
+    def _id(self, name):
+        i = self._ids.get(name)
+        if i is None:
+            if self._free:
+                i = self._free.pop()
+                self._names[i] = name
+            else:
+                i = len(self._names)
+                self._names.append(name)
+                self._refs.append([])
+                self._users.append([])
+            self._ids[name] = i
+        return i
+
+    def _set_refs(self, i, refs):
+        for r in self._refs[i]:
+            self._users[r].remove(i)
+        self._refs[i] = refs
+        for r in refs:
+            self._users[r].append(i)
+
+    # ------------ Incremental updates ------------
+    def update(self, changes):
+        """Apply {name: referenced names, or None if the name is gone}"""
+        touched = []
+        for name, refs in changes.items():
+            i = self._id(name)
+            new = [] if refs is None else [self._id(r) for r in refs]
+            touched.append((i, self._refs[i], new))
+            self._set_refs(i, new)
+        self._invalidate(touched)
+        for name, refs in changes.items():
+            if refs is None:
+                i = self._ids.pop(name)
+                self._names[i] = None
+                self._free.append(i)
+
+    def _invalidate(self, touched):
+        # A downstream closure changes if an edited edge starts inside it;
+        # an upstream closure changes if an edited name lies inside it
+        stale = []
+        for (direction, start), closure in self._cache.items():
+            mask = closure.mask
+            for i, old, new in touched:
+                if direction == UPSTREAM:
+                    hit = i == start or (i < len(mask) and mask[i])
+                else:
+                    hit = any(r == start or (r < len(mask) and mask[r]) for r in old + new)
+                if hit:
+                    stale.append((direction, start))
+                    break
+        for key in stale:
+            del self._cache[key]
+
+    # ------------ Queries ------------
+    def closure(self, name, direction):
+        """Closure of everything name drives (DOWNSTREAM) or depends on (UPSTREAM)"""
+        start = self._ids[name]
+        key = (direction, start)
+        closure = self._cache.get(key)
+        if closure is not None:
+            self._cache.move_to_end(key)
+            return closure
+        adjacency = self._users if direction == DOWNSTREAM else self._refs
+        mask = bytearray(len(self._names))
+        members = []
+        append = members.append
+        # Breadth-first; the member list doubles as the queue
+        for frontier in ([start], members):
+            for k in frontier:
+                for j in adjacency[k]:
+                    if not mask[j]:
+                        mask[j] = 1
+                        append(j)
+        closure = Closure(mask, members)
+        self._cache[key] = closure
+        if len(self._cache) > self.CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return closure
+
+    def contains(self, closure, name):
+        i = self._ids.get(name)
+        return i is not None and i < len(closure.mask) and bool(closure.mask[i])
+
+    def names(self, ids):
+        return [self._names[i] for i in ids]
+
+    def direct(self, name, direction):
+        i = self._ids[name]
+        return self.names(self._users[i] if direction == DOWNSTREAM else self._refs[i])
+
+    def unused(self):
+        """Names nothing references"""
+        return [n for n, i in self._ids.items() if not self._users[i]]
+
+    def roots(self):
+        """Names referencing no other equation: the driving inputs"""
+        return [n for n, i in self._ids.items() if not self._refs[i]]
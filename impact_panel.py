@@ -0,0 +1,146 @@
+from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtGui import QColor
+from PyQt6.QtWidgets import QCheckBox, QLabel, QTabWidget, QTreeWidget, QTreeWidgetItem, QVBoxLayout, QWidget
+
+from impact import DOWNSTREAM, UPSTREAM
+
+# Cap on names listed per tab; counts always cover the whole closure
+MAX_ITEMS = 5000
+
+SELECTED_COLOR = QColor(90, 90, 40)
+DOWNSTREAM_COLOR = QColor(110, 60, 30)
+UPSTREAM_COLOR = QColor(30, 70, 110)
+
+
+class ImpactPanel(QWidget):
+    """Everything a variable drives and depends on, plus unused variables and roots"""
+    activated = pyqtSignal(str)  # variable name
+
+    def __init__(self, lint, parent=None):
+        super().__init__(parent)
+        self.lint = lint
+        self.model = None
+        self.name = None
+        self.closures = {DOWNSTREAM: [], UPSTREAM: []}  # ids, in discovery order
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.summary = QLabel('Select an equation to see its impact')
+        self.summary.setWordWrap(True)
+        layout.addWidget(self.summary)
+        self.highlight_box = QCheckBox('Highlight in table')
+        self.highlight_box.setChecked(True)
+        self.highlight_box.toggled.connect(lambda _: self.refresh())
+        layout.addWidget(self.highlight_box)
+
+        self.tabs = QTabWidget()
+        self.lists = {}
+        for key in (DOWNSTREAM, UPSTREAM, 'unused', 'roots'):
+            tree = QTreeWidget()
+            tree.setHeaderLabels(['Variable', 'Depth'])
+            tree.setRootIsDecorated(False)
+            tree.itemActivated.connect(lambda item, col: self.activated.emit(item.text(0)))
+            self.lists[key] = tree
+            self.tabs.addTab(tree, '')
+        self.tabs.currentChanged.connect(lambda _: self._populate_tab())
+        layout.addWidget(self.tabs)
+        self._set_titles()
+
+        lint.updated.connect(self.refresh)
+
+    def set_model(self, model):
+        if self.model is not None and self.model is not model:
+            self.model.set_highlight(None)
+        self.model = model
+        self.name = None
+        self.refresh()
+
+    def show_name(self, name):
+        self.name = name
+        self.refresh()
+
+    def refresh(self):
+        """Re-read the closures; unaffected ones come straight from the index cache"""
+        index = self.lint.impact
+        if self.model is None or index is None or not self.isVisible():
+            return
+        if self.name is None or self.name not in index:
+            self.summary.setText('Select an equation to see its impact' if self.name is None
+                                 else f'"{self.name}" is not in the index yet')
+            self.closures = {DOWNSTREAM: [], UPSTREAM: []}
+            self._set_titles()
+            self._apply_highlight()
+            self._populate_tab()
+            return
+        down = index.closure(self.name, DOWNSTREAM)
+        up = index.closure(self.name, UPSTREAM)
+        depth = self.model.depths.get(self.name)
+        self.summary.setText(
+            f'"{self.name}" (depth {depth if depth is not None else "-"}) drives {len(down.members)} variable(s), '
+            f'{len(index.direct(self.name, DOWNSTREAM))} directly, and depends on {len(up.members)}')
+        self.closures = {DOWNSTREAM: down.members, UPSTREAM: up.members}
+        self._set_titles(len(down.members), len(up.members))
+        self._apply_highlight(down, up)
+        self._populate_tab()
+
+    def _populate_tab(self):
+        # Only the tab being looked at is filled; the overview tabs scan the whole file
+        index = self.lint.impact
+        if index is None:
+            return
+        key = list(self.lists)[self.tabs.currentIndex()]
+        if key in self.closures:
+            self._fill(key, index.names(self.closures[key][:MAX_ITEMS]))
+            return
+        names = index.unused() if key == 'unused' else index.roots()
+        self._fill(key, names[:MAX_ITEMS])
+        self.tabs.setTabText(self.tabs.currentIndex(), f'{key.capitalize()} ({len(names)})')
+
+    def _set_titles(self, drives=0, depends=0):
+        self.tabs.setTabText(0, f'Drives ({drives})')
+        self.tabs.setTabText(1, f'Depends on ({depends})')
+        self.tabs.setTabText(2, self.tabs.tabText(2) or 'Unused')
+        self.tabs.setTabText(3, self.tabs.tabText(3) or 'Roots')
+
+    def _fill(self, key, names):
+        tree = self.lists[key]
+        tree.clear()
+        depths = self.model.depths if self.model is not None else {}
+        ordered = sorted(names, key=lambda n: (depths.get(n, -1), n))
+        items = []
+        for n in ordered:
+            depth = depths.get(n)
+            item = QTreeWidgetItem([n, '' if depth is None else str(depth)])
+            item.setTextAlignment(1, Qt.AlignmentFlag.AlignRight)
+            items.append(item)
+        tree.addTopLevelItems(items)
+        tree.resizeColumnToContents(0)
+
+    def _apply_highlight(self, down=None, up=None):
+        if self.model is None:
+            return
+        index = self.lint.impact
+        if not self.highlight_box.isChecked() or self.name is None or index is None or down is None:
+            self.model.set_highlight(None)
+            return
+        selected = self.name
+
+        def highlight(name):
+            if name == selected:
+                return SELECTED_COLOR
+            if index.contains(down, name):
+                return DOWNSTREAM_COLOR
+            if index.contains(up, name):
+                return UPSTREAM_COLOR
+            return None
+
+        self.model.set_highlight(highlight)
+
+    def hideEvent(self, event):
+        if self.model is not None:
+            self.model.set_highlight(None)
+        super().hideEvent(event)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
@@ -0,0 +1,205 @@
+"""Streaming import and export of equation sets.
+
+Three formats carry the same fields (name, expression, section, comment,
+value):
+
+- ``csv``: one equation per row under a header row.
+- ``jsonl``: one JSON object per line.
+- ``design-table``: the spreadsheet layout of a SolidWorks design table,
+  with one column per variable and one row per field.
+
+CSV files are written with a UTF-8 byte order mark so Excel picks the
+right encoding. Everything works on generators: exporters pull records
+one at a time and importers yield them as they are read. The one
+exception is the design table, whose rows are as wide as the equation
+set. Each of its rows is a separate pass over the records, and reading
+it back holds the name row.
+"""
+import csv
+import json
+from itertools import islice
+from pathlib import Path
+
+FIELDS = ('name', 'expression', 'section', 'comment', 'value')
+FORMATS = ('csv', 'jsonl', 'design-table')
+# Header spellings accepted on import
+ALIASES = {'variable': 'name', 'expr': 'expression', 'equation': 'expression'}
+DESIGN_TABLE_CORNER = 'Field'
+
+
+class InterchangeError(ValueError):
+    pass
+
+
+def format_for(path: Path) -> str:
+    """Format implied by a file suffix; design tables must be asked for"""
+    suffix = Path(path).suffix.lower()
+    if suffix in ('.jsonl', '.ndjson', '.json'):
+        return 'jsonl'
+    return 'csv'
+
+
+def records(rows, cfg=None, values=None):
+    """Export records for (name, expr) rows; values maps names to numbers"""
+    cfg = cfg or {}
+    section_of = {n: sec for sec, names in cfg.get('sections', {}).items() for n in names}
+    comments = cfg.get('comments', {})
+    values = values or {}
+    for name, expr in rows:
+        yield {
+            'name': name,
+            'expression': expr,
+            'section': section_of.get(name, 'Unassigned'),
+            'comment': comments.get(name, ''),
+            'value': values.get(name),
+        }
+
+
+def chunks(iterable, size):
+    """Lists of up to size items"""
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _cell(value):
+    return '' if value is None else value
+
+
+# ------------ Writers ------------
+def write_csv(f, recs, fields=FIELDS):
+    writer = csv.writer(f)
+    writer.writerow(fields)
+    count = 0
+    for rec in recs:
+        writer.writerow([_cell(rec[k]) for k in fields])
+        count += 1
+    return count
+
+
+def write_jsonl(f, recs, fields=FIELDS):
+    count = 0
+    for rec in recs:
+        f.write(json.dumps({k: rec[k] for k in fields}, ensure_ascii=False))
+        f.write('\n')
+        count += 1
+    return count
+
+
+def write_design_table(f, make_records, fields=FIELDS):
+    """make_records() is called once per row of the table"""
+    if 'name' not in fields:
+        raise InterchangeError('a design table needs the name field')
+    for field in fields:
+        f.write(DESIGN_TABLE_CORNER if field == 'name' else field.capitalize())
+        count = 0
+        # One cell at a time, so the row never exists as a list
+        for rec in make_records():
+            f.write(',')
+            f.write(_quote(rec[field]))
+            count += 1
+        f.write('\r\n')
+    return count
+
+
+def _quote(value):
+    text = str(_cell(value))
+    if any(c in text for c in ',"\r\n'):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+def export(path: Path, fmt, make_records, fields=FIELDS):
+    """Write records to path; returns the number of equations written"""
+    if fmt not in FORMATS:
+        raise InterchangeError(f'unknown format {fmt!r}')
+    unknown = [k for k in fields if k not in FIELDS]
+    if unknown:
+        raise InterchangeError(f'unknown field(s): {", ".join(unknown)}')
+    if fmt == 'jsonl':
+        with open(path, 'w', encoding='utf-8', newline='\n') as f:
+            return write_jsonl(f, make_records(), fields)
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        if fmt == 'csv':
+            return write_csv(f, make_records(), fields)
+        return write_design_table(f, make_records, fields)
+
+
+# ------------ Readers ------------
+def _normalize(rec, where):
+    out = {}
+    for key, value in rec.items():
+        if key is None:
+            continue
+        key = str(key).strip().lower()
+        key = ALIASES.get(key, key)
+        if key in FIELDS:
+            out[key] = '' if value is None else str(value).strip()
+    name = out.get('name', '').strip('"')
+    if not name:
+        raise InterchangeError(f'{where}: missing variable name')
+    if not out.get('expression'):
+        raise InterchangeError(f'{where}: "{name}" has no expression')
+    out['name'] = name
+    return out
+
+
+def read_csv(f):
+    for i, row in enumerate(csv.DictReader(f), start=2):
+        if any(row.values()):
+            yield _normalize(row, f'line {i}')
+
+
+def read_jsonl(f):
+    for i, line in enumerate(f, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            rec = json.loads(line)
+        except ValueError as e:
+            raise InterchangeError(f'line {i}: {e}') from e
+        if not isinstance(rec, dict):
+            raise InterchangeError(f'line {i}: expected an object')
+        yield _normalize(rec, f'line {i}')
+
+
+def read_design_table(f):
+    rows = csv.reader(f)
+    header = next(rows, None)
+    if not header:
+        return
+    names = header[1:]
+    columns = {}
+    for row in rows:
+        if not row or not row[0].strip():
+            continue
+        field = row[0].strip().lower()
+        columns[ALIASES.get(field, field)] = row[1:]
+    if 'expression' not in columns:
+        raise InterchangeError('design table has no Expression row')
+    for i, name in enumerate(names):
+        if not name.strip():
+            continue
+        rec = {k: (cells[i] if i < len(cells) else '') for k, cells in columns.items()}
+        rec['name'] = name
+        yield _normalize(rec, f'column {i + 2}')
+
+
+def read(path: Path, fmt=None):
+    """Records from a file; fmt defaults to the one implied by the suffix"""
+    fmt = fmt or format_for(path)
+    if fmt not in FORMATS:
+        raise InterchangeError(f'unknown format {fmt!r}')
+    if fmt == 'jsonl':
+        with open(path, encoding='utf-8-sig') as f:
+            yield from read_jsonl(f)
+        return
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        if fmt == 'csv':
+            yield from read_csv(f)
+        else:
+            yield from read_design_table(f)
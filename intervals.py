@@ -0,0 +1,298 @@
+"""Interval arithmetic: guaranteed bounds on every value from input ranges.
+
+Inputs get a range in cfg['ranges'] ({"width": [10, 12]} in document
+units). Inputs with a tolerance band but no range use the band around
+their current value. One pass over the compiled expressions with the
+INTERVAL backend then gives each derived value an interval containing
+every value it can take.
+
+Bounds are not rounded outward, so they hold up to floating point
+rounding. A name referenced more than once in an expression makes its
+interval wider than the true range (x - x gives [-w, w]), never narrower.
+"""
+import math
+from functools import reduce
+
+from evaluation import DEG, RAD, EvaluationError, FloatBackend, format_value
+from tolerances import ToleranceError, parse_tolerance
+
+INF = math.inf
+
+
+class Interval:
+    __slots__ = ('lo', 'hi')
+
+    def __init__(self, lo, hi=None):
+        self.lo = float(lo)
+        self.hi = self.lo if hi is None else float(hi)
+
+    def __repr__(self):
+        return f'Interval({self.lo!r}, {self.hi!r})'
+
+    def __eq__(self, other):
+        return isinstance(other, Interval) and self.lo == other.lo and self.hi == other.hi
+
+    __hash__ = None
+
+    def contains_zero(self):
+        return self.lo <= 0 <= self.hi
+
+    def hull(self, other):
+        other = _interval(other)
+        return Interval(min(self.lo, other.lo), max(self.hi, other.hi))
+
+    def __add__(self, other):
+        other = _interval(other)
+        return Interval(self.lo + other.lo, self.hi + other.hi)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        other = _interval(other)
+        return Interval(self.lo - other.hi, self.hi - other.lo)
+
+    def __rsub__(self, other):
+        return _interval(other) - self
+
+    def __mul__(self, other):
+        other = _interval(other)
+        products = [_mul(a, b) for a in (self.lo, self.hi) for b in (other.lo, other.hi)]
+        return Interval(min(products), max(products))
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        return self * _reciprocal(_interval(other))
+
+    def __rtruediv__(self, other):
+        return _interval(other) * _reciprocal(self)
+
+    def __neg__(self):
+        return Interval(-self.hi, -self.lo)
+
+
+def _interval(x):
+    return x if isinstance(x, Interval) else Interval(x)
+
+
+def _mul(a, b):
+    # 0 * inf is 0 here: a zero bound times an unbounded one stays zero
+    return 0.0 if a == 0 or b == 0 else a * b
+
+
+def _reciprocal(x):
+    if x.lo == x.hi == 0:
+        raise EvaluationError('Division by zero')
+    if x.lo > 0 or x.hi < 0:
+        return Interval(1.0 / x.hi, 1.0 / x.lo)
+    if x.lo == 0:
+        return Interval(1.0 / x.hi, INF)
+    if x.hi == 0:
+        return Interval(-INF, 1.0 / x.lo)
+    return Interval(-INF, INF)
+
+
+def _reaches(lo, hi, angle, period):
+    """True if angle + k * period lies in [lo, hi] for some integer k"""
+    return angle + period * math.ceil((lo - angle) / period) <= hi
+
+
+def _sin(x, shift=0.0):
+    # Degrees; cos(x) is sin(x + 90)
+    lo, hi = x.lo + shift, x.hi + shift
+    if not math.isfinite(lo) or not math.isfinite(hi) or hi - lo >= 360:
+        return Interval(-1.0, 1.0)
+    ends = (math.sin(lo * RAD), math.sin(hi * RAD))
+    low = -1.0 if _reaches(lo, hi, 270, 360) else min(ends)
+    high = 1.0 if _reaches(lo, hi, 90, 360) else max(ends)
+    return Interval(low, high)
+
+
+def _tan(x):
+    if not math.isfinite(x.lo) or not math.isfinite(x.hi) or _reaches(x.lo, x.hi, 90, 180):
+        return Interval(-INF, INF)
+    return Interval(math.tan(x.lo * RAD), math.tan(x.hi * RAD))
+
+
+def _clip(x, lo, hi, func):
+    """x limited to the domain [lo, hi] of func"""
+    if x.hi < lo or x.lo > hi:
+        raise EvaluationError(f'{func}() is undefined over the whole range')
+    return Interval(max(x.lo, lo), min(x.hi, hi))
+
+
+def _increasing(fn):
+    return lambda x: Interval(fn(x.lo), fn(x.hi))
+
+
+def _decreasing(fn):
+    return lambda x: Interval(fn(x.hi), fn(x.lo))
+
+
+def _log(x):
+    if x.hi <= 0:
+        raise EvaluationError('log() is undefined over the whole range')
+    return Interval(math.log(x.lo) if x.lo > 0 else -INF, math.log(x.hi))
+
+
+def _abs(x):
+    if x.contains_zero():
+        return Interval(0.0, max(-x.lo, x.hi))
+    return Interval(min(abs(x.lo), abs(x.hi)), max(abs(x.lo), abs(x.hi)))
+
+
+def _power(x, n):
+    """x ** n for a non-negative integer n"""
+    def p(v):
+        try:
+            return v ** n
+        except OverflowError:
+            return math.copysign(INF, v) if n % 2 else INF
+    if n % 2 or x.lo >= 0:
+        return Interval(p(x.lo), p(x.hi))
+    if x.hi <= 0:
+        return Interval(p(x.hi), p(x.lo))
+    return Interval(0.0, p(max(-x.lo, x.hi)))
+
+
+def _corner_pow(x, y):
+    try:
+        return math.pow(x, y)
+    except (OverflowError, ValueError, ZeroDivisionError):
+        # 0 ** negative, or too large
+        return INF
+
+
+def _exp(v):
+    try:
+        return math.exp(v)
+    except OverflowError:
+        return INF
+
+
+INTERVAL_FUNCTIONS = {
+    'sin': _sin,
+    'cos': lambda x: _sin(x, 90.0),
+    'tan': _tan,
+    'sec': lambda x: 1.0 / _sin(x, 90.0),
+    'cosec': lambda x: 1.0 / _sin(x),
+    'cotan': lambda x: 1.0 / _tan(x),
+    'arcsin': lambda x: _increasing(lambda v: math.asin(v) * DEG)(_clip(x, -1.0, 1.0, 'arcsin')),
+    'arccos': lambda x: _decreasing(lambda v: math.acos(v) * DEG)(_clip(x, -1.0, 1.0, 'arccos')),
+    'arctan': _increasing(lambda v: math.atan(v) * DEG),
+    'arcsec': lambda x: INTERVAL_FUNCTIONS['arccos'](1.0 / x),
+    'arccotan': lambda x: INTERVAL_FUNCTIONS['arctan'](1.0 / x),
+    'abs': _abs,
+    'exp': _increasing(_exp),
+    'log': _log,
+    'ln': _log,
+    'sqr': lambda x: _power(x, 2),
+    'sqrt': lambda x: _increasing(math.sqrt)(_clip(x, 0.0, INF, 'sqrt')),
+    'int': _increasing(lambda v: float(math.floor(v)) if math.isfinite(v) else v),
+    'sgn': _increasing(lambda v: float((v > 0) - (v < 0))),
+    'max': lambda a, b: Interval(max(a.lo, b.lo), max(a.hi, b.hi)),
+    'min': lambda a, b: Interval(min(a.lo, b.lo), min(a.hi, b.hi)),
+}
+
+
+def _contains_integer(x):
+    if not (math.isfinite(x.lo) and math.isfinite(x.hi)):
+        return True
+    return math.floor(x.hi) >= math.ceil(x.lo)
+
+
+class IntervalBackend(FloatBackend):
+    """Evaluates over Intervals; plain numbers go through FloatBackend"""
+
+    def call(self, func, args):
+        if not any(isinstance(a, Interval) for a in args):
+            return super().call(func, args)
+        return INTERVAL_FUNCTIONS[func](*(_interval(a) for a in args))
+
+    def pow(self, a, b):
+        if not isinstance(a, Interval) and not isinstance(b, Interval):
+            return super().pow(a, b)
+        a, b = _interval(a), _interval(b)
+        if b.lo == b.hi and b.lo.is_integer():
+            n = int(b.lo)
+            if n == 0:
+                return 1.0
+            return _power(a, n) if n > 0 else 1.0 / _power(a, -n)
+        if a.lo < 0 and _contains_integer(b):
+            # A negative base is valid at every integer exponent in the range,
+            # where the sign flips with the parity; nothing tighter is safe
+            return Interval(-INF, INF)
+        if a.hi < 0:
+            raise EvaluationError('Negative base with a non-integer exponent')
+        # x ** y is monotonic in each argument for x >= 0, so the extremes
+        # are at the corners
+        corners = [_corner_pow(x, y) for x in (max(a.lo, 0.0), a.hi) for y in (b.lo, b.hi)]
+        return Interval(min(corners), max(corners))
+
+    def compare(self, op, a, b):
+        if not isinstance(a, Interval) and not isinstance(b, Interval):
+            return super().compare(op, a, b)
+        a, b = _interval(a), _interval(b)
+        if op in ('>', '>='):
+            a, b, op = b, a, '<' if op == '>' else '<='
+        if op == '<':
+            certain, impossible = a.hi < b.lo, a.lo >= b.hi
+        elif op == '<=':
+            certain, impossible = a.hi <= b.lo, a.lo > b.hi
+        else:
+            certain = a.lo == a.hi == b.lo == b.hi
+            impossible = a.hi < b.lo or b.hi < a.lo
+            if op == '<>':
+                certain, impossible = impossible, certain
+        if certain:
+            return 1.0
+        if impossible:
+            return 0.0
+        return Interval(0.0, 1.0)
+
+    def select(self, cond, when_true, when_false):
+        if not isinstance(cond, Interval):
+            return super().select(cond, when_true, when_false)
+        if not cond.contains_zero():
+            return when_true()
+        if cond.lo == cond.hi == 0:
+            return when_false()
+        # Either branch can be taken; one that always fails adds nothing
+        results = []
+        for branch in (when_true, when_false):
+            try:
+                results.append(branch())
+            except (EvaluationError, ArithmeticError, ValueError):
+                pass
+        if not results:
+            raise EvaluationError('Both branches of if() fail over the range')
+        return reduce(lambda a, b: _interval(a).hull(b), results)
+
+
+INTERVAL = IntervalBackend()
+
+
+def range_specs(cfg):
+    """Input ranges from a cfg as {name: (lo, hi, relative)}.
+
+    Relative bounds are offsets from the row's current value (tolerance
+    bands); explicit ranges are absolute and win over tolerances.
+    """
+    specs = {}
+    for name, spec in (cfg or {}).get('tolerances', {}).items():
+        try:
+            tolerance = parse_tolerance(spec)
+        except ToleranceError:
+            continue
+        specs[name] = (-tolerance.minus, tolerance.plus, True)
+    for name, bounds in (cfg or {}).get('ranges', {}).items():
+        try:
+            lo, hi = (float(b) for b in bounds)
+        except (TypeError, ValueError):
+            continue
+        specs[name] = (min(lo, hi), max(lo, hi), False)
+    return specs
+
+
+def format_interval(interval, dim=None) -> str:
+    return f'{interval.lo:.6g} … {format_value(interval.hi, dim)}'
@@ -0,0 +1,469 @@
+from collections import namedtuple
+
+from dependencies import condensed_order, downstream, find_cycles
+from evaluation import FLOAT, EvaluationError, compile_expression, gc_paused
+from intervals import INTERVAL, Interval
+from expressions import (
+    ANGLE, CONSTANT_VALUES, DIMENSIONLESS, FUNCTIONS, SW_FILE_PROPERTIES, UNITS,
+    references, try_parse, walk,
+)
+
+Diagnostic = namedtuple('Diagnostic', 'severity message')
+
+ERROR = 'error'
+WARNING = 'warning'
+
+TRIG_FUNCTIONS = {'sin', 'cos', 'tan', 'sec', 'cosec', 'cotan'}
+INVERSE_TRIG_FUNCTIONS = {'arcsin', 'arccos', 'arctan', 'arcsec', 'arccotan'}
+DIMENSION_NAMES = {
+    (1, 0): 'length', (2, 0): 'area', (3, 0): 'volume',
+    (0, 1): 'angle', (0, 0): 'dimensionless',
+}
+
+
+def is_external(name: str) -> bool:
+    """Names that resolve inside SolidWorks rather than in the equations file"""
+    return name in SW_FILE_PROPERTIES or '@' in name
+
+
+def describe_dimension(dim) -> str:
+    if dim in DIMENSION_NAMES:
+        return DIMENSION_NAMES[dim]
+    parts = []
+    for label, exp in zip(('length', 'angle'), dim):
+        if exp:
+            parts.append(label if exp == 1 else f'{label}^{exp}')
+    return '·'.join(parts)
+
+
+def _same_dimension(op, a, b, problems):
+    # None means "unitless number": it adopts whatever it is combined with
+    if a is None:
+        return b
+    if b is None or a == b:
+        return a
+    problems.append(f'Unit mismatch: {describe_dimension(a)} {op} {describe_dimension(b)}')
+    return a
+
+
+def _infer(node, ref_dims, problems):
+    kind = node[0]
+    if kind == 'num':
+        return UNITS[node[2]][1] if node[2] else None
+    if kind == 'ref':
+        return ref_dims.get(node[1])
+    if kind in ('const', 'ident'):
+        return None
+    if kind == 'neg':
+        return _infer(node[1], ref_dims, problems)
+    if kind == 'bin':
+        op = node[1]
+        a = _infer(node[2], ref_dims, problems)
+        if op == '^':
+            exponent = node[3]
+            _infer(exponent, ref_dims, problems)
+            if a is None:
+                return None
+            if exponent[0] == 'num' and exponent[2] is None and float(exponent[1]).is_integer():
+                n = int(exponent[1])
+                return (a[0] * n, a[1] * n)
+            return None
+        b = _infer(node[3], ref_dims, problems)
+        if op in ('+', '-'):
+            return _same_dimension(op, a, b, problems)
+        if op in ('*', '/'):
+            if a is None and b is None:
+                return None
+            a = a or DIMENSIONLESS
+            b = b or DIMENSIONLESS
+            sign = 1 if op == '*' else -1
+            return (a[0] + sign * b[0], a[1] + sign * b[1])
+        # Comparison
+        _same_dimension(op, a, b, problems)
+        return None
+    if kind == 'call':
+        func = node[1]
+        dims = [_infer(arg, ref_dims, problems) for arg in node[2]]
+        if func == 'if':
+            return _same_dimension('vs', dims[1], dims[2], problems) if len(dims) == 3 else None
+        if func in ('max', 'min'):
+            return _same_dimension(',', dims[0], dims[1], problems) if len(dims) == 2 else None
+        arg = dims[0] if dims else None
+        if func in TRIG_FUNCTIONS:
+            if arg not in (None, ANGLE, DIMENSIONLESS):
+                problems.append(f'Unit mismatch: {func} expects an angle, got {describe_dimension(arg)}')
+            return None
+        if func in INVERSE_TRIG_FUNCTIONS:
+            return ANGLE
+        if func in ('abs', 'int'):
+            return arg
+        if func == 'sqr':
+            return None if arg is None else (arg[0] * 2, arg[1] * 2)
+        if func == 'sqrt':
+            if arg is None:
+                return None
+            if arg[0] % 2 or arg[1] % 2:
+                problems.append(f'Unit mismatch: sqrt of {describe_dimension(arg)}')
+                return None
+            return (arg[0] // 2, arg[1] // 2)
+        if func in ('exp', 'log', 'ln') and arg not in (None, DIMENSIONLESS):
+            problems.append(f'Unit mismatch: {func} of {describe_dimension(arg)}')
+        return None
+    return None
+
+
+def lint_expression(expr, known_names, ref_dims=None):
+    """Diagnostics for a single expression and its inferred dimension.
+
+    known_names is the set of defined variable names; ref_dims maps names to
+    their dimensions and is optional (unit checks then treat references as
+    unitless).
+    """
+    ref_dims = ref_dims or {}
+    diagnostics = []
+    for ref in references(expr):
+        if ref not in known_names and not is_external(ref):
+            diagnostics.append(Diagnostic(ERROR, f'Unknown name "{ref}"'))
+    ast, error = try_parse(expr)
+    if error is not None:
+        diagnostics.append(Diagnostic(ERROR, str(error)))
+        return diagnostics, None
+    for node in walk(ast):
+        if node[0] == 'call':
+            func, args = node[1], node[2]
+            if func not in FUNCTIONS:
+                diagnostics.append(Diagnostic(ERROR, f'Unknown function {func}()'))
+            elif len(args) != len(FUNCTIONS[func]):
+                expected = len(FUNCTIONS[func])
+                diagnostics.append(Diagnostic(
+                    ERROR, f'{func}() takes {expected} argument{"s" if expected != 1 else ""}, got {len(args)}'
+                ))
+        elif node[0] == 'ident' and node[1] not in CONSTANT_VALUES:
+            diagnostics.append(Diagnostic(ERROR, f'Unknown identifier {node[1]}'))
+    problems = []
+    dim = _infer(ast, ref_dims, problems)
+    diagnostics.extend(Diagnostic(WARNING, p) for p in dict.fromkeys(problems))
+    return diagnostics, dim
+
+
+class LintEngine:
+    """Incremental linter over a whole equation set.
+
+    The engine keeps the reference graph, cycles and inferred dimensions from
+    the previous pass. A new pass diffs the rows against it and only re-lints
+    rows whose expression changed, rows whose references started or stopped
+    resolving, and rows downstream of those. Each row's result is also cached
+    by its expression plus the dimensions of its inputs.
+
+    Values are evaluated in the same dependency-ordered pass from folded,
+    compiled expressions, so an edit re-evaluates only the rows downstream
+    of it and constant rows cost a dictionary lookup.
+    """
+    # Above this fraction of changed rows a full pass is cheaper
+    FULL_PASS_RATIO = 0.25
+
+    def __init__(self):
+        self._exprs = {}
+        self._refs = {}      # name -> tuple of quoted names in its expression
+        self._users = {}     # quoted name (defined or not) -> names referencing it
+        self._graph = {}     # name -> defined names it references
+        self._dependents = {}
+        self._cycles = []
+        self._cycle_members = set()
+        self._cache = {}
+        self.diagnostics = {}
+        self.dimensions = {}
+        self.values = {}
+        self.depths = {}     # name -> longest reference chain down to an input
+        self._range_specs = {}
+        self.ranges = {}     # name -> Interval, for values that vary over the input ranges
+        # Names whose references changed in the last run; None after a full pass
+        self.graph_changed = None
+
+    @property
+    def graph(self):
+        """name -> defined names its expression references"""
+        return self._graph
+
+    def run(self, rows):
+        """Lint (name, expr) rows; returns the set of names whose result changed"""
+        with gc_paused():
+            return self._run(rows)
+
+    def _run(self, rows):
+        exprs = dict(rows)
+        old = self._exprs
+        edited = {n for n, x in exprs.items() if old.get(n) != x}
+        removed = old.keys() - exprs.keys()
+        if not old or len(edited) + len(removed) > len(exprs) * self.FULL_PASS_RATIO:
+            self.graph_changed = None
+            return self._full_pass(exprs)
+        self.graph_changed = set()
+        if not edited and not removed:
+            return set()
+
+        added = edited - old.keys()
+        touched = set(edited)
+        for n in added | removed:
+            touched |= self._users.get(n, set())
+        touched -= removed
+        self._exprs = exprs
+        self.graph_changed = touched | removed
+
+        for n in removed:
+            self._unlink(n)
+            del self._refs[n]
+            self._graph.pop(n, None)
+            self._dependents.pop(n, None)
+        for n in touched:
+            if n in edited and n in old:
+                self._unlink(n)
+            self._dependents.setdefault(n, set())
+            if n in edited:
+                self._link(n, tuple(references(exprs[n])))
+            else:
+                self._resolve(n)
+
+        # Cycles not touching an edit survive; new ones must pass through an
+        # edited row, so only the part of the graph reachable from it is searched
+        dirty = touched | removed
+        cycles = [c for c in self._cycles if dirty.isdisjoint(c)]
+        reach = self._reachable(touched)
+        seen = {frozenset(c) for c in cycles}
+        for c in find_cycles({n: self._graph[n] & reach for n in reach}):
+            if frozenset(c) not in seen:
+                cycles.append(c)
+        self._cycles = cycles
+        self._cycle_members = {n for c in cycles for n in c}
+
+        affected = touched | downstream(self._dependents, touched)
+        for c in cycles:
+            if not affected.isdisjoint(c):
+                affected.update(c)
+        # Rows on or below a cycle come after everything they reference
+        # outside it, so none of them is evaluated against stale values
+        order = condensed_order({n: self._graph[n] & affected for n in affected}, cycles)
+
+        changed = set(removed & self.diagnostics.keys())
+        for n in removed:
+            self.diagnostics.pop(n, None)
+            self.dimensions.pop(n, None)
+            self.values.pop(n, None)
+            self.depths.pop(n, None)
+            self.ranges.pop(n, None)
+            self._cache.pop(n, None)
+        changed |= self._lint_rows(order)
+        return changed
+
+    # ------------ Graph bookkeeping ------------
+    def _link(self, name, refs):
+        self._refs[name] = refs
+        for r in refs:
+            self._users.setdefault(r, set()).add(name)
+        self._resolve(name)
+
+    def _unlink(self, name):
+        for r in self._refs.get(name, ()):
+            users = self._users.get(r)
+            if users is not None:
+                users.discard(name)
+                if not users:
+                    del self._users[r]
+        for r in self._graph.get(name, ()):
+            if r in self._dependents:
+                self._dependents[r].discard(name)
+
+    def _resolve(self, name):
+        for r in self._graph.get(name, ()):
+            if r in self._dependents:
+                self._dependents[r].discard(name)
+        resolved = {r for r in self._refs[name] if r in self._exprs}
+        self._graph[name] = resolved
+        for r in resolved:
+            self._dependents.setdefault(r, set()).add(name)
+
+    def _reachable(self, names):
+        seen = set(names)
+        stack = list(names)
+        while stack:
+            for r in self._graph.get(stack.pop(), ()):
+                if r not in seen:
+                    seen.add(r)
+                    stack.append(r)
+        return seen
+
+    # ------------ Passes ------------
+    def _full_pass(self, exprs):
+        self._exprs = exprs
+        self._refs = {}
+        self._users = {}
+        self._graph = {}
+        self._dependents = {n: set() for n in exprs}
+        for n, x in exprs.items():
+            self._link(n, tuple(references(x)))
+        self._cycles = find_cycles(self._graph)
+        self._cycle_members = {n for c in self._cycles for n in c}
+
+        order = condensed_order(self._graph, self._cycles)
+
+        previous = self.diagnostics
+        previous_values = self.values
+        self.diagnostics = {}
+        self.dimensions = {}
+        self.values = {}
+        self.depths = {}
+        self.ranges = {}
+        changed = self._lint_rows(order)
+        changed.update(n for n in previous if n not in exprs)
+        changed.update(n for n in previous_values if self.values.get(n) != previous_values[n])
+        changed.update(n for n in previous if n in exprs and n not in self.diagnostics)
+        self._cache = {n: v for n, v in self._cache.items() if n in exprs}
+        return changed
+
+    def _lint_rows(self, order):
+        """Lint names in dependency order, updating dimensions as we go"""
+        in_cycle = {}
+        cycle_members = {}
+        for component in self._cycles:
+            path = ' -> '.join(f'"{n}"' for n in component + component[:1])
+            cycle_members[path] = component
+            for n in component:
+                in_cycle[n] = path
+        cycle_depths = {}
+        known = self._exprs
+        dims = self.dimensions
+        depths = self.depths
+        ranged = bool(self._range_specs or self.ranges)
+        changed = set()
+        for name in order:
+            # Depth over the condensed graph: a cycle's members all sit one
+            # level below the deepest name it references from outside
+            cycle = in_cycle.get(name)
+            if cycle is None:
+                depths[name] = 1 + max((depths.get(r, 0) for r in self._graph[name]), default=-1)
+            else:
+                if cycle not in cycle_depths:
+                    cycle_depths[cycle] = 1 + max((depths.get(r, 0) for n in cycle_members[cycle]
+                                                   for r in self._graph[n] if in_cycle.get(r) != cycle),
+                                                  default=-1)
+                depths[name] = cycle_depths[cycle]
+            expr = self._exprs[name]
+            key = (expr, tuple((r, r in known, dims.get(r)) for r in self._refs[name]))
+            cached = self._cache.get(name)
+            if cached is not None and cached[0] == key:
+                diagnostics, dim = cached[1], cached[2]
+            else:
+                diagnostics, dim = lint_expression(expr, known, dims)
+                self._cache[name] = (key, diagnostics, dim)
+            if name in in_cycle:
+                diagnostics = diagnostics + [Diagnostic(ERROR, f'Circular reference: {in_cycle[name]}')]
+                dim = None
+                value = None
+            else:
+                value, problem = self._evaluate(name, expr)
+                if problem is not None:
+                    diagnostics = diagnostics + [Diagnostic(ERROR, problem)]
+            if value is None:
+                if self.values.pop(name, None) is not None:
+                    changed.add(name)
+            elif self.values.get(name) != value:
+                self.values[name] = value
+                changed.add(name)
+            if dim is not None:
+                dims[name] = dim
+            else:
+                dims.pop(name, None)
+            if diagnostics != self.diagnostics.get(name, []):
+                changed.add(name)
+            if diagnostics:
+                self.diagnostics[name] = diagnostics
+            else:
+                self.diagnostics.pop(name, None)
+            if ranged:
+                self._set_range(name, changed)
+        return changed
+
+    # ------------ Ranges ------------
+    def set_range_specs(self, specs):
+        """Input ranges as {name: (lo, hi, relative)} (see intervals.range_specs).
+
+        Only rows downstream of inputs whose range changed are re-evaluated.
+        Returns the names whose range changed.
+        """
+        with gc_paused():
+            old = self._range_specs
+            self._range_specs = dict(specs)
+            edited = {n for n in old.keys() | specs.keys() if old.get(n) != specs.get(n) and n in self._exprs}
+            if not edited:
+                return set()
+            affected = edited | downstream(self._dependents, edited)
+            order = condensed_order({n: self._graph[n] & affected for n in affected}, self._cycles)
+            changed = set()
+            for name in order:
+                self._set_range(name, changed)
+            return changed
+
+    def _set_range(self, name, changed):
+        interval = self._range(name)
+        if interval is None:
+            if self.ranges.pop(name, None) is not None:
+                changed.add(name)
+        elif self.ranges.get(name) != interval:
+            self.ranges[name] = interval
+            changed.add(name)
+
+    def _range(self, name):
+        # Circular rows have no value, so no range either; their stale ranges
+        # must not feed each other
+        if name in self._cycle_members:
+            return None
+        spec = self._range_specs.get(name)
+        if spec is not None:
+            lo, hi, relative = spec
+            if relative:
+                value = self.values.get(name)
+                if value is None:
+                    return None
+                lo, hi = value + lo, value + hi
+            return Interval(lo, hi) if lo != hi else None
+        ranges, values = self.ranges, self.values
+        refs = self._refs[name]
+        if not any(r in ranges for r in refs):
+            return None
+        compiled = compile_expression(self._exprs[name])
+        if compiled.fn is None or compiled.constant:
+            return None
+        env = {}
+        for r in refs:
+            if r in ranges:
+                env[r] = ranges[r]
+            elif r in values:
+                env[r] = values[r]
+            else:
+                return None
+        try:
+            interval = compiled.fn(env, INTERVAL)
+        except (EvaluationError, ArithmeticError, ValueError):
+            return None
+        # A range that collapsed to a point (sgn() of a positive range) is just the value
+        if not isinstance(interval, Interval) or interval.lo == interval.hi:
+            return None
+        return interval
+
+    def _evaluate(self, name, expr):
+        # Syntax and name problems are already reported by lint_expression;
+        # only failures of the arithmetic itself become diagnostics here
+        compiled = compile_expression(expr)
+        if compiled.error is not None:
+            return None, None
+        if compiled.constant:
+            return compiled.value, None
+        values = self.values
+        if any(r not in values for r in self._refs[name]):
+            return None, None
+        try:
+            return compiled.fn(values, FLOAT), None
+        except EvaluationError as e:
+            return None, str(e)
+        except (ArithmeticError, ValueError) as e:
+            return None, f'Math error: {e}'
@@ -0,0 +1,154 @@
+"""Keeps sessions on the same file in step through the change log.
+
+The writable session publishes the delta of every save (see sync.py).
+A read-only session follows the log: it is woken by a file watcher, with
+a poll timer as fallback for file systems that do not report changes,
+reads only the lines appended since its last look and hands each delta
+to the window, which applies it to the model in place. The session keeps
+a mirror of the rows and cfg as saved, so the delta it publishes after
+becoming writable itself is exact.
+"""
+from pathlib import Path
+
+from PyQt6.QtCore import QFileSystemWatcher, QObject, QTimer, pyqtSignal
+
+from file_lock import file_signature
+from sync import ChangeLogReader, Delta, append_delta, cfg_state, diff_cfg, diff_rows, log_path_for
+
+POLL_MS = 2000
+# Polls the file may differ from the mirrored signature before giving up;
+# the writer logs its delta just after writing the file
+MISMATCH_POLLS = 2
+
+
+class LiveSync(QObject):
+    """Publishes this session's saves, or follows another session's"""
+    # records to add or update, names removed, replaced cfg entries
+    received = pyqtSignal(object, object, object)
+    # the file changed in a way the log cannot replay; a reload is needed
+    diverged = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.path = None
+        self.log = None
+        self.reader = None
+        self.following = False
+        self.signature = None
+        self.rows = None    # {name: expr} as saved, None when unknown
+        self.cfg = {}       # cfg_state of the cfg as saved
+        self._mismatches = 0
+
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self._poll)
+        self.watcher.directoryChanged.connect(self._poll)
+        self.timer = QTimer(self)
+        self.timer.setInterval(POLL_MS)
+        self.timer.timeout.connect(self._tick)
+
+    def start(self, path, signature, rows, cfg, follow):
+        """Track path as loaded: its signature, (name, expr) rows and cfg"""
+        self.stop()
+        self.path = Path(path)
+        self.log = log_path_for(self.path)
+        self.signature = signature
+        self.rows = dict(rows)
+        self.cfg = cfg_state(cfg)
+        if follow:
+            self.following = True
+            self.reader = ChangeLogReader(self.log)
+            self._mismatches = 0
+            self._watch()
+            self.timer.start()
+
+    def lead(self, signature):
+        """Stop following: the session became writable on a file with signature"""
+        self._unwatch()
+        if signature != self.signature:
+            # Changes were made outside the log; the next delta tells
+            # followers to reload rather than replay a wrong diff
+            self.rows = None
+            self.signature = signature
+
+    def stop(self):
+        self._unwatch()
+        self.path = None
+        self.log = None
+
+    def _watch(self):
+        paths = [str(self.log.parent)] + ([str(self.log)] if self.log.exists() else [])
+        missing = [p for p in paths if p not in self.watcher.files() + self.watcher.directories()]
+        if missing:
+            self.watcher.addPaths(missing)
+
+    def _unwatch(self):
+        self.following = False
+        self.reader = None
+        self.timer.stop()
+        watched = self.watcher.files() + self.watcher.directories()
+        if watched:
+            self.watcher.removePaths(watched)
+
+    # ------------ Writer ------------
+    def publish(self, rows, cfg, signature):
+        """Log the delta between the last save and this one"""
+        if self.path is None or self.following:
+            return
+        rows = dict(rows)
+        cfg_changes, self.cfg = diff_cfg(self.cfg, cfg)
+        if self.rows is None:
+            delta = Delta(self.signature, signature, None, [], {})
+        else:
+            changed, removed = diff_rows(self.rows, rows)
+            delta = Delta(self.signature, signature, changed, removed, cfg_changes)
+        try:
+            append_delta(self.log, delta)
+        except OSError:
+            # Followers notice the file changing without a delta and reload
+            pass
+        self.rows = rows
+        self.signature = signature
+
+    # ------------ Follower ------------
+    def _poll(self, *_):
+        if not self.following:
+            return
+        # Watchers drop a file that is replaced, and the log may appear late
+        self._watch()
+        for delta in self.reader.read():
+            if delta.before != self.signature:
+                if delta.after == self.signature:
+                    continue
+                self._diverge()
+                return
+            if delta.changed is None:
+                self._diverge()
+                return
+            self.rows.update(delta.changed)
+            for name in delta.removed:
+                self.rows.pop(name, None)
+            self.cfg.update(cfg_state(delta.cfg))
+            self.signature = tuple(delta.after)
+            self._mismatches = 0
+            records = [{'name': n, 'expression': x} for n, x in delta.changed.items()]
+            self.received.emit(records, delta.removed, delta.cfg)
+
+    def _tick(self):
+        self._poll()
+        if not self.following:
+            return
+        # A file that changed with no delta to explain it was saved elsewhere
+        current = file_signature(self.path)
+        if current is None or current == self.signature:
+            self._mismatches = 0
+            return
+        self._mismatches += 1
+        if self._mismatches > MISMATCH_POLLS:
+            self._diverge()
+
+    def _diverge(self):
+        self._unwatch()
+        self.diverged.emit()
+
+    def shutdown(self):
+        self.stop()
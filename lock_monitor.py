@@ -0,0 +1,169 @@
+"""Upgrades a read-only session to writable once the file lock frees.
+
+When another program holds the lock the file is opened read-only. The
+LockMonitor keeps retrying in the background with exponential backoff;
+each attempt is a non-blocking open-and-lock on a worker thread. Once it
+succeeds the locked handle is handed to the window. If the file changed
+on disk in the meantime, the external changes are merged three-way into
+the session (base: the text loaded, ours: the session, theirs: the disk),
+also on the worker thread, and only the resulting delta reaches the model.
+"""
+from PyQt6.QtCore import QObject, QThread, QTimer, pyqtSignal, pyqtSlot
+
+from file_lock import FileHandleLock
+
+FIRST_RETRY_MS = 1000
+MAX_RETRY_MS = 30000
+
+
+class LockWorker(QObject):
+    # locked FileHandleLock, changed on disk, generation
+    acquired = pyqtSignal(object, bool, int)
+    failed = pyqtSignal(int)
+    # records to add or update, names removed, conflicts, generation
+    merged = pyqtSignal(object, object, object, int)
+
+    def __init__(self):
+        super().__init__()
+        self.base_text = None
+        self.disk_text = None
+
+    @pyqtSlot(str, int)
+    def remember(self, path, generation):
+        # Merge base: the text as loaded (read here, off the GUI thread)
+        try:
+            with open(path, encoding='utf-8') as f:
+                self.base_text = f.read()
+        except OSError:
+            self.base_text = None
+        self.disk_text = None
+
+    @pyqtSlot(str, object, int)
+    def attempt(self, path, signature, generation):
+        candidate = FileHandleLock(path)
+        if not candidate.try_acquire():
+            self.failed.emit(generation)
+            return
+        changed = candidate.signature != signature
+        if changed:
+            self.disk_text = candidate.read_all()
+            changed = self.disk_text != self.base_text
+        self.acquired.emit(candidate, changed, generation)
+
+    @pyqtSlot(object, int)
+    def merge(self, ours, generation):
+        from merge import merge_equations
+        from parsing import parse_equations
+        ours = [{'name': n, 'expr': x} for n, x in ours]
+        merged, conflicts = merge_equations(parse_equations(self.base_text or ''),
+                                            ours, parse_equations(self.disk_text or ''))
+        current = {e['name']: e['expr'] for e in ours}
+        records = [{'name': e['name'], 'expression': e['expr']} for e in merged
+                   if current.get(e['name']) != e['expr']]
+        kept = {e['name'] for e in merged}
+        removed = [n for n in current if n not in kept]
+        self.base_text = self.disk_text
+        self.merged.emit(records, removed, conflicts, generation)
+
+
+class LockMonitor(QObject):
+    """Retries the lock of a read-only session until it is writable"""
+    # 'waiting' (seconds to next retry), 'writable', 'merging', or 'stopped'
+    state_changed = pyqtSignal(str, int)
+    # the new locked FileHandleLock
+    upgraded = pyqtSignal(object)
+    # records, removed names, conflicts
+    merged = pyqtSignal(object, object, object)
+
+    remember_requested = pyqtSignal(str, int)
+    attempt_requested = pyqtSignal(str, object, int)
+    merge_requested = pyqtSignal(object, int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.path = None
+        self.signature = None
+        self.generation = 0
+        self.delay = FIRST_RETRY_MS
+        self.snapshot = None
+
+        self.thread = QThread(self)
+        self.worker = LockWorker()
+        self.worker.moveToThread(self.thread)
+        self.remember_requested.connect(self.worker.remember)
+        self.attempt_requested.connect(self.worker.attempt)
+        self.merge_requested.connect(self.worker.merge)
+        self.worker.acquired.connect(self._on_acquired)
+        self.worker.failed.connect(self._on_failed)
+        self.worker.merged.connect(self._on_merged)
+        self.thread.start()
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self._attempt)
+
+    def watch(self, path, signature, snapshot):
+        """Start retrying for path, loaded with the given file signature;
+        snapshot() returns the session's (name, expr) rows for a merge"""
+        self.stop()
+        self.path = str(path)
+        self.signature = signature
+        self.snapshot = snapshot
+        self.delay = FIRST_RETRY_MS
+        self.remember_requested.emit(self.path, self.generation)
+        self._schedule()
+
+    def rebase(self, signature):
+        """The session caught up with the file on disk, now at signature"""
+        if self.path is not None:
+            self.signature = signature
+            self.remember_requested.emit(self.path, self.generation)
+
+    def stop(self):
+        # Anything still in flight for the old generation is dropped
+        self.generation += 1
+        self.timer.stop()
+        if self.path is not None:
+            self.path = None
+            self.state_changed.emit('stopped', 0)
+
+    def _schedule(self):
+        self.timer.start(self.delay)
+        self.state_changed.emit('waiting', round(self.delay / 1000))
+
+    def _attempt(self):
+        if self.path is not None:
+            self.attempt_requested.emit(self.path, self.signature, self.generation)
+
+    def _on_failed(self, generation):
+        if generation != self.generation:
+            return
+        self.delay = min(self.delay * 2, MAX_RETRY_MS)
+        self._schedule()
+
+    def _on_acquired(self, candidate, changed, generation):
+        if generation != self.generation or self.path is None:
+            candidate.release()  # superseded: another file was opened meanwhile
+            return
+        self.upgraded.emit(candidate)
+        if changed:
+            self.state_changed.emit('merging', 0)
+            self.merge_requested.emit(list(self.snapshot()), generation)
+        else:
+            self._finish()
+
+    def _on_merged(self, records, removed, conflicts, generation):
+        if generation != self.generation:
+            return
+        self._finish()
+        self.merged.emit(records, removed, conflicts)
+
+    def _finish(self):
+        self.path = None
+        self.snapshot = None
+        self.state_changed.emit('writable', 0)
+
+    def shutdown(self):
+        self.stop()
+        self.thread.quit()
+        self.thread.wait()
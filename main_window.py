@@ -2,22 +2,28 @@ import os
 import sys
 from pathlib import Path
 
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QAction, QIcon
+from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtGui import QAction, QIcon, QKeySequence, QUndoStack
 from PyQt6.QtWidgets import (
     QMainWindow, QFileDialog, QTableView, QToolBar,
     QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QMessageBox,
-    QLabel, QSplitter, QListWidget, QListWidgetItem, QStyleFactory,
-    QPushButton, QHeaderView, QInputDialog, QMenu
+    QLabel, QSplitter, QStyleFactory, QTreeView,
+    QPushButton, QHeaderView, QInputDialog, QMenu, QDockWidget, QComboBox
 )
 
 from parsing import parse_equations, serialize_equations
-from config_io import cfg_path_for, load_cfg, save_cfg, reconcile_cfg_with_txt
-from file_lock import FileHandleLock
-from models import EquationModel
-from dialogs import AddEditDialog
+import configurations
+from config_io import cfg_path_for, load_cfg, save_cfg, reconcile_cfg_with_txt, rename_in_cfg
+from file_lock import FileHandleLock, file_signature
+from live_sync import LiveSync
+from lock_monitor import LockMonitor
+from models import COMMENT_COLUMN, SECTION_COLUMN, SORTABLE, EquationModel
+from sorting import DEPTH_KEY
+from storage import EquationStore, should_use_store
 from styles import apply_dark_palette
 from delegates import SectionComboDelegate, HighlightingDelegate
+from problems import LintController, ProblemsPanel
+from section_tree import SectionTreeModel
 
 
 class MainWindow(QMainWindow):
@@ -36,11 +42,40 @@ class MainWindow(QMainWindow):
         self.current_path: Path | None = None
         self.cfg: dict | None = None
         self.fhlock: FileHandleLock | None = None
+        self.model: EquationModel | None = None
+        self.section_model: SectionTreeModel | None = None
+        self._section_subset: set | None = None
+        self._filter_state = ('', None)
+        self.lint = LintController(self)
+        self.lock_monitor = LockMonitor(self)
+        self.lock_monitor.state_changed.connect(self._on_lock_state)
+        self.lock_monitor.upgraded.connect(self._on_lock_upgraded)
+        self.lock_monitor.merged.connect(self._on_external_merge)
+        self.live_sync = LiveSync(self)
+        self.live_sync.received.connect(self._on_sync_received)
+        self.live_sync.diverged.connect(self._on_sync_diverged)
+        self.workspace = None
+        self.workspace_panel = None
+        self.diff_panel = None
+        self.sensitivity_panel = None
+        self.tolerance_panel = None
+        self.impact_panel = None
+        self.graph_panel = None
+        self.replace_panel = None
+        self.profile_session = None
+        self.profile_bundle = None  # where the bundle goes; asked for when None
+        self.profile_timer = QTimer(self)
+        self.profile_timer.setSingleShot(True)
+        self.profile_timer.timeout.connect(self.stop_profiling)
+        # Undo covers replacements made from the Find and Replace panel
+        self.undo_stack = QUndoStack(self)
 
         self._build_ui()
 
         if path is not None:
-            self.load_path(Path(path))
+            # Let the window paint first, then stream the file in
+            self.statusBar().showMessage(f'Loading {Path(path).name}…')
+            QTimer.singleShot(0, lambda: self.load_path(Path(path)))
 
     def resource_path(self, relative_path):
         if hasattr(sys, '_MEIPASS'):
@@ -66,6 +101,11 @@ class MainWindow(QMainWindow):
         save_act.triggered.connect(self.save_file)
         tb.addAction(save_act)
 
+        reload_act = QAction('Reload', self)
+        reload_act.setToolTip('Discard unsaved changes and read the file again')
+        reload_act.triggered.connect(self.reload_file)
+        tb.addAction(reload_act)
+
         add_act = QAction('Add', self)
         add_act.triggered.connect(self.add_equation)
         tb.addAction(add_act)
@@ -74,6 +114,52 @@ class MainWindow(QMainWindow):
         del_act.triggered.connect(self.delete_selected)
         tb.addAction(del_act)
 
+        open_dir_act = QAction('Open Folder', self)
+        open_dir_act.triggered.connect(self.open_folder)
+        tb.addAction(open_dir_act)
+
+        compare_act = QAction('Compare', self)
+        compare_act.triggered.connect(self.compare_with_file)
+        compare_menu = QMenu(self)
+        compare_menu.addAction('With File...', self.compare_with_file)
+        compare_menu.addAction('With Git Revision...', self.compare_with_revision)
+        compare_act.setMenu(compare_menu)
+        tb.addAction(compare_act)
+
+        import_act = QAction('Import', self)
+        import_act.triggered.connect(self.import_equations)
+        tb.addAction(import_act)
+
+        export_act = QAction('Export', self)
+        export_act.triggered.connect(self.export_equations)
+        tb.addAction(export_act)
+
+        sort_act = QAction('Sort', self)
+        sort_act.setToolTip('Click a column header to sort, Shift+click to add it as another key')
+        sort_act.triggered.connect(lambda: self.sort_by_key(DEPTH_KEY))
+        sort_menu = QMenu(self)
+        sort_menu.addAction('By Dependency Depth', lambda: self.sort_by_key(DEPTH_KEY))
+        sort_menu.addAction('File Order', lambda: self.apply_sort([]))
+        sort_act.setMenu(sort_menu)
+        tb.addAction(sort_act)
+
+        configurations_act = QAction('Configurations', self)
+        configurations_act.triggered.connect(self.new_configuration)
+        configurations_menu = QMenu(self)
+        configurations_menu.addAction('New...', self.new_configuration)
+        configurations_menu.addAction('Rename...', self.rename_configuration)
+        configurations_menu.addAction('Delete', self.delete_configuration)
+        configurations_menu.addSeparator()
+        configurations_menu.addAction('Export All...', self.export_configurations)
+        configurations_act.setMenu(configurations_menu)
+        tb.addAction(configurations_act)
+        self.configuration_combo = QComboBox()
+        self.configuration_combo.setToolTip('Active configuration')
+        self.configuration_combo.setSizeAdjustPolicy(QComboBox.SizeAdjustPolicy.AdjustToContents)
+        self.configuration_combo.activated.connect(lambda _: self.switch_configuration(
+            self.configuration_combo.currentData()))
+        tb.addWidget(self.configuration_combo)
+
 
 
         # Compact filter row
@@ -84,7 +170,8 @@ class MainWindow(QMainWindow):
         fbl.addWidget(QLabel('Filter:'))
         self.filter_edit = QLineEdit()
         self.filter_edit.setPlaceholderText('Type to filter by name, expression, or comment...')
-        self.filter_edit.textChanged.connect(self.apply_filter)
+        self.filter_edit.textChanged.connect(lambda _: self.apply_filter())
+        self.filter_edit.textChanged.connect(self._search_workspace)
         fbl.addWidget(self.filter_edit)
         root.addWidget(fb)
 
@@ -105,9 +192,11 @@ class MainWindow(QMainWindow):
         ll.addWidget(btn_ren_sec)
         ll.addWidget(btn_del_sec)
 
-        self.section_list = QListWidget()
-        self.section_list.itemSelectionChanged.connect(self.apply_section_filter)
-        ll.addWidget(self.section_list, 1)
+        self.section_tree = QTreeView()
+        self.section_tree.setHeaderHidden(True)
+        self.section_tree.setUniformRowHeights(True)
+        self.section_tree.clicked.connect(self._section_clicked)
+        ll.addWidget(self.section_tree, 1)
 
         # Table view
         self.view = QTableView()
@@ -115,6 +204,15 @@ class MainWindow(QMainWindow):
         self.view.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
         self.view.setSelectionMode(QTableView.SelectionMode.ExtendedSelection)
         self.view.verticalHeader().setVisible(False)
+        self.view.horizontalHeader().setSectionsClickable(True)
+        self.view.horizontalHeader().sectionClicked.connect(self.sort_by_key)
+
+        # Connect double-click to open edit dialog
+        self.view.doubleClicked.connect(self.edit_equation)
+
+        # Enable context menu
+        self.view.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.view.customContextMenuRequested.connect(self.show_context_menu)
 
         splitter = QSplitter()
         splitter.addWidget(left)
@@ -125,6 +223,32 @@ class MainWindow(QMainWindow):
         root.addWidget(splitter, 1)
         self.setCentralWidget(container)
 
+        # Problems panel, fed by the background linter
+        self.problems_panel = ProblemsPanel()
+        self.problems_panel.activated.connect(self.select_variable)
+        self.lint.updated.connect(lambda: self.problems_panel.set_diagnostics(self.lint.diagnostics))
+        problems_dock = QDockWidget('Problems', self)
+        problems_dock.setObjectName('problems_dock')
+        problems_dock.setWidget(self.problems_panel)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, problems_dock)
+        edit_menu = self.menuBar().addMenu('Edit')
+        undo_act = self.undo_stack.createUndoAction(self, 'Undo')
+        undo_act.setShortcut(QKeySequence.StandardKey.Undo)
+        redo_act = self.undo_stack.createRedoAction(self, 'Redo')
+        redo_act.setShortcut(QKeySequence.StandardKey.Redo)
+        edit_menu.addAction(undo_act)
+        edit_menu.addAction(redo_act)
+        edit_menu.addSeparator()
+        replace_act = edit_menu.addAction('Find and Replace...', self.find_and_replace)
+        replace_act.setShortcut(QKeySequence('Ctrl+H'))
+        self.view_menu = self.menuBar().addMenu('View')
+        self.view_menu.addAction(problems_dock.toggleViewAction())
+        self.view_menu.addAction('Dependency Graph', self.show_graph)
+        help_menu = self.menuBar().addMenu('Help')
+        self.profile_act = help_menu.addAction('Record Performance Profile...', self.record_profile)
+        self.stop_profile_act = help_menu.addAction('Stop Profiling', self.stop_profiling)
+        self.stop_profile_act.setEnabled(False)
+
         # Read-only banner in status bar
         self.readonly_banner = QLabel('')
         self.readonly_banner.setStyleSheet('color: yellow;')
@@ -144,6 +268,194 @@ class MainWindow(QMainWindow):
         if fn:
             self.load_path(Path(fn))
 
+    def open_folder(self):
+        directory = QFileDialog.getExistingDirectory(self, 'Open Workspace Folder', self._get_default_directory())
+        if directory:
+            self.open_workspace(Path(directory))
+
+    def open_workspace(self, directory: Path):
+        from workspace import Workspace
+        if self.workspace_panel is None:
+            from workspace_panel import WorkspacePanel
+            self.workspace_panel = WorkspacePanel()
+            self.workspace_panel.fileActivated.connect(self.load_path)
+            self.workspace_panel.locationActivated.connect(self.goto_location)
+            dock = QDockWidget('Workspace', self)
+            dock.setObjectName('workspace_dock')
+            dock.setWidget(self.workspace_panel)
+            self.addDockWidget(Qt.DockWidgetArea.LeftDockWidgetArea, dock)
+            self.view_menu.addAction(dock.toggleViewAction())
+        self.workspace = Workspace(directory)
+        self.workspace_panel.set_workspace(self.workspace)
+        if self.replace_panel is not None:
+            self.replace_panel.set_workspace(self.workspace)
+        self.statusBar().showMessage(f'Workspace {directory.name}: {len(self.workspace.paths)} equation files')
+
+    def goto_location(self, path: Path, name: str):
+        if self.current_path is None or Path(path).resolve() != self.current_path:
+            self.load_path(Path(path))
+        self.select_variable(name)
+
+    def _search_workspace(self, text):
+        if self.workspace_panel is not None:
+            self.workspace_panel.show_text_hits(text)
+
+    def find_in_workspace(self, name):
+        if self.workspace_panel is not None:
+            self.workspace_panel.parentWidget().show()
+            self.workspace_panel.find(name)
+
+    # ------------ Find and replace ------------
+    def find_and_replace(self):
+        if self.replace_panel is None:
+            from replace_panel import ReplacePanel
+            self.replace_panel = ReplacePanel(self.undo_stack)
+            self.replace_panel.activated.connect(
+                lambda path, name: self.goto_location(path, name) if path else self.select_variable(name))
+            dock = QDockWidget('Find and Replace', self)
+            dock.setObjectName('replace_dock')
+            dock.setWidget(self.replace_panel)
+            self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, dock)
+            self.view_menu.addAction(dock.toggleViewAction())
+            self.replace_panel.set_workspace(self.workspace)
+            if self.model is not None:
+                self.replace_panel.set_source(self.model, self.cfg, self.current_path)
+        self.replace_panel.parentWidget().show()
+        self.replace_panel.find_edit.setFocus()
+
+    # ------------ Compare ------------
+    def compare_with_file(self):
+        if self.model is None:
+            return
+        fn, _ = QFileDialog.getOpenFileName(self, 'Compare With', self._get_default_directory(),
+                                            'Text Files (*.txt);;All Files (*)')
+        if fn:
+            from diffing import load_version
+            rows, cfg = load_version(Path(fn))
+            self.show_diff(Path(fn).name, rows, cfg)
+
+    def compare_with_revision(self):
+        if self.model is None:
+            return
+        rev, ok = QInputDialog.getText(self, 'Compare With Revision', 'Git revision:', text='HEAD')
+        if not ok or not rev.strip():
+            return
+        from diffing import load_revision
+        try:
+            rows, cfg = load_revision(self.current_path, rev.strip())
+        except RuntimeError as e:
+            QMessageBox.warning(self, 'Compare', str(e))
+            return
+        self.show_diff(rev.strip(), rows, cfg)
+
+    def show_diff(self, label, rows, cfg):
+        if self.diff_panel is None:
+            from diff_panel import DiffPanel
+            self.diff_panel = DiffPanel()
+            self.diff_panel.activated.connect(self.select_variable)
+            self.diff_panel.refreshRequested.connect(self._refresh_diff)
+            dock = QDockWidget('Changes', self)
+            dock.setObjectName('diff_dock')
+            dock.setWidget(self.diff_panel)
+            self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, dock)
+            self.view_menu.addAction(dock.toggleViewAction())
+        self.diff_panel.parentWidget().show()
+        self.diff_panel.set_base(label, rows, cfg)
+        self._refresh_diff()
+
+    def _refresh_diff(self):
+        if self.model is not None:
+            self.diff_panel.compare(self.model.snapshot(), self.cfg)
+
+    # ------------ Sensitivity ------------
+    def analyze_sensitivity(self, name):
+        if self.sensitivity_panel is None:
+            from sensitivity_panel import SensitivityPanel
+            self.sensitivity_panel = SensitivityPanel()
+            self.sensitivity_panel.activated.connect(self.select_variable)
+            dock = QDockWidget('Sensitivity', self)
+            dock.setObjectName('sensitivity_dock')
+            dock.setWidget(self.sensitivity_panel)
+            self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, dock)
+            self.view_menu.addAction(dock.toggleViewAction())
+        self.sensitivity_panel.parentWidget().show()
+        self.sensitivity_panel.analyze(self.model.snapshot(), name)
+
+    # ------------ Impact analysis ------------
+    def analyze_impact(self, name):
+        if self.impact_panel is None:
+            from impact_panel import ImpactPanel
+            self.impact_panel = ImpactPanel(self.lint)
+            self.impact_panel.activated.connect(self.select_variable)
+            dock = QDockWidget('Impact', self)
+            dock.setObjectName('impact_dock')
+            dock.setWidget(self.impact_panel)
+            self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, dock)
+            self.view_menu.addAction(dock.toggleViewAction())
+            self.impact_panel.set_model(self.model)
+        self.impact_panel.parentWidget().show()
+        self.impact_panel.show_name(name)
+
+    def _current_row_changed(self, current, previous):
+        # Follows the selection only once the panel has been opened
+        if not current.isValid():
+            return
+        name = self.model.equation_at(current.row())['name']
+        if self.impact_panel is not None:
+            self.impact_panel.show_name(name)
+        if self.graph_panel is not None and self.graph_panel.isVisible():
+            self.graph_panel.show_name(name)
+
+    # ------------ Dependency graph ------------
+    def show_graph(self):
+        if self.graph_panel is None:
+            from graph_panel import GraphPanel
+            self.graph_panel = GraphPanel()
+            self.graph_panel.activated.connect(self.select_variable)
+            dock = QDockWidget('Dependency Graph', self)
+            dock.setObjectName('graph_dock')
+            dock.setWidget(self.graph_panel)
+            self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, dock)
+            if self.model is not None:
+                self.graph_panel.set_model(self.model)
+        self.graph_panel.parentWidget().show()
+
+    # ------------ Tolerances ------------
+    def _tolerance_panel(self):
+        if self.tolerance_panel is None:
+            from tolerance_panel import TolerancePanel
+            self.tolerance_panel = TolerancePanel()
+            self.tolerance_panel.activated.connect(self.select_variable)
+            # Tolerance bands double as input ranges for the Range column
+            self.tolerance_panel.changed.connect(self.lint.schedule)
+            dock = QDockWidget('Tolerance Stack-up', self)
+            dock.setObjectName('tolerance_dock')
+            dock.setWidget(self.tolerance_panel)
+            self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, dock)
+            self.view_menu.addAction(dock.toggleViewAction())
+        self.tolerance_panel.parentWidget().show()
+        self.tolerance_panel.set_source(self.model, self.cfg)
+        return self.tolerance_panel
+
+    def analyze_tolerances(self, name):
+        self._tolerance_panel().set_output(name)
+
+    def add_tolerance(self, name):
+        self._tolerance_panel().add_input(name)
+
+    def set_range(self, name):
+        from dialogs import RangeDialog
+        ranges = self.cfg.setdefault('ranges', {})
+        dlg = RangeDialog(self, name, ranges.get(name))
+        if not dlg.exec():
+            return
+        bounds = dlg.values()
+        if bounds is None:
+            ranges.pop(name, None)
+        else:
+            ranges[name] = list(bounds)
+        self.lint.schedule()
+
     def _get_default_directory(self):
         """Get the best default directory for file operations"""
         # Try to use the last opened file's directory
@@ -153,9 +465,16 @@ class MainWindow(QMainWindow):
         # Use current working directory
         return os.getcwd()
 
+    def _close_model(self):
+        if self.model is not None and self.model.lazy:
+            self.model.equations.close()
+
     def load_path(self, path: Path):
+        self.lock_monitor.stop()
+        self.live_sync.stop()
         if self.fhlock:
             self.fhlock.release()
+        self._close_model()
 
         # Ensure path is absolute and normalized
         path = path.resolve()
@@ -172,6 +491,7 @@ class MainWindow(QMainWindow):
             QMessageBox.critical(self, 'Error', f'Failed to open file: {path}')
             return
 
+        self.readonly_banner.setToolTip('')
         if locked and not self.fhlock.readonly:
             self.readonly_banner.setText('')
             self.statusBar().showMessage('Exclusive lock acquired (other apps blocked from writing).')
@@ -180,58 +500,83 @@ class MainWindow(QMainWindow):
             self.statusBar().showMessage('Opened without exclusive lock; edits may not save.')
 
         try:
-            text = self.fhlock.read_all()
+            if should_use_store(path):
+                # Large files go through the on-disk store; an unchanged file
+                # reuses its cache and is never re-read or re-parsed
+                eqs = EquationStore.open(path, read_text=self.fhlock.read_all)
+                names_in_txt = set(eqs.names())
+            else:
+                eqs = parse_equations(self.fhlock.read_all())
+                names_in_txt = {e['name'] for e in eqs}
         except Exception as e:
             QMessageBox.critical(self, 'Error', f'Failed to read file: {e}')
             return
 
-        eqs = parse_equations(text)
-
         cfgp = cfg_path_for(path)
         cfg = load_cfg(cfgp)
-        names_in_txt = {e['name'] for e in eqs}
         cfg = reconcile_cfg_with_txt(cfg, names_in_txt)
-
-        try:
-            save_cfg(cfgp, cfg)
-        except Exception as e:
-            QMessageBox.warning(self, 'Warning', f'Failed to write CFG: {e}')
+        # Writing the reconciled cfg is not needed to show the table
+        QTimer.singleShot(0, lambda: self._write_reconciled_cfg(cfgp, cfg))
 
         self.cfg = cfg
         self.model = EquationModel(eqs, self.cfg, self)
         self.view.setModel(self.model)
+        # Rows paged in by fetchMore still need the current filter applied
+        self.model.rowsInserted.connect(lambda parent, first, last: self._filter_rows(first, last))
+        self.model.batchFinished.connect(self.apply_filter)
+        self.lint.set_model(self.model)
+        self.view.selectionModel().currentRowChanged.connect(self._current_row_changed)
+        if self.impact_panel is not None:
+            self.impact_panel.set_model(self.model)
+        if self.graph_panel is not None:
+            self.graph_panel.set_model(self.model)
+        # Undo entries refer to the previous model
+        self.undo_stack.clear()
+        if self.replace_panel is not None:
+            self.replace_panel.set_source(self.model, self.cfg, path)
 
         # Delegates:
-        # - Section as combo (column 2)
+        # - Section as combo
         def get_sections():
             return sorted(self.cfg.get('sections', {}).keys())
 
-        self.view.setItemDelegateForColumn(2, SectionComboDelegate(get_sections, self))
+        self.view.setItemDelegateForColumn(SECTION_COLUMN, SectionComboDelegate(get_sections, self))
 
         # - Expression highlighting (column 1)
         def get_known_names():
             # Current variable names from the model
-            return [e['name'] for e in self.model.equations]
+            return self.model.known_names()
 
         self.view.setItemDelegateForColumn(1, HighlightingDelegate(get_known_names, self))
 
-        # Connect double-click to open edit dialog
-        self.view.doubleClicked.connect(self.edit_equation)
-
-        # Enable context menu
-        self.view.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
-        self.view.customContextMenuRequested.connect(self.show_context_menu)
-
         # Column sizing: stretch Comment column to fill extra space
         self.view.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
         try:
-            self.view.horizontalHeader().setSectionResizeMode(3, QHeaderView.ResizeMode.Stretch)
+            self.view.horizontalHeader().setSectionResizeMode(COMMENT_COLUMN, QHeaderView.ResizeMode.Stretch)
         except Exception:
             pass
 
-        self.populate_sections()
+        self._section_subset = None
+        # Owned by the equation model so it goes away with it
+        self.section_model = SectionTreeModel(self.model, self.model)
+        self.section_tree.setModel(self.section_model)
+        self.section_tree.selectionModel().selectionChanged.connect(lambda *_: self.apply_section_filter())
+        self.section_tree.setCurrentIndex(self.section_model.all_index())
+        self._refresh_configurations()
         self.apply_filter()
         self.statusBar().showMessage(f'Loaded {path.name} — {len(eqs)} equations')
+        if not self.fhlock.locked:
+            # Keep trying in the background; the session turns writable by itself
+            self.lock_monitor.watch(path, self.fhlock.signature, self.model.base_rows)
+        # The lock holder publishes its saves; everyone else follows them
+        self.live_sync.start(path, self.fhlock.signature, self.model.base_rows(), self.cfg,
+                             follow=not self.fhlock.locked)
+
+    def _write_reconciled_cfg(self, cfgp, cfg):
+        try:
+            save_cfg(cfgp, cfg)
+        except Exception as e:
+            QMessageBox.warning(self, 'Warning', f'Failed to write CFG: {e}')
 
     def save_file(self):
         if not self.current_path or not self.fhlock or not self.fhlock.file:
@@ -241,7 +586,8 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(
                 self,
                 'Read-only',
-                'File is read-only (no lock). Close other apps and use Reload from the menu if present.'
+                'File is read-only: another program holds its lock. It becomes writable by itself '
+                'once the lock is released; your edits are kept and merged with any changes made on disk.'
             )
             return
         
@@ -263,43 +609,322 @@ class MainWindow(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, 'Error', f'Failed to write CFG: {e}')
             return
+
+        if self.model.lazy:
+            self.model.equations.mark_synced(self.current_path)
+        self.live_sync.publish(self.model.base_rows(), self.cfg, file_signature(self.current_path))
+        if self.workspace is not None:
+            self.workspace_panel.file_saved(self.current_path, self.model.equations)
         
         self.statusBar().showMessage('Saved')
 
 
 
+    def reload_file(self):
+        if not self.current_path:
+            return
+        if QMessageBox.question(self, 'Reload', f'Reload {self.current_path.name} from disk? '
+                                'Unsaved changes are lost.') != QMessageBox.StandardButton.Yes:
+            return
+        self.load_path(self.current_path)
+
+    # ------------ Lock monitor ------------
+    def _on_lock_state(self, state, seconds):
+        if state == 'waiting':
+            mode = 'UNLOCKED' if not self.fhlock.readonly else 'READ-ONLY'
+            self.readonly_banner.setText(f'{mode}: file locked by another program, retrying in {seconds}s')
+        elif state == 'merging':
+            self.readonly_banner.setText('Lock acquired, merging changes made on disk…')
+        elif state == 'writable':
+            self.readonly_banner.setText('')
+            self.statusBar().showMessage('Lock acquired; the file is now writable.')
+
+    def _on_lock_upgraded(self, candidate):
+        # The read-only handle never held a lock, so closing it is safe
+        old, self.fhlock = self.fhlock, candidate
+        if old is not None:
+            old.release()
+        self.live_sync.lead(candidate.signature)
+
+    def _apply_external(self, records, removed):
+        # Applied in place, so the filter, sort and selection survive
+        if records:
+            self.model.import_records(records)
+        if removed:
+            # Rows not paged in yet can't be removed
+            while self.model.canFetchMore():
+                self.model.fetchMore()
+            self.model.remove_rows(self.model.rows_of(removed))
+
+    def _on_external_merge(self, records, removed, conflicts):
+        if self.model is None:
+            return
+        self._apply_external(records, removed)
+        message = f'Merged changes made on disk: {len(records)} added or changed, {len(removed)} removed'
+        if conflicts:
+            import merge
+            message += f', {len(conflicts)} conflict(s) kept your version'
+            self.readonly_banner.setText(f'{len(conflicts)} merge conflict(s)')
+            self.readonly_banner.setToolTip('\n'.join(merge.describe(c) for c in conflicts[:50]))
+        self.statusBar().showMessage(message)
+
+    # ------------ Live sync ------------
+    def _on_sync_received(self, records, removed, cfg_changes):
+        if self.model is None:
+            return
+        self._apply_external(records, removed)
+        self.model.apply_cfg(cfg_changes)
+        # The linter ignores cfg-only changes, but the Range column and
+        # configuration values depend on these
+        if cfg_changes.keys() & {'ranges', 'tolerances', configurations.CONFIGURATIONS_KEY}:
+            self.lint.schedule()
+        # A later lock upgrade merges against the file as synced, not as loaded
+        self.lock_monitor.rebase(self.live_sync.signature)
+        self.statusBar().showMessage(f'Synced a save from another session: {len(records)} added or changed, '
+                                     f'{len(removed)} removed')
+
+    def _on_sync_diverged(self):
+        self.readonly_banner.setText('OUT OF DATE: the file was saved elsewhere; Reload to catch up')
+        self.readonly_banner.setToolTip('Changes made on disk are also merged in once the lock frees')
+
+    # ------------ Profiling ------------
+    def record_profile(self):
+        import profiling
+        seconds, ok = QInputDialog.getInt(
+            self, 'Record Performance Profile',
+            'Seconds to record; reproduce the slowness meanwhile:', profiling.DEFAULT_SECONDS, 1, 3600)
+        if ok:
+            self.start_profiling(seconds)
+
+    def start_profiling(self, seconds, bundle_path=None, session=None):
+        """Profile for seconds, then write the bundle; session may already be running"""
+        if self.profile_session is not None:
+            return
+        if session is None:
+            import profiling
+            session = profiling.ProfileSession()
+            session.start()
+        self.profile_session = session
+        self.profile_bundle = bundle_path
+        self.profile_act.setEnabled(False)
+        self.stop_profile_act.setEnabled(True)
+        self.profile_timer.start(int(seconds * 1000))
+        self.statusBar().showMessage(f'Profiling for {seconds:g} s...')
+
+    def stop_profiling(self):
+        session, self.profile_session = self.profile_session, None
+        if session is None:
+            return
+        self.profile_timer.stop()
+        session.stop()
+        self.profile_act.setEnabled(True)
+        self.stop_profile_act.setEnabled(False)
+
+        import profiling
+        path = self.profile_bundle
+        if path is None:
+            name, _ = QFileDialog.getSaveFileName(
+                self, 'Save Profile Bundle', str(Path.home() / profiling.default_bundle_name()),
+                'Profile bundle (*.zip)')
+            if not name:
+                self.statusBar().showMessage('Profile discarded')
+                return
+            path = Path(name)
+        rows = self.model.base_rows() if self.model is not None else []
+        cfg = self.cfg or {}
+        context = {
+            'lazy': bool(self.model is not None and self.model.lazy),
+            'configurations': len(cfg.get('configurations', {})),
+        }
+        try:
+            session.write(path, profiling.file_stats(rows, cfg.get('sections', {})), context)
+        except OSError as e:
+            QMessageBox.critical(self, 'Error', f'Failed to write the profile bundle: {e}')
+            return
+        if self.profile_bundle is not None:
+            # Started from the command line, where nobody may look at the status bar
+            print(f'Profile written to {path}', flush=True)
+        self.statusBar().showMessage(f'Profile written to {path}; it holds no names, expressions or values')
+
     def closeEvent(self, event):
+        self.stop_profiling()
+        self.lock_monitor.shutdown()
+        self.live_sync.shutdown()
+        self.lint.shutdown()
+        if self.replace_panel is not None:
+            self.replace_panel.shutdown()
+        if self.graph_panel is not None:
+            self.graph_panel.shutdown()
+        if self.tolerance_panel is not None:
+            self.tolerance_panel.shutdown()
+        if self.workspace_panel is not None:
+            self.workspace_panel.close_index()
+        self._close_model()
         event.accept()
 
+    # ------------ Import / export ------------
+    INTERCHANGE_FILTERS = {
+        'CSV (*.csv)': 'csv',
+        'JSON Lines (*.jsonl *.ndjson)': 'jsonl',
+        'Design table (*.csv)': 'design-table',
+    }
+
+    def export_equations(self):
+        if self.model is None:
+            QMessageBox.information(self, 'No file open', 'Open a SolidWorks equations .txt file first.')
+            return
+        default = str(self.current_path.with_suffix('.csv'))
+        path, chosen = QFileDialog.getSaveFileName(self, 'Export Equations', default,
+                                                   ';;'.join(self.INTERCHANGE_FILTERS))
+        if not path:
+            return
+        import interchange
+
+        def make_records():
+            return interchange.records(self.model.iter_rows(), self.cfg, self.model.values)
+
+        try:
+            count = interchange.export(Path(path), self.INTERCHANGE_FILTERS.get(chosen, 'csv'), make_records)
+        except (OSError, interchange.InterchangeError) as e:
+            QMessageBox.critical(self, 'Export', f'Failed to export: {e}')
+            return
+        self.statusBar().showMessage(f'Exported {count} equations to {Path(path).name}')
+
+    def import_equations(self):
+        if self.model is None:
+            QMessageBox.information(self, 'No file open', 'Open a SolidWorks equations .txt file first.')
+            return
+        path, chosen = QFileDialog.getOpenFileName(self, 'Import Equations', str(self.current_path.parent),
+                                                   ';;'.join(self.INTERCHANGE_FILTERS))
+        if not path:
+            return
+        import interchange
+        try:
+            records = interchange.read(Path(path), self.INTERCHANGE_FILTERS.get(chosen))
+            added, updated = self.model.import_records(records)
+        except (OSError, interchange.InterchangeError) as e:
+            # Chunks already handed to the model stay imported
+            QMessageBox.critical(self, 'Import', f'Failed to import: {e}')
+            return
+        self.statusBar().showMessage(f'Imported {Path(path).name}: {added} added, {updated} updated')
+
+    # ------------ Configurations ------------
+    def _refresh_configurations(self):
+        combo = self.configuration_combo
+        combo.clear()
+        combo.addItem(configurations.BASE_LABEL, None)
+        for name in configurations.names(self.cfg):
+            combo.addItem(name, name)
+        combo.setCurrentIndex(max(combo.findData(self.model.configuration if self.model else None), 0))
+
+    def switch_configuration(self, name):
+        if self.model is None or name == self.model.configuration:
+            return
+        # Only rows the two overlays disagree on change, and the linter
+        # re-checks just those and their dependents
+        self.model.set_configuration(name)
+        self._refresh_configurations()
+        if self._filter_state[0]:
+            self.apply_filter()
+        self.statusBar().showMessage(f'Configuration: {name or configurations.BASE_LABEL}')
+
+    def new_configuration(self):
+        if not self.cfg:
+            return
+        name, ok = QInputDialog.getText(self, 'New Configuration',
+                                        'Configuration name (starts as a copy of the current one):')
+        name = (name or '').strip()
+        if not (ok and name):
+            return
+        if name in configurations.names(self.cfg) or name == configurations.BASE_LABEL:
+            QMessageBox.information(self, 'Exists', 'A configuration with that name already exists.')
+            return
+        current = configurations.overrides_for(self.cfg, self.model.configuration)
+        self.cfg.setdefault(configurations.CONFIGURATIONS_KEY, {})[name] = dict(current)
+        self.switch_configuration(name)
+
+    def rename_configuration(self):
+        old = self.model.configuration if self.model else None
+        if old is None:
+            QMessageBox.information(self, 'Rename Configuration', 'Switch to the configuration to rename first.')
+            return
+        new, ok = QInputDialog.getText(self, 'Rename Configuration', 'New name:', text=old)
+        new = (new or '').strip()
+        if not (ok and new) or new == old:
+            return
+        if new in configurations.names(self.cfg) or new == configurations.BASE_LABEL:
+            QMessageBox.information(self, 'Exists', 'A configuration with that name already exists.')
+            return
+        table = self.cfg[configurations.CONFIGURATIONS_KEY]
+        # Rebuilt to keep the configuration's place in the list
+        self.cfg[configurations.CONFIGURATIONS_KEY] = {new if k == old else k: v for k, v in table.items()}
+        self.model.configuration = new
+        self.cfg[configurations.ACTIVE_KEY] = new
+        self._refresh_configurations()
+
+    def delete_configuration(self):
+        name = self.model.configuration if self.model else None
+        if name is None:
+            QMessageBox.information(self, 'Delete Configuration', 'Switch to the configuration to delete first.')
+            return
+        if QMessageBox.question(self, 'Confirm', f'Delete configuration "{name}"?') != QMessageBox.StandardButton.Yes:
+            return
+        self.switch_configuration(None)
+        del self.cfg[configurations.CONFIGURATIONS_KEY][name]
+        self._refresh_configurations()
+
+    def reset_to_base(self, row):
+        self.model.setData(self.model.index(row, 1), self.model.equation_at(row)['expr'], Qt.ItemDataRole.EditRole)
+
+    def export_configurations(self):
+        if self.model is None or not configurations.names(self.cfg):
+            QMessageBox.information(self, 'Export Configurations', 'There are no configurations to export.')
+            return
+        out_dir = QFileDialog.getExistingDirectory(self, 'Export Configurations To', str(self.current_path.parent))
+        if not out_dir:
+            return
+        from PyQt6.QtWidgets import QApplication
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            written = configurations.export_all(self.current_path, self.cfg, out_dir,
+                                                rows=self.model.base_rows())
+        except OSError as e:
+            QMessageBox.critical(self, 'Export Configurations', f'Failed to export: {e}')
+            return
+        finally:
+            QApplication.restoreOverrideCursor()
+        self.statusBar().showMessage(f'Exported {len(written)} configurations to {out_dir}')
+
     # ------------ Sections ------------
-    def populate_sections(self):
-        self.section_list.clear()
-        self.section_list.addItem(QListWidgetItem('All'))
-        for sec in sorted(self.cfg.get('sections', {}).keys()):
-            self.section_list.addItem(QListWidgetItem(sec))
-        if not self.section_list.selectedItems():
-            items = self.section_list.findItems('All', Qt.MatchFlag.MatchExactly)
-            if items:
-                self.section_list.setCurrentItem(items[0])
+    def _selected_section(self):
+        """Section name of the current tree row, or None"""
+        if self.section_model is None:
+            return None
+        return self.section_model.path_at(self.section_tree.currentIndex())
+
+    def _select_section(self, name):
+        index = self.section_model.index_of_section(name) if name else self.section_model.all_index()
+        if index.isValid():
+            self.section_tree.setCurrentIndex(index)
 
     def add_section(self):
-        name, ok = QInputDialog.getText(self, 'Add Section', 'Section name:')
+        if not self.cfg:
+            return
+        name, ok = QInputDialog.getText(self, 'Add Section', 'Section name (use / to nest):')
         name = (name or '').strip()
         if not (ok and name):
             return
         if name in self.cfg['sections']:
             QMessageBox.information(self, 'Exists', 'Section already exists.')
             return
-        self.cfg['sections'][name] = []
-        self.populate_sections()
+        self.model.add_section(name)
 
     def rename_section(self):
-        sel = self.section_list.selectedItems()
-        if not sel:
+        old = self._selected_section()
+        if old is None:
             QMessageBox.information(self, 'Rename Section', 'Select a section to rename.')
             return
-        old = sel[0].text()
-        if old in ('All', 'Unassigned'):
+        if old == 'Unassigned':
             QMessageBox.information(self, 'Not allowed', f'"{old}" cannot be renamed.')
             return
         new, ok = QInputDialog.getText(self, 'Rename Section', 'New name:', text=old)
@@ -309,21 +934,16 @@ class MainWindow(QMainWindow):
         if new in self.cfg['sections'] and new != old:
             QMessageBox.information(self, 'Exists', 'A section with that name already exists.')
             return
-        self.cfg['sections'][new] = self.cfg['sections'].pop(old)
-        self.model.rebuild_section_map()
-        self.populate_sections()
-        items = self.section_list.findItems(new, Qt.MatchFlag.MatchExactly)
-        if items:
-            self.section_list.setCurrentItem(items[0])
-        self.apply_filter()
+        self.model.rename_section(old, new)
+        # Row membership is unchanged, so only the renamed section's rows are rechecked
+        self._select_section(new)
 
     def delete_section(self):
-        sel = self.section_list.selectedItems()
-        if not sel:
+        name = self._selected_section()
+        if name is None:
             QMessageBox.information(self, 'Delete Section', 'Select a section to delete.')
             return
-        name = sel[0].text()
-        if name in ('All', 'Unassigned'):
+        if name == 'Unassigned':
             QMessageBox.information(self, 'Not allowed', f'"{name}" cannot be deleted.')
             return
         if QMessageBox.question(
@@ -332,45 +952,97 @@ class MainWindow(QMainWindow):
                 f'Delete section "{name}" and move its variables to Unassigned?'
         ) != QMessageBox.StandardButton.Yes:
             return
-        vars_in_sec = self.cfg['sections'].pop(name, [])
-        self.cfg['sections'].setdefault('Unassigned', []).extend(vars_in_sec)
-        self.cfg['sections']['Unassigned'] = sorted(set(self.cfg['sections']['Unassigned']))
-        self.model.rebuild_section_map()
-        self.populate_sections()
-        self.apply_filter()
+        self.model.delete_section(name)
+        self._select_section(None)
+
+    def _section_clicked(self, index):
+        name = self.section_model.name_at(index)
+        if name is not None:
+            self.select_variable(name)
 
     def apply_section_filter(self):
-        selected = [i.text() for i in self.section_list.selectedItems()]
-        if not selected or 'All' in selected:
-            self.apply_filter(section_subset=None)
+        index = self.section_tree.currentIndex()
+        if not self.section_model.is_section(index):
+            return  # an equation leaf: the table filter stays as it is
+        old, new = self._section_subset, self.section_model.subset_at(index)
+        if new == old:
+            return
+        self._section_subset = new
+        text = self.filter_edit.text().strip().lower()
+        if old is None or new is None or text:
+            self.apply_filter()
+            return
+        # Switching between sections only changes the rows of the two of them
+        sections = self.cfg.get('sections', {})
+        names = [n for sec in old ^ new for n in sections.get(sec, ())]
+        self._filter_state = (text, new)
+        self.view.clearSelection()
+        self._refilter(self.model.rows_of(names))
+
+    # ------------ Sorting ------------
+    def sort_by_key(self, key):
+        """Sort by a column (or DEPTH_KEY); with Shift held the key is added
+        after the current ones, and choosing a key again flips its direction"""
+        if self.model is None or key not in SORTABLE:
+            return
+        from PyQt6.QtWidgets import QApplication
+        keys = list(self.model.sort_keys)
+        current = dict(keys)
+        if QApplication.keyboardModifiers() & Qt.KeyboardModifier.ShiftModifier:
+            if key in current:
+                keys = [(k, not desc if k == key else desc) for k, desc in keys]
+            else:
+                keys.append((key, False))
+        elif keys and keys[0][0] == key:
+            keys = [(key, not keys[0][1])]
+        else:
+            keys = [(key, False)]
+        self.apply_sort(keys)
+
+    def apply_sort(self, keys):
+        if self.model is None:
+            return
+        self.model.sort_by(keys)
+        if keys:
+            self.statusBar().showMessage(f'Sorted by {self.model.describe_sort()}')
         else:
-            self.apply_filter(section_subset=set(selected))
+            self.statusBar().showMessage('File order')
 
     # ------------ Filtering ------------
-    def apply_filter(self, text=None, section_subset=None):
+    def apply_filter(self, text=None):
         if not hasattr(self, 'model') or self.model is None:
             return
         if text is None:
-            text = self.filter_edit.text().strip().lower()
+            text = self.filter_edit.text()
+        self._filter_state = (text.strip().lower(), self._section_subset)
+        self.view.clearSelection()
+        self._filter_rows(0, self.model.rowCount() - 1)
 
-        comments = self.cfg.get('comments', {}) if self.cfg else {}
+    def _filter_rows(self, first, last):
+        text, section_subset = self._filter_state
+        if not text and section_subset is None and first > 0:
+            return  # newly fetched rows are visible by default
+        self._refilter(range(first, last + 1))
 
-        def visible(e):
-            ok = True
-            if text:
-                name_l = e['name'].lower()
-                expr_l = e['expr'].lower()
-                cmt_l = comments.get(e['name'], '').lower()
-                ok = (text in name_l) or (text in expr_l) or (text in cmt_l)
-            if ok and section_subset is not None:
-                sec = self.model.name_to_section.get(e['name'], 'Unassigned')
-                ok = sec in section_subset
-            return ok
-
-        filtered = [e for e in self.model.equations if visible(e)]
-        self.view.clearSelection()
-        for r, e in enumerate(self.model.equations):
-            self.view.setRowHidden(r, e not in filtered)
+    def _refilter(self, rows):
+        text, section_subset = self._filter_state
+        comments = self.cfg.get('comments', {}) if self.cfg else {}
+        name_to_section = self.model.name_to_section
+        # Each setRowHidden repaints the table unless updates are held off
+        self.view.setUpdatesEnabled(False)
+        try:
+            for r in rows:
+                e = self.model.equation_at(r)
+                ok = True
+                if text:
+                    ok = (text in e['name'].lower()) or (text in self.model.expression(e).lower()) \
+                        or (text in comments.get(e['name'], '').lower())
+                if ok and section_subset is not None:
+                    ok = name_to_section.get(e['name'], 'Unassigned') in section_subset
+                if self.view.isRowHidden(r) == ok:
+                    self.view.setRowHidden(r, not ok)
+        finally:
+            self.view.setUpdatesEnabled(True)
 
     # ------------ Editing ------------
     def add_equation(self):
@@ -380,17 +1052,20 @@ class MainWindow(QMainWindow):
         sec_names = list(self.cfg.get('sections', {}).keys())
 
         def get_known_names():
-            return [e['name'] for e in self.model.equations]
+            return self.model.known_names()
 
-        dlg = AddEditDialog(self, sections=sec_names, get_known_names_callable=get_known_names)
+        from dialogs import AddEditDialog
+        dlg = AddEditDialog(self, sections=sec_names, get_known_names_callable=get_known_names,
+                            get_dimensions_callable=lambda: self.lint.dimensions,
+                            name_index=self.model.name_index())
         if dlg.exec():
             name, expr, sec, comment = dlg.values()
             if not name:
                 return
-            self.model.add_equation(name, expr, section=sec or 'Unassigned')
-            if comment:
+            if comment and not self.model.has_name(name):
                 self.cfg.setdefault('comments', {})[name] = comment
-            self.apply_filter()
+            # The new row is filtered as it is inserted
+            self.model.add_equation(name, expr, section=sec or 'Unassigned')
 
     def edit_equation(self, index):
         if not self.cfg or not index.isValid():
@@ -401,23 +1076,26 @@ class MainWindow(QMainWindow):
             return
 
         row = index.row()
-        if row >= len(self.model.equations):
+        if row >= self.model.rowCount():
             return
 
-        equation = self.model.equations[row]
+        equation = self.model.equation_at(row)
         name = equation['name']
-        expr = equation['expr']
+        expr = self.model.expression(equation)
         section = self.model.name_to_section.get(name, 'Unassigned')
         comment = self.cfg.get('comments', {}).get(name, '')
 
         sec_names = list(self.cfg.get('sections', {}).keys())
 
         def get_known_names():
-            return [e['name'] for e in self.model.equations]
+            return self.model.known_names()
 
+        from dialogs import AddEditDialog
         dlg = AddEditDialog(self, name=name, expr=expr, sections=sec_names,
                             current_section=section, comment=comment,
-                            get_known_names_callable=get_known_names)
+                            get_known_names_callable=get_known_names,
+                            get_dimensions_callable=lambda: self.lint.dimensions,
+                            name_index=self.model.name_index())
         if dlg.exec():
             new_name, new_expr, new_sec, new_comment = dlg.values()
             if not new_name:
@@ -426,24 +1104,18 @@ class MainWindow(QMainWindow):
             # Update the equation
             if new_name != name:
                 # Name changed - need to handle this carefully
-                if any(e['name'] == new_name for i, e in enumerate(self.model.equations) if i != row):
+                if self.model.has_name(new_name, exclude_row=row):
                     QMessageBox.warning(self, 'Error', 'A variable with that name already exists.')
                     return
                 equation['name'] = new_name
+                self.model.note_renamed(name, new_name)
+                rename_in_cfg(self.cfg, name, new_name)
 
-            equation['expr'] = new_expr
+            self.model.set_expression(row, new_expr)
 
             # Update section
-            if new_sec != section:
-                # Remove from old section
-                if section in self.cfg['sections'] and name in self.cfg['sections'][section]:
-                    self.cfg['sections'][section].remove(name)
-                # Add to new section
-                if new_sec not in self.cfg['sections']:
-                    self.cfg['sections'][new_sec] = []
-                if new_name not in self.cfg['sections'][new_sec]:
-                    self.cfg['sections'][new_sec].append(new_name)
-                self.model.rebuild_section_map()
+            if new_sec != section or new_name != name:
+                self.model.move_to_section(name, new_name, new_sec or 'Unassigned')
 
             # Update comment
             if new_comment:
@@ -453,7 +1125,20 @@ class MainWindow(QMainWindow):
 
             # Update the model
             self.model.dataChanged.emit(index, index)
-            self.apply_filter()
+            row = self.model.row_edited(row)
+            self._filter_rows(row, row)
+
+    def select_variable(self, name):
+        if self.model is None:
+            return
+        row = self.model.row_of(name)
+        if row < 0:
+            return
+        while row >= self.model.rowCount() and self.model.canFetchMore():
+            self.model.fetchMore()
+        self.view.setRowHidden(row, False)
+        self.view.selectRow(row)
+        self.view.scrollTo(self.model.index(row, 0))
 
     def show_context_menu(self, position):
         if not self.cfg:
@@ -473,14 +1158,32 @@ class MainWindow(QMainWindow):
         delete_action = menu.addAction("Delete")
         delete_action.triggered.connect(lambda: self.delete_single_equation(index.row()))
 
+        name = self.model.equation_at(index.row())['name']
+        sensitivity_action = menu.addAction("Sensitivity")
+        sensitivity_action.triggered.connect(lambda: self.analyze_sensitivity(name))
+        stackup_action = menu.addAction("Tolerance Stack-up")
+        stackup_action.triggered.connect(lambda: self.analyze_tolerances(name))
+        tolerance_action = menu.addAction("Add Tolerance")
+        tolerance_action.triggered.connect(lambda: self.add_tolerance(name))
+        impact_action = menu.addAction("Impact Analysis")
+        impact_action.triggered.connect(lambda: self.analyze_impact(name))
+        range_action = menu.addAction("Set Range...")
+        range_action.triggered.connect(lambda: self.set_range(name))
+        if self.model.is_overridden(name):
+            reset_action = menu.addAction("Reset to Base")
+            reset_action.triggered.connect(lambda: self.reset_to_base(index.row()))
+
+        if self.workspace is not None:
+            find_action = menu.addAction("Find in Workspace")
+            find_action.triggered.connect(lambda: self.find_in_workspace(name))
+
         menu.exec(self.view.viewport().mapToGlobal(position))
 
     def delete_single_equation(self, row):
-        if row < 0 or row >= len(self.model.equations):
+        if row < 0 or row >= self.model.rowCount():
             return
         if QMessageBox.question(self, 'Confirm', 'Delete this equation?') == QMessageBox.StandardButton.Yes:
             self.model.remove_rows([row])
-            self.apply_filter()
 
     def delete_selected(self):
         if not hasattr(self, 'model') or self.model is None:
@@ -493,4 +1196,3 @@ class MainWindow(QMainWindow):
                                 f'Delete {len(rows)} selected equation(s)?') != QMessageBox.StandardButton.Yes:
             return
         self.model.remove_rows(rows)
-        self.apply_filter()
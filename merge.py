@@ -0,0 +1,215 @@
+"""Semantic three-way merge of equation files and their .cfg sidecars.
+
+Equations are keyed by variable name and section membership and comments by
+variable, so edits to different variables never conflict no matter where the
+lines ended up in the regenerated file. Every merge is a few dictionary
+passes over the three versions, linear in the number of variables.
+
+To use it as a git merge driver::
+
+    # .gitattributes
+    *.txt merge=sw-equations
+    *.cfg merge=sw-equations
+
+    git config merge.sw-equations.driver "python app.py merge-driver %O %A %B --path %P"
+"""
+from collections import namedtuple
+
+from config_io import PER_NAME_KEYS, forget_in_cfg, reconcile_cfg_with_txt
+from configurations import CONFIGURATIONS_KEY
+from parsing import parse_equations, serialize_equations
+
+Conflict = namedtuple('Conflict', 'kind name base ours theirs')
+
+# Conflict kinds
+BOTH_MODIFIED = 'both modified'
+MODIFY_DELETE = 'modified and deleted'
+BOTH_ADDED = 'both added'
+
+_KIND_LABELS = {'comments': 'comment', 'tolerances': 'tolerance',
+                'spec_limits': 'spec limit', 'ranges': 'range'}
+
+
+def merge_value(base, ours, theirs):
+    """Three-way merge of one value (None means absent); returns (value, conflicted)"""
+    if ours == theirs:
+        return ours, False
+    if ours == base:
+        return theirs, False
+    if theirs == base:
+        return ours, False
+    return ours, True
+
+
+def _conflict_kind(base, ours, theirs):
+    if base is None:
+        return BOTH_ADDED
+    if ours is None or theirs is None:
+        return MODIFY_DELETE
+    return BOTH_MODIFIED
+
+
+def merge_order(ours, theirs, keep):
+    """Order of kept keys: ours' order, with keys only in theirs placed after
+    their nearest preceding neighbour in theirs"""
+    in_ours = set(ours)
+    after = {}
+    anchor = None
+    for key in theirs:
+        if key in in_ours:
+            anchor = key
+        elif key in keep:
+            after.setdefault(anchor, []).append(key)
+    order = [k for k in after.get(None, ())]
+    for key in ours:
+        if key in keep:
+            order.append(key)
+        order.extend(after.get(key, ()))
+    return order
+
+
+def merge_equations(base, ours, theirs):
+    """Merge three lists of {'name', 'expr'} dicts.
+
+    Returns (merged, conflicts). Conflicting equations keep our expression
+    in merged; conflicts lists each with all three sides.
+    """
+    b = {e['name']: e['expr'] for e in base}
+    o = {e['name']: e['expr'] for e in ours}
+    t = {e['name']: e['expr'] for e in theirs}
+    values = {}
+    conflicts = []
+    for name in o.keys() | t.keys():
+        value, conflicted = merge_value(b.get(name), o.get(name), t.get(name))
+        if conflicted:
+            conflicts.append(Conflict(_conflict_kind(b.get(name), o.get(name), t.get(name)),
+                                      name, b.get(name), o.get(name), t.get(name)))
+            if value is None:
+                # Modified on their side, deleted on ours: keep the edit visible
+                value = t[name]
+        if value is not None:
+            values[name] = value
+    order = merge_order(list(o), list(t), values)
+    conflicts.sort(key=lambda c: c.name)
+    return [{'name': n, 'expr': values[n]} for n in order], conflicts
+
+
+def _section_of(cfg):
+    return {n: sec for sec, names in cfg.get('sections', {}).items() for n in names}
+
+
+def _merge_per_name(base, ours, theirs, label, conflicts):
+    """Three-way merge of one {name: value} map; empty values are dropped"""
+    merged = {}
+    for name in ours.keys() | theirs.keys():
+        value, conflicted = merge_value(base.get(name), ours.get(name), theirs.get(name))
+        if conflicted:
+            conflicts.append(Conflict(f'{label} ' + _conflict_kind(base.get(name), ours.get(name), theirs.get(name)),
+                                      name, base.get(name), ours.get(name), theirs.get(name)))
+            value = value if value is not None else theirs[name]
+        if value:
+            merged[name] = value
+    return merged
+
+
+def _merge_configurations(base, ours, theirs, conflicts):
+    """Merge {configuration: {name: expr}} overlays per (configuration, name)"""
+    merged = {}
+    for conf in merge_order(list(ours), list(theirs), ours.keys() | theirs.keys()):
+        exists, _ = merge_value(conf in base, conf in ours, conf in theirs)
+        overrides = _merge_per_name(base.get(conf, {}), ours.get(conf, {}), theirs.get(conf, {}),
+                                    f'configuration "{conf}"', conflicts)
+        # A configuration deleted on one side survives only if the other side edited it
+        if exists or overrides != base.get(conf, {}):
+            merged[conf] = dict(sorted(overrides.items()))
+    return merged
+
+
+def merge_cfg(base, ours, theirs, eq_names=None):
+    """Merge three cfg dicts; returns (merged cfg, conflicts).
+
+    Section membership, comments and the other per-name settings are merged
+    per variable, configuration overrides per (configuration, variable), and
+    the active configuration stays ours. Conflicts keep our side. With eq_names the result is reconciled against the merged
+    equations so every variable ends up in exactly one section.
+    """
+    conflicts = []
+    merged = dict(ours)
+
+    # Sections: per-variable membership, then per-section order
+    sb, so, st = _section_of(base), _section_of(ours), _section_of(theirs)
+    membership = {}
+    for name in so.keys() | st.keys():
+        sec, conflicted = merge_value(sb.get(name), so.get(name), st.get(name))
+        if conflicted:
+            conflicts.append(Conflict('section ' + _conflict_kind(sb.get(name), so.get(name), st.get(name)),
+                                      name, sb.get(name), so.get(name), st.get(name)))
+            sec = sec if sec is not None else st[name]
+        if sec is not None:
+            membership[name] = sec
+    bs, o_sections, t_sections = base.get('sections', {}), ours.get('sections', {}), theirs.get('sections', {})
+    # Empty sections survive if their existence merges to True
+    keep = set(membership.values()) | {'Unassigned'}
+    keep.update(sec for sec in o_sections.keys() | t_sections.keys()
+                if merge_value(sec in bs, sec in o_sections, sec in t_sections)[0])
+    sections = {}
+    for sec in merge_order(list(o_sections), list(t_sections), keep):
+        sections[sec] = merge_order(o_sections.get(sec, []), t_sections.get(sec, []),
+                                    {n for n, s in membership.items() if s == sec})
+    merged['sections'] = sections
+
+    # Per-name settings and configuration overrides
+    for key in PER_NAME_KEYS:
+        if key in ours or key in theirs:
+            entries = _merge_per_name(base.get(key, {}), ours.get(key, {}), theirs.get(key, {}),
+                                      _KIND_LABELS.get(key, key), conflicts)
+            merged[key] = dict(sorted(entries.items()))
+    if CONFIGURATIONS_KEY in ours or CONFIGURATIONS_KEY in theirs:
+        merged[CONFIGURATIONS_KEY] = _merge_configurations(
+            base.get(CONFIGURATIONS_KEY, {}), ours.get(CONFIGURATIONS_KEY, {}),
+            theirs.get(CONFIGURATIONS_KEY, {}), conflicts)
+
+    locked, _ = merge_value(base.get('locked', False), ours.get('locked', False), theirs.get('locked', False))
+    merged['locked'] = locked
+
+    if eq_names is not None:
+        merged = reconcile_cfg_with_txt(merged, set(eq_names))
+        maps = [merged.get(key, {}) for key in PER_NAME_KEYS]
+        maps.extend(merged.get(CONFIGURATIONS_KEY, {}).values())
+        forget_in_cfg(merged, {n for entries in maps for n in entries} - set(eq_names))
+    conflicts.sort(key=lambda c: (c.name, c.kind))
+    return merged, conflicts
+
+
+def render_equations(merged, conflicts, ours_label='ours', theirs_label='theirs'):
+    """Serialize merged equations, wrapping conflicting ones in git-style markers"""
+    if not conflicts:
+        return serialize_equations(merged)
+    by_name = {c.name: c for c in conflicts}
+    lines = []
+    for e in merged:
+        c = by_name.get(e['name'])
+        if c is None:
+            lines.append(f"\"{e['name']}\"= {e['expr']}")
+            continue
+        lines.append(f'<<<<<<< {ours_label}')
+        if c.ours is not None:
+            lines.append(f"\"{c.name}\"= {c.ours}")
+        lines.append('=======')
+        if c.theirs is not None:
+            lines.append(f"\"{c.name}\"= {c.theirs}")
+        lines.append(f'>>>>>>> {theirs_label}')
+    return '\n'.join(lines) + '\n'
+
+
+def merge_texts(base, ours, theirs):
+    """Merge three equations file texts; returns (text, conflicts)"""
+    merged, conflicts = merge_equations(parse_equations(base), parse_equations(ours), parse_equations(theirs))
+    return render_equations(merged, conflicts), conflicts
+
+
+def describe(conflict: Conflict) -> str:
+    def show(v):
+        return '(absent)' if v is None else v
+    return (f'"{conflict.name}": {conflict.kind} '
+            f'(base: {show(conflict.base)}, ours: {show(conflict.ours)}, theirs: {show(conflict.theirs)})')
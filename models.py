@@ -1,29 +1,511 @@
-from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from bisect import bisect_right
+from contextlib import contextmanager
 
-COLUMNS = ['Variable', 'Expression', 'Section', 'Comment']
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal
+from PyQt6.QtGui import QColor
+
+from completion import PrefixIndex
+from config_io import forget_in_cfg, rename_in_cfg
+from configurations import ACTIVE_KEY, CONFIGURATIONS_KEY, names as configuration_names, overrides_for, resolve
+from interchange import chunks
+from evaluation import format_value, gc_paused
+from expressions import rename_references
+from intervals import format_interval
+from sorting import DEPTH_KEY, DEPTH_LABEL, depth_key, natural_key, range_key, value_key
+from storage import EquationStore
+
+COLUMNS = ['Variable', 'Expression', 'Value', 'Range', 'Section', 'Comment', 'Problems']
+VALUE_COLUMN = 2
+RANGE_COLUMN = 3
+SECTION_COLUMN = 4
+COMMENT_COLUMN = 5
+PROBLEMS_COLUMN = 6
+# Rows handed to the view per fetchMore when backed by an EquationStore
+FETCH_BATCH = 500
+SORTABLE = (0, 1, VALUE_COLUMN, RANGE_COLUMN, SECTION_COLUMN, COMMENT_COLUMN, DEPTH_KEY)
+# Above this many rows changing sort position at once a full sort is cheaper
+# than moving them one by one
+REPOSITION_LIMIT = 256
+# Imported records handed to the model per batch()
+IMPORT_BATCH = 5000
 
 
 class EquationModel(QAbstractTableModel):
+    # Emitted once when the outermost batch() block finishes
+    batchFinished = pyqtSignal()
+    # Set of section names whose member list changed, appeared or vanished
+    sectionsChanged = pyqtSignal(object)
+
     def __init__(self, equations, cfg, parent=None):
         super().__init__(parent)
+        # equations is either a plain list of dicts or an EquationStore
         self.equations = equations
         self.cfg = cfg
+        self.lazy = isinstance(equations, EquationStore)
+        self._fetched = min(len(equations), FETCH_BATCH) if self.lazy else len(equations)
+        self._known_names = None
+        self._name_index = None
+        self._batch_depth = 0
+        self._sections_dirty = False
+        self._touched_sections = set()
+        self._pending = []
+        self._pending_names = set()
+        self.diagnostics = {}
+        self.values = {}
+        self.dimensions = {}
+        self.depths = {}
+        self.ranges = {}
+        # Sorting: [(key, descending)], the view-to-source row permutation and
+        # per-key sort values in source order
+        self.sort_keys = []
+        self._order = None
+        self._keys = {}
+        # Active configuration (None for the base) and its expression overlay
+        self.configuration = cfg.get(ACTIVE_KEY) if cfg.get(ACTIVE_KEY) in configuration_names(cfg) else None
+        self._overrides = overrides_for(cfg, self.configuration)
+        # Optional name -> QColor for the Variable column (impact highlighting)
+        self.highlight = None
         self.rebuild_section_map()
 
+    # ------------ Batching ------------
+    @contextmanager
+    def batch(self):
+        """Group mutations: inserts are coalesced into one signal and the
+        section map is rebuilt once when the outermost block exits."""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._flush_pending()
+                if self._sections_dirty:
+                    self._sections_dirty = False
+                    self.rebuild_section_map()
+                    self._rebuild_keys(SECTION_COLUMN)
+                self._emit_sections_changed()
+                self.batchFinished.emit()
+
+    def in_batch(self):
+        return self._batch_depth > 0
+
+    def _flush_pending(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        self._pending_names.clear()
+        first = len(self.equations)
+        if self._order is not None:
+            self._insert_sorted(pending)
+        elif self.rowCount() == first:
+            self.beginInsertRows(QModelIndex(), first, first + len(pending) - 1)
+            self.equations.extend(pending)
+            self._fetched += len(pending)
+            self.endInsertRows()
+        else:
+            # Not fetched yet: the view will pick them up through fetchMore
+            self.equations.extend(pending)
+        self._names_added(item['name'] for item in pending)
+
+    def touch_sections(self, *names):
+        """Report sections whose membership changed; coalesced inside batch()"""
+        self._touched_sections.update(names)
+        if not self._batch_depth:
+            self._emit_sections_changed()
+
+    def _emit_sections_changed(self):
+        if self._touched_sections:
+            touched, self._touched_sections = self._touched_sections, set()
+            self.sectionsChanged.emit(touched)
+
     def rebuild_section_map(self):
+        if self._batch_depth:
+            self._sections_dirty = True
+            return
         self.name_to_section = {}
         for sec, names in self.cfg.get('sections', {}).items():
             for n in names:
                 self.name_to_section[n] = sec
 
+    # ------------ Sorting ------------
+    def source_row(self, row):
+        """Position in self.equations of the row shown at view row"""
+        return row if self._order is None else self._order[row]
+
+    def equation_at(self, row):
+        return self.equations[self.source_row(row)]
+
+    def sort_by(self, keys):
+        """Order rows by [(key, descending)], each key a sortable column or
+        DEPTH_KEY; an empty list restores file order"""
+        self.sort_keys = [(k, bool(desc)) for k, desc in keys if k in SORTABLE]
+        if not self.sort_keys:
+            self._keys = {}
+            if self._order is not None:
+                self._set_order(None)
+        else:
+            if self.canFetchMore():
+                # A sorted view has to place every row
+                self.beginInsertRows(QModelIndex(), self._fetched, len(self.equations) - 1)
+                self._fetched = len(self.equations)
+                self.endInsertRows()
+            self._keys = {k: self._keys.get(k) or self._build_keys(k) for k, _ in self.sort_keys}
+            self._resort()
+        self.headerDataChanged.emit(Qt.Orientation.Horizontal, 0, len(COLUMNS) - 1)
+
+    def describe_sort(self):
+        arrows = {False: '▲', True: '▼'}
+        labels = [(DEPTH_LABEL if k == DEPTH_KEY else COLUMNS[k]) + ' ' + arrows[desc] for k, desc in self.sort_keys]
+        return ', '.join(labels)
+
+    def _sort_key(self, key, name, expr):
+        if key == 0:
+            return natural_key(name)
+        if key == 1:
+            return natural_key(expr)
+        if key == SECTION_COLUMN:
+            return natural_key(self.name_to_section.get(name, 'Unassigned'))
+        if key == COMMENT_COLUMN:
+            return natural_key(self.cfg.get('comments', {}).get(name, ''))
+        if key == VALUE_COLUMN:
+            return value_key(self.values.get(name))
+        if key == RANGE_COLUMN:
+            return range_key(self.ranges.get(name))
+        return depth_key(self.depths.get(name))
+
+    def iter_rows(self):
+        """(name, expr) pairs in file order with the active configuration
+        applied, streamed from the store if lazy"""
+        if self.lazy:
+            rows = self.equations.items()
+        else:
+            rows = ((e['name'], e['expr']) for e in self.equations)
+        return resolve(rows, self._overrides)
+
+    def _build_keys(self, key):
+        with gc_paused():
+            return [self._sort_key(key, n, x) for n, x in self.iter_rows()]
+
+    def _rebuild_keys(self, key):
+        # Many rows changed their value for key at once (a section renamed,
+        # a batch of moves): recompute it for all rows and sort again
+        if key in self._keys:
+            self._keys[key] = self._build_keys(key)
+            self._resort()
+
+    def _resort(self):
+        order = list(range(len(self.equations)))
+        # Stable sorts from the least significant key up; ties keep file order
+        for key, desc in reversed(self.sort_keys):
+            order.sort(key=self._keys[key].__getitem__, reverse=desc)
+        self._set_order(order)
+
+    def _set_order(self, order):
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        sources = [self.source_row(i.row()) for i in persistent]
+        self._order = order
+        if order is None:
+            rows = sources
+        else:
+            view_row = [0] * len(order)
+            for row, pos in enumerate(order):
+                view_row[pos] = row
+            rows = [view_row[pos] for pos in sources]
+        self.changePersistentIndexList(persistent, [self.index(r, i.column()) for r, i in zip(rows, persistent)])
+        self.layoutChanged.emit()
+
+    def _less(self, a, b):
+        for key, desc in self.sort_keys:
+            ka, kb = self._keys[key][a], self._keys[key][b]
+            if ka != kb:
+                return ka > kb if desc else ka < kb
+        return a < b
+
+    def _insert_position(self, pos):
+        # Binary search of the view order for source row pos
+        order = self._order
+        lo, hi = 0, len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._less(order[mid], pos):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _update_keys(self, pos):
+        item = self.equations[pos]
+        for key, values in self._keys.items():
+            values[pos] = self._sort_key(key, item['name'], self.expression(item))
+
+    def _reposition(self, row):
+        """Move a view row whose sort keys changed to its sorted place;
+        returns its new view row"""
+        order = self._order
+        pos = order.pop(row)
+        dest = self._insert_position(pos)
+        order.insert(row, pos)
+        if dest == row:
+            return row
+        self.beginMoveRows(QModelIndex(), row, row, QModelIndex(), dest + 1 if dest > row else dest)
+        order.pop(row)
+        order.insert(dest, pos)
+        self.endMoveRows()
+        return dest
+
+    def row_edited(self, row):
+        """Refresh the sort keys of a row changed in place; returns the view
+        row it ends up at"""
+        if self._order is None:
+            return row
+        self._update_keys(self._order[row])
+        return self._reposition(row)
+
+    def _insert_sorted(self, pending):
+        first = len(self.equations)
+        self.equations.extend(pending)
+        with gc_paused():
+            for key, values in self._keys.items():
+                values.extend(self._sort_key(key, e['name'], e['expr']) for e in pending)
+        if len(pending) > REPOSITION_LIMIT:
+            self.beginInsertRows(QModelIndex(), len(self._order), len(self._order) + len(pending) - 1)
+            self._order.extend(range(first, first + len(pending)))
+            self._fetched += len(pending)
+            self.endInsertRows()
+            self._resort()
+            return
+        for pos in range(first, first + len(pending)):
+            row = self._insert_position(pos)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._order.insert(row, pos)
+            self._fetched += 1
+            self.endInsertRows()
+
+    def _values_changed(self, key, old, new):
+        if key not in self._keys:
+            return
+        changed = {n for n in old.keys() | new.keys() if old.get(n) != new.get(n)}
+        if not changed:
+            return
+        if len(changed) > REPOSITION_LIMIT:
+            self._rebuild_keys(key)
+            return
+        values = self._keys[key]
+        moved = []
+        for pos, (name, expr) in enumerate(self.iter_rows()):
+            if name in changed:
+                values[pos] = self._sort_key(key, name, expr)
+                moved.append(pos)
+        if len(moved) > 1:
+            # _reposition's binary search needs every other row in place
+            self._resort()
+        elif moved:
+            self._reposition(self._order.index(moved[0]))
+
     def rowCount(self, parent=QModelIndex()):
-        return len(self.equations)
+        if parent.isValid():
+            return 0
+        return self._fetched if self.lazy else len(self.equations)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return self.lazy and not parent.isValid() and self._fetched < len(self.equations)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        count = min(FETCH_BATCH, len(self.equations) - self._fetched)
+        self.beginInsertRows(QModelIndex(), self._fetched, self._fetched + count - 1)
+        self._fetched += count
+        self.endInsertRows()
+
+    def _all_names(self):
+        return self.equations.names() if self.lazy else (e['name'] for e in self.equations)
+
+    def known_names(self):
+        # Built on first use, then kept up to date incrementally
+        if self._known_names is None:
+            self._known_names = set(self._all_names())
+        return self._known_names
+
+    def name_index(self):
+        """PrefixIndex over variable names used for autocompletion"""
+        if self._name_index is None:
+            self._name_index = PrefixIndex(self._all_names())
+        return self._name_index
+
+    def _names_added(self, names):
+        for name in names:
+            if self._known_names is not None:
+                self._known_names.add(name)
+            if self._name_index is not None:
+                self._name_index.add(name)
+
+    def _names_removed(self, names):
+        for name in names:
+            if self._known_names is not None:
+                self._known_names.discard(name)
+            if self._name_index is not None:
+                self._name_index.discard(name)
+
+    def note_renamed(self, old, new):
+        """Keep name caches current after a row's name was changed in place"""
+        self._names_removed([old])
+        self._names_added([new])
+
+    def has_name(self, name, exclude_row=None):
+        if exclude_row is None:
+            return name in self.known_names()
+        exclude_row = self.source_row(exclude_row)
+        if self.lazy:
+            row = self.equations.index_of(name)
+            return row >= 0 and row != exclude_row
+        return any(e['name'] == name for i, e in enumerate(self.equations) if i != exclude_row)
+
+    def row_of(self, name) -> int:
+        if self.lazy:
+            pos = self.equations.index_of(name)
+        else:
+            pos = next((i for i, e in enumerate(self.equations) if e['name'] == name), -1)
+        if pos < 0 or self._order is None:
+            return pos
+        return self._order.index(pos)
+
+    def rows_of(self, names):
+        """Sorted rows, among those handed to the view, holding any of names"""
+        if self.lazy:
+            rows = (self.equations.index_of(n) for n in names)
+        else:
+            wanted = set(names)
+            rows = (i for i, e in enumerate(self.equations) if e['name'] in wanted)
+        if self._order is not None:
+            positions = set(rows)
+            rows = (row for row, pos in enumerate(self._order) if pos in positions)
+        count = self.rowCount()
+        return sorted(r for r in rows if 0 <= r < count)
+
+    def snapshot(self):
+        """(name, expr) pairs for every row as the active configuration
+        resolves them, safe to hand to a worker thread"""
+        if self._overrides:
+            return list(self.iter_rows())
+        if self.lazy:
+            return list(self.equations.items())
+        return [(e['name'], e['expr']) for e in self.equations]
+
+    # ------------ Configurations ------------
+    def base_rows(self):
+        """(name, expr) pairs of the base equations, ignoring any configuration"""
+        if self.lazy:
+            return self.equations.items()
+        return ((e['name'], e['expr']) for e in self.equations)
+
+    def expression(self, item):
+        """Expression of an equation in the active configuration"""
+        return self._overrides.get(item['name'], item['expr'])
+
+    def is_overridden(self, name):
+        return name in self._overrides
+
+    def set_expression(self, row, expr):
+        """Edit a row's expression: the base row, or the active
+        configuration's overlay (dropping the override when it matches the base)"""
+        item = self.equation_at(row)
+        if self.configuration is None:
+            item['expr'] = expr
+        elif expr == item['expr']:
+            self._overrides.pop(item['name'], None)
+        else:
+            self._overrides[item['name']] = expr
+
+    def set_configuration(self, configuration):
+        """Switch the table to a configuration (None for the base); only rows
+        whose expression differs between the two are refreshed"""
+        old = self._overrides
+        self.configuration = configuration
+        self._overrides = overrides_for(self.cfg, configuration)
+        self.cfg[ACTIVE_KEY] = configuration
+        changed = {n for n in old.keys() | self._overrides.keys() if old.get(n) != self._overrides.get(n)}
+        if not changed:
+            return
+        rows = self.rows_of(changed)
+        if len(rows) > REPOSITION_LIMIT:
+            self.dataChanged.emit(self.index(0, 1), self.index(self.rowCount() - 1, 1))
+        else:
+            for row in rows:
+                self.dataChanged.emit(self.index(row, 1), self.index(row, 1))
+        if self._order is not None:
+            self._values_changed(1, old, self._overrides)
+
+    def apply_cfg(self, changes):
+        """Replace top-level cfg entries with another session's copies"""
+        if not changes:
+            return
+        old_sections = self.cfg.get('sections', {})
+        self.cfg.update(changes)
+        if 'sections' in changes:
+            sections = self.cfg['sections']
+            self.rebuild_section_map()
+            self._rebuild_keys(SECTION_COLUMN)
+            self.touch_sections(*(s for s in old_sections.keys() | sections.keys()
+                                  if old_sections.get(s) != sections.get(s)))
+        if 'comments' in changes:
+            self._rebuild_keys(COMMENT_COLUMN)
+        if CONFIGURATIONS_KEY in changes:
+            # Re-resolve the active configuration against its new overlay
+            names = configuration_names(self.cfg)
+            self.set_configuration(self.configuration if self.configuration in names else None)
+        if self.rowCount():
+            self.dataChanged.emit(self.index(0, SECTION_COLUMN), self.index(self.rowCount() - 1, COMMENT_COLUMN))
+
+    def set_diagnostics(self, diagnostics):
+        self.diagnostics = diagnostics
+        if self.rowCount():
+            self.dataChanged.emit(self.index(0, PROBLEMS_COLUMN),
+                                  self.index(self.rowCount() - 1, PROBLEMS_COLUMN))
+
+    def set_values(self, values, dimensions, depths=None):
+        old_values, old_depths = self.values, self.depths
+        self.values = values
+        self.dimensions = dimensions
+        if depths is not None:
+            self.depths = depths
+        if self.rowCount():
+            self.dataChanged.emit(self.index(0, VALUE_COLUMN),
+                                  self.index(self.rowCount() - 1, VALUE_COLUMN))
+        if self._order is not None:
+            self._values_changed(VALUE_COLUMN, old_values, self.values)
+            self._values_changed(DEPTH_KEY, old_depths, self.depths)
+
+    def set_highlight(self, highlight):
+        """Tint Variable cells by highlight(name) -> QColor or None"""
+        if highlight is None and self.highlight is None:
+            return
+        self.highlight = highlight
+        if self.rowCount():
+            self.dataChanged.emit(self.index(0, 0), self.index(self.rowCount() - 1, 0),
+                                  [Qt.ItemDataRole.BackgroundRole])
+
+    def set_ranges(self, ranges):
+        old = self.ranges
+        if not ranges and not old:
+            return
+        self.ranges = ranges
+        if self.rowCount():
+            self.dataChanged.emit(self.index(0, RANGE_COLUMN),
+                                  self.index(self.rowCount() - 1, RANGE_COLUMN))
+        if self._order is not None:
+            self._values_changed(RANGE_COLUMN, old, self.ranges)
 
     def columnCount(self, parent=QModelIndex()):
         return len(COLUMNS)
 
     def headerData(self, section, orientation, role):
         if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            for i, (key, desc) in enumerate(self.sort_keys):
+                if key == section:
+                    rank = str(i + 1) if len(self.sort_keys) > 1 else ''
+                    return f"{COLUMNS[section]} {'▼' if desc else '▲'}{rank}"
             return COLUMNS[section]
         return None
 
@@ -32,21 +514,52 @@ class EquationModel(QAbstractTableModel):
             return None
         row = index.row()
         col = index.column()
-        item = self.equations[row]
+        item = self.equation_at(row)
         if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
             if col == 0:
                 return item['name']
             elif col == 1:
-                return item['expr']
-            elif col == 2:
+                return self.expression(item)
+            elif col == VALUE_COLUMN and role == Qt.ItemDataRole.DisplayRole:
+                value = self.values.get(item['name'])
+                return '' if value is None else format_value(value, self.dimensions.get(item['name']))
+            elif col == RANGE_COLUMN and role == Qt.ItemDataRole.DisplayRole:
+                interval = self.ranges.get(item['name'])
+                return '' if interval is None else format_interval(interval, self.dimensions.get(item['name']))
+            elif col == SECTION_COLUMN:
                 return self.name_to_section.get(item['name'], 'Unassigned')
-            elif col == 3:
+            elif col == COMMENT_COLUMN:
                 return self.cfg.get('comments', {}).get(item['name'], '')
+            elif col == PROBLEMS_COLUMN and role == Qt.ItemDataRole.DisplayRole:
+                diags = self.diagnostics.get(item['name'])
+                if not diags:
+                    return ''
+                more = f' (+{len(diags) - 1} more)' if len(diags) > 1 else ''
+                return diags[0].message + more
+        elif role == Qt.ItemDataRole.ToolTipRole and col == 1 and item['name'] in self._overrides:
+            return f'{self.configuration} overrides the base expression: {item["expr"]}'
+        elif role == Qt.ItemDataRole.BackgroundRole and col == 1 and item['name'] in self._overrides:
+            return QColor(40, 70, 110)
+        elif role == Qt.ItemDataRole.BackgroundRole and col == 0 and self.highlight is not None:
+            return self.highlight(item['name'])
+        elif role == Qt.ItemDataRole.ToolTipRole:
+            diags = self.diagnostics.get(item['name'])
+            if diags:
+                return '\n'.join(f'{d.severity}: {d.message}' for d in diags)
+        elif role == Qt.ItemDataRole.TextAlignmentRole and col in (VALUE_COLUMN, RANGE_COLUMN):
+            return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        elif role == Qt.ItemDataRole.ForegroundRole and col == PROBLEMS_COLUMN:
+            diags = self.diagnostics.get(item['name'])
+            if diags:
+                errors = any(d.severity == 'error' for d in diags)
+                return QColor(255, 100, 100) if errors else QColor(255, 200, 80)
         return None
 
     def flags(self, index):
         if not index.isValid():
             return Qt.ItemFlag.NoItemFlags
+        if index.column() in (VALUE_COLUMN, RANGE_COLUMN, PROBLEMS_COLUMN):
+            return Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled
         return Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsEditable
 
     def setData(self, index, value, role):
@@ -54,15 +567,16 @@ class EquationModel(QAbstractTableModel):
             return False
         row = index.row()
         col = index.column()
-        item = self.equations[row]
+        item = self.equation_at(row)
         if col == 0:
             old_name = item['name']
             new_name = str(value).strip().strip('"')
             if not new_name:
                 return False
-            if any(e['name'] == new_name for i, e in enumerate(self.equations) if i != row):
+            if self.has_name(new_name, exclude_row=row):
                 return False
             item['name'] = new_name
+            self.note_renamed(old_name, new_name)
             sec = self.name_to_section.pop(old_name, 'Unassigned')
             if sec not in self.cfg['sections']:
                 self.cfg['sections'][sec] = []
@@ -71,13 +585,12 @@ class EquationModel(QAbstractTableModel):
             if new_name not in self.cfg['sections'][sec]:
                 self.cfg['sections'][sec].append(new_name)
             self.rebuild_section_map()
+            self.touch_sections(sec)
 
-            comments = self.cfg.setdefault('comments', {})
-            if old_name in comments:
-                comments[new_name] = comments.pop(old_name)
+            rename_in_cfg(self.cfg, old_name, new_name)
         elif col == 1:
-            item['expr'] = str(value).strip()
-        elif col == 2:
+            self.set_expression(row, str(value).strip())
+        elif col == SECTION_COLUMN:
             new_sec = str(value).strip() or 'Unassigned'
             old_sec = self.name_to_section.get(item['name'], 'Unassigned')
             if new_sec not in self.cfg['sections']:
@@ -86,43 +599,254 @@ class EquationModel(QAbstractTableModel):
                 self.cfg['sections'][old_sec].remove(item['name'])
             if item['name'] not in self.cfg['sections'][new_sec]:
                 self.cfg['sections'][new_sec].append(item['name'])
-            for sec in list(self.cfg['sections'].keys()):
-                if sec != 'Unassigned' and not self.cfg['sections'][sec]:
-                    del self.cfg['sections'][sec]
+            emptied = [sec for sec, names in self.cfg['sections'].items() if sec != 'Unassigned' and not names]
+            for sec in emptied:
+                del self.cfg['sections'][sec]
             self.rebuild_section_map()
-        elif col == 3:
+            self.touch_sections(old_sec, new_sec, *emptied)
+        elif col == COMMENT_COLUMN:
             self.cfg.setdefault('comments', {})[item['name']] = str(value)
         else:
             return False
         self.dataChanged.emit(index, index)
+        self.row_edited(row)
         return True
 
     def add_equation(self, name, expr, section='Unassigned'):
         name = name.strip().strip('"')
         if not name:
             return
-        if any(e['name'] == name for e in self.equations):
+        if name in self._pending_names or self.has_name(name):
             return
-        self.beginInsertRows(QModelIndex(), len(self.equations), len(self.equations))
-        self.equations.append({'name': name, 'expr': expr})
-        self.endInsertRows()
+        self._pending.append({'name': name, 'expr': expr})
+        self._pending_names.add(name)
         if section not in self.cfg['sections']:
             self.cfg['sections'][section] = []
-        if name not in self.cfg['sections'][section]:
+        # The section map answers membership without scanning a long member list
+        if self.name_to_section.get(name) != section:
             self.cfg['sections'][section].append(name)
-        self.rebuild_section_map()
+        self.name_to_section[name] = section
+        if not self._batch_depth:
+            self._flush_pending()
+        self.touch_sections(section)
+
+    def import_records(self, records):
+        """Add or update equations from dicts with name, expression and
+        optional section and comment; returns (added, updated).
+
+        Records are consumed in chunks of IMPORT_BATCH, each one model batch.
+        """
+        positions = {name: pos for pos, (name, _) in enumerate(self.iter_rows())}
+        comments = self.cfg.setdefault('comments', {})
+        added = updated = 0
+        for chunk in chunks(records, IMPORT_BATCH):
+            edited = False
+            with self.batch():
+                for rec in chunk:
+                    name, expr = rec['name'], rec['expression']
+                    section = rec.get('section') or None
+                    if rec.get('comment'):
+                        comments[name] = rec['comment']
+                    pos = positions.get(name)
+                    if pos is None:
+                        self.add_equation(name, expr, section=section or 'Unassigned')
+                        positions[name] = -1
+                        added += 1
+                        continue
+                    if pos >= 0:
+                        self.equations[pos]['expr'] = expr
+                    if section and section != self.name_to_section.get(name, 'Unassigned'):
+                        self.move_to_section(name, name, section)
+                    edited = True
+                    updated += 1
+            if edited:
+                if self._keys:
+                    self._keys = {k: self._build_keys(k) for k in self._keys}
+                    self._resort()
+                if self.rowCount():
+                    self.dataChanged.emit(self.index(0, 0), self.index(self.rowCount() - 1, COMMENT_COLUMN))
+        return added, updated
+
+    def apply_edits(self, renames, expressions, comments, overlays=None):
+        """Set base expressions, comments and configuration overlay
+        expressions, then rename rows, as one batch.
+
+        expressions, comments and overlays ({configuration: {name: expr}}) are
+        keyed by the names before renaming; an empty comment removes it.
+        References inside configuration overlays follow the renames. Returns
+        the (renames, expressions, comments, overlays) that undo the edit.
+        """
+        self._flush_pending()
+        wanted = renames.keys() | expressions.keys()
+        if self.lazy:
+            positions = {n: self.equations.index_of(n) for n in wanted}
+        else:
+            positions = {e['name']: i for i, e in enumerate(self.equations) if e['name'] in wanted}
+        cfg_comments = self.cfg.setdefault('comments', {})
+        undo_expressions = {}
+        undo_comments = {}
+        undo_overlays = {}
+        with self.batch():
+            for name, expr in expressions.items():
+                pos = positions.get(name, -1)
+                if pos < 0:
+                    continue
+                item = self.equations[pos]
+                undo_expressions[renames.get(name, name)] = item['expr']
+                item['expr'] = expr
+            for configuration, planned in (overlays or {}).items():
+                # The active configuration's overlay is self._overrides itself
+                overrides = self.cfg.setdefault(CONFIGURATIONS_KEY, {}).setdefault(configuration, {})
+                undo = undo_overlays.setdefault(configuration, {})
+                for name, expr in planned.items():
+                    if name in overrides:
+                        undo[renames.get(name, name)] = overrides[name]
+                        overrides[name] = expr
+            for name, comment in comments.items():
+                undo_comments[renames.get(name, name)] = cfg_comments.get(name, '')
+                if comment:
+                    cfg_comments[name] = comment
+                else:
+                    cfg_comments.pop(name, None)
+            if renames:
+                for old, new in renames.items():
+                    pos = positions.get(old, -1)
+                    if pos >= 0:
+                        self.equations[pos]['name'] = new
+                self._names_removed(renames)
+                self._names_added(renames.values())
+                sections = self.cfg['sections']
+                for sec, names in sections.items():
+                    if not renames.keys().isdisjoint(names):
+                        sections[sec] = [renames.get(n, n) for n in names]
+                        self.touch_sections(sec)
+                for old, new in renames.items():
+                    rename_in_cfg(self.cfg, old, new)
+                for overrides in self.cfg.get(CONFIGURATIONS_KEY, {}).values():
+                    for name, expr in overrides.items():
+                        overrides[name] = rename_references(expr, renames)
+                self.rebuild_section_map()
+        if self._keys:
+            self._keys = {k: self._build_keys(k) for k in self._keys}
+            self._resort()
+        if self.rowCount():
+            self.dataChanged.emit(self.index(0, 0), self.index(self.rowCount() - 1, COMMENT_COLUMN))
+        return {new: old for old, new in renames.items()}, undo_expressions, undo_comments, undo_overlays
 
     def remove_rows(self, rows):
-        for row in sorted(rows, reverse=True):
-            if 0 <= row < len(self.equations):
-                name = self.equations[row]['name']
-                self.beginRemoveRows(QModelIndex(), row, row)
-                self.equations.pop(row)
+        # Pending inserts must land first so row numbers refer to real rows
+        self._flush_pending()
+        rows = sorted({r for r in rows if 0 <= r < self.rowCount()})
+        if not rows:
+            return
+        removed = set()
+        # Walk contiguous runs from the bottom up so earlier rows keep their index
+        runs = []
+        start = prev = rows[0]
+        for r in rows[1:]:
+            if r != prev + 1:
+                runs.append((start, prev))
+                start = r
+            prev = r
+        runs.append((start, prev))
+        if self._order is not None:
+            removed.update(self.equation_at(r)['name'] for r in rows)
+            self._remove_sorted(runs, sorted(self._order[r] for r in rows))
+        else:
+            for first, last in reversed(runs):
+                removed.update(self.equations[r]['name'] for r in range(first, last + 1))
+                self.beginRemoveRows(QModelIndex(), first, last)
+                if self.lazy:
+                    self.equations.delete_range(first, last + 1)
+                else:
+                    del self.equations[first:last + 1]
+                self._fetched -= last - first + 1
                 self.endRemoveRows()
-                for sec in list(self.cfg['sections'].keys()):
-                    if name in self.cfg['sections'][sec]:
-                        self.cfg['sections'][sec].remove(name)
-                        if not self.cfg['sections'][sec] and sec != 'Unassigned':
-                            del self.cfg['sections'][sec]
-                        self.cfg.setdefault('comments', {}).pop(name, None)
+
+        # Update section membership and comments in a single pass
+        sections = self.cfg['sections']
+        touched = []
+        for sec in list(sections.keys()):
+            kept = [n for n in sections[sec] if n not in removed]
+            if len(kept) != len(sections[sec]):
+                touched.append(sec)
+                if kept or sec == 'Unassigned':
+                    sections[sec] = kept
+                else:
+                    del sections[sec]
+        forget_in_cfg(self.cfg, removed)
+        for name in removed:
+            self.name_to_section.pop(name, None)
+        self._names_removed(removed)
+        self.touch_sections(*touched)
+
+    def _remove_sorted(self, runs, positions):
+        # View runs leave the order first; the source rows behind them are
+        # then deleted in their own contiguous runs and the order renumbered
+        for first, last in reversed(runs):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self._order[first:last + 1]
+            self._fetched -= last - first + 1
+            self.endRemoveRows()
+        start = prev = positions[0]
+        source_runs = []
+        for pos in positions[1:]:
+            if pos != prev + 1:
+                source_runs.append((start, prev))
+                start = pos
+            prev = pos
+        source_runs.append((start, prev))
+        for first, last in reversed(source_runs):
+            if self.lazy:
+                self.equations.delete_range(first, last + 1)
+            else:
+                del self.equations[first:last + 1]
+            for values in self._keys.values():
+                del values[first:last + 1]
+        self._order = [pos - bisect_right(positions, pos) for pos in self._order]
+
+    def _emit_section_column_changed(self):
+        if self.rowCount():
+            self.dataChanged.emit(self.index(0, SECTION_COLUMN), self.index(self.rowCount() - 1, SECTION_COLUMN))
+
+    def add_section(self, name):
+        if name not in self.cfg['sections']:
+            self.cfg['sections'][name] = []
+            self.touch_sections(name)
+
+    def move_to_section(self, old_name, new_name, section):
+        """Put a variable, possibly just renamed from old_name, in section"""
+        sections = self.cfg['sections']
+        old_sec = self.name_to_section.get(old_name, 'Unassigned')
+        if old_name in sections.get(old_sec, []):
+            sections[old_sec].remove(old_name)
+        members = sections.setdefault(section, [])
+        if new_name not in members:
+            members.append(new_name)
+        # Kept current by hand too, as rebuilding waits for the end of a batch
+        self.name_to_section.pop(old_name, None)
+        self.name_to_section[new_name] = section
         self.rebuild_section_map()
+        self.touch_sections(old_sec, section)
+
+    def rename_section(self, old, new):
+        sections = self.cfg['sections']
+        members = sections.pop(old, [])
+        sections[new] = members
+        for n in members:
+            self.name_to_section[n] = new
+        self._emit_section_column_changed()
+        self._rebuild_keys(SECTION_COLUMN)
+        self.touch_sections(old, new)
+
+    def delete_section(self, name):
+        """Drop a section and move its variables to Unassigned"""
+        sections = self.cfg['sections']
+        members = sections.pop(name, [])
+        unassigned = sections.setdefault('Unassigned', [])
+        unassigned[:] = sorted(set(unassigned).union(members))
+        for n in members:
+            self.name_to_section[n] = 'Unassigned'
+        self._emit_section_column_changed()
+        self._rebuild_keys(SECTION_COLUMN)
+        self.touch_sections(name, 'Unassigned')
@@ -3,21 +3,26 @@ import re
 LINE_RE = re.compile(r'^\s*"(?P<var>.+?)"\s*=\s*(?P<expr>.+?)\s*$')
 
 
-def parse_equations(text: str):
-    equations = []
-    for i, line in enumerate(text.splitlines()):
+def iter_equations(lines):
+    # Accepts a whole text or any iterable of lines (e.g. an open file)
+    if isinstance(lines, str):
+        lines = lines.splitlines()
+    for i, line in enumerate(lines):
         line = line.strip()
         if not line:
             continue
         m = LINE_RE.match(line)
         if not m:
             continue
-        equations.append({
+        yield {
             'name': m.group('var'),
             'expr': m.group('expr'),
             'line_index': i,
-        })
-    return equations
+        }
+
+
+def parse_equations(text: str):
+    return list(iter_equations(text))
 
 
 def serialize_equations(eqs):
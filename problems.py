@@ -0,0 +1,161 @@
+from PyQt6.QtCore import Qt, QModelIndex, QObject, QThread, QTimer, pyqtSignal, pyqtSlot
+from PyQt6.QtGui import QColor
+from PyQt6.QtWidgets import QTreeWidget, QTreeWidgetItem, QVBoxLayout, QWidget, QLabel
+
+from impact import ImpactIndex
+from intervals import range_specs
+from linting import ERROR, LintEngine
+
+# Cap on rows shown in the problems panel; the table column still shows all
+MAX_PANEL_ITEMS = 5000
+
+
+class LintWorker(QObject):
+    # diagnostics, dimensions, values, depths, ranges, impact, generation
+    finished = pyqtSignal(object, object, object, object, object, object, int)
+
+    def __init__(self):
+        super().__init__()
+        self.engine = LintEngine()
+
+    @pyqtSlot(object, object, int)
+    def lint(self, rows, specs, generation):
+        self.engine.run(rows)
+        self.engine.set_range_specs(specs)
+        graph = self.engine.graph
+        if self.engine.graph_changed is None:
+            # A fresh index, built here rather than on the GUI thread
+            impact = ImpactIndex(graph)
+        else:
+            impact = {n: tuple(graph[n]) if n in graph else None for n in self.engine.graph_changed}
+        self.finished.emit(dict(self.engine.diagnostics), dict(self.engine.dimensions),
+                           dict(self.engine.values), dict(self.engine.depths), dict(self.engine.ranges),
+                           impact, generation)
+
+
+class LintController(QObject):
+    """Debounces model edits and runs the LintEngine on a worker thread"""
+    DEBOUNCE_MS = 300
+
+    requested = pyqtSignal(object, object, int)
+    updated = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.model = None
+        self.generation = 0
+        self.diagnostics = {}
+        self.dimensions = {}
+        self.values = {}
+        self.impact = None
+
+        self.thread = QThread(self)
+        self.worker = LintWorker()
+        self.worker.moveToThread(self.thread)
+        self.requested.connect(self.worker.lint)
+        self.worker.finished.connect(self._on_finished)
+        self.thread.start()
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(self.DEBOUNCE_MS)
+        self.timer.timeout.connect(self._dispatch)
+
+    def set_model(self, model):
+        if self.model is not None:
+            for signal in (self.model.dataChanged, self.model.rowsInserted,
+                           self.model.rowsRemoved, self.model.modelReset):
+                try:
+                    signal.disconnect(self._on_model_changed)
+                except TypeError:
+                    pass
+        self.model = model
+        # Results still in flight were computed for the previous model
+        self.generation += 1
+        self.diagnostics = {}
+        self.dimensions = {}
+        self.values = {}
+        # self.impact is kept: it mirrors the worker's engine, whose next run
+        # is a delta against whatever it saw last
+        for signal in (model.dataChanged, model.rowsInserted, model.rowsRemoved, model.modelReset):
+            signal.connect(self._on_model_changed)
+        self.schedule()
+
+    def _on_model_changed(self, *args):
+        if len(args) > 1 and isinstance(args[1], QModelIndex):  # dataChanged
+            # Our own updates only touch the Value and Problems columns
+            if args[0].column() > 1:
+                return
+            # Highlighting changes colours only
+            if len(args) > 2 and list(args[2]) == [Qt.ItemDataRole.BackgroundRole]:
+                return
+        self.schedule()
+
+    def schedule(self):
+        self.timer.start()
+
+    def _dispatch(self):
+        if self.model is None:
+            return
+        self.generation += 1
+        self.requested.emit(self.model.snapshot(), range_specs(self.model.cfg), self.generation)
+
+    def _on_finished(self, diagnostics, dimensions, values, depths, ranges, impact, generation):
+        # Index updates are deltas between consecutive runs, so they apply
+        # even when the rest of the result has been superseded
+        if isinstance(impact, ImpactIndex):
+            self.impact = impact
+        elif self.impact is not None and impact:
+            self.impact.update(impact)
+        if generation != self.generation or self.model is None:
+            return  # superseded by a newer request still in flight
+        self.diagnostics = diagnostics
+        self.dimensions = dimensions
+        self.values = values
+        self.model.set_diagnostics(diagnostics)
+        self.model.set_values(values, dimensions, depths)
+        self.model.set_ranges(ranges)
+        self.updated.emit()
+
+    def shutdown(self):
+        self.timer.stop()
+        self.thread.quit()
+        self.thread.wait()
+
+
+class ProblemsPanel(QWidget):
+    activated = pyqtSignal(str)  # variable name
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.summary = QLabel('No problems')
+        layout.addWidget(self.summary)
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(['Severity', 'Variable', 'Message'])
+        self.tree.setRootIsDecorated(False)
+        self.tree.itemActivated.connect(lambda item, col: self.activated.emit(item.text(1)))
+        layout.addWidget(self.tree)
+
+    def set_diagnostics(self, diagnostics):
+        self.tree.clear()
+        errors = warnings = 0
+        items = []
+        for name in sorted(diagnostics):
+            for d in diagnostics[name]:
+                if d.severity == ERROR:
+                    errors += 1
+                else:
+                    warnings += 1
+                if len(items) < MAX_PANEL_ITEMS:
+                    item = QTreeWidgetItem([d.severity, name, d.message])
+                    color = QColor(255, 100, 100) if d.severity == ERROR else QColor(255, 200, 80)
+                    item.setForeground(0, color)
+                    items.append(item)
+        self.tree.addTopLevelItems(items)
+        if errors or warnings:
+            self.summary.setText(f'{errors} error(s), {warnings} warning(s)')
+        else:
+            self.summary.setText('No problems')
+        self.tree.resizeColumnToContents(0)
@@ -0,0 +1,240 @@
+"""On-demand profiling for reports of the editor being slow on a file.
+
+A session records, over a chosen window of time:
+
+- a cProfile of the GUI thread, where the stalls a user feels happen;
+- stack samples of every thread, which also catch the background workers
+  (linting, layout, replace) that cProfile does not see;
+- tracemalloc allocation statistics between the start and the end.
+
+It writes them to a single zip bundle together with anonymized statistics
+of the open file: counts and lengths only, no names, expressions, comments
+or values. Source files appear by base name only, never by full path. benchmarks/replay_bench.py builds a file of the same shape from
+a bundle and runs the GUI scenarios on it.
+"""
+import cProfile
+import io
+import json
+import marshal
+import platform
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+import zipfile
+from collections import Counter
+from pathlib import Path
+
+from expressions import references
+
+BUNDLE_FORMAT = 1
+DEFAULT_SECONDS = 30
+SAMPLE_INTERVAL = 0.005
+# Frames kept per allocation traceback
+TRACE_FRAMES = 10
+TOP_FUNCTIONS = 60
+TOP_ALLOCATIONS = 40
+
+
+def default_bundle_name():
+    return time.strftime('profile-%Y%m%d-%H%M%S.zip')
+
+
+def file_stats(rows, sections):
+    """Shape of an equation file without any of its content.
+
+    rows are (name, expression) pairs in file order and sections maps
+    section names to the names in them. Fan-out counts the references to
+    variables defined in the file.
+    """
+    rows = list(rows)
+    defined = {name for name, _ in rows}
+    fan_out = [sum(1 for r in references(expr) if r in defined) for _, expr in rows]
+    fan_in = Counter(r for _, expr in rows for r in set(references(expr)) if r in defined)
+    return {
+        'rows': len(rows),
+        'sections': len(sections),
+        'section_sizes': sorted((len(names) for names in sections.values()), reverse=True),
+        # Per row, in file order, so a replay keeps their arrangement
+        'expression_lengths': [len(expr) for _, expr in rows],
+        'fan_out': fan_out,
+        'max_fan_in': max(fan_in.values(), default=0),
+    }
+
+
+def _base_name(filename):
+    return Path(filename).name
+
+
+def anonymized_stats(stats):
+    """pstats-style {func: stats} with file names cut to base names; functions
+    whose keys then coincide are combined"""
+    def key(func):
+        filename, line, name = func
+        return _base_name(filename), line, name
+
+    out = {}
+    for func, (cc, nc, tt, ct, callers) in stats.items():
+        callers = {key(caller): value for caller, value in callers.items()}
+        k = key(func)
+        if k in out:
+            out[k] = pstats.add_func_stats(out[k], (cc, nc, tt, ct, callers))
+        else:
+            out[k] = (cc, nc, tt, ct, callers)
+    return out
+
+
+def _by_line(stats):
+    """{(base name, line): [size, count, size_diff, count_diff]} from tracemalloc statistics"""
+    lines = {}
+    for stat in stats:
+        frame = stat.traceback[0]
+        totals = lines.setdefault((_base_name(frame.filename), frame.lineno), [0, 0, 0, 0])
+        totals[0] += stat.size
+        totals[1] += stat.count
+        totals[2] += getattr(stat, 'size_diff', 0)
+        totals[3] += getattr(stat, 'count_diff', 0)
+    return lines
+
+
+class StackSampler(threading.Thread):
+    """Counts the Python stacks of all other threads every interval seconds"""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        me = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    # Base names only: full paths would show where the app is installed
+                    stack.append(f'{Path(code.co_filename).name}:{code.co_name}')
+                    frame = frame.f_back
+                stack.append(names.get(ident, f'thread-{ident}'))
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def folded(self):
+        """Samples in the collapsed format flame graph tools read"""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class _LoadedStats:
+    """Already collected stats in the shape pstats.Stats loads from a profiler"""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class ProfileSession:
+    """One profiling window; start() and stop() must run on the GUI thread"""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.profile = cProfile.Profile()
+        self.sampler = StackSampler(interval)
+        self.started = None
+        self.duration = None
+        self.first = self.last = None  # tracemalloc snapshots
+        self.traced = self.peak = None
+        self._owns_tracing = False
+
+    @property
+    def running(self):
+        return self.started is not None and self.duration is None
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+            self._owns_tracing = True
+        tracemalloc.reset_peak()
+        self.first = tracemalloc.take_snapshot()
+        self.started = time.perf_counter()
+        self.sampler.start()
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+        self.duration = time.perf_counter() - self.started
+        self.sampler.stop()
+        self.last = tracemalloc.take_snapshot()
+        self.traced, self.peak = tracemalloc.get_traced_memory()
+        if self._owns_tracing:
+            tracemalloc.stop()
+
+    def _cpu_report(self, cpu_stats):
+        out = io.StringIO()
+        stats = pstats.Stats(_LoadedStats(cpu_stats), stream=out)
+        stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+        stats.sort_stats('tottime').print_stats(TOP_FUNCTIONS)
+        return out.getvalue()
+
+    def _memory_report(self):
+        lines = [f'Peak traced: {self.peak / 2 ** 20:.1f} MB',
+                 f'Traced at end: {self.traced / 2 ** 20:.1f} MB',
+                 '', f'Top {TOP_ALLOCATIONS} growth by line:']
+        growth = _by_line(self.last.compare_to(self.first, 'lineno'))
+        top = sorted(growth.items(), key=lambda item: (-abs(item[1][2]), -item[1][0]))[:TOP_ALLOCATIONS]
+        lines += [f'{name}:{line}: size={size / 1024:.1f} KiB ({size_diff / 1024:+.1f} KiB), '
+                  f'count={count} ({count_diff:+d})'
+                  for (name, line), (size, count, size_diff, count_diff) in top]
+        lines += ['', f'Top {TOP_ALLOCATIONS} live by line at end:']
+        live = _by_line(self.last.statistics('lineno'))
+        top = sorted(live.items(), key=lambda item: -item[1][0])[:TOP_ALLOCATIONS]
+        lines += [f'{name}:{line}: size={size / 1024:.1f} KiB, count={count}'
+                  for (name, line), (size, count, _, _) in top]
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path, stats, context=None):
+        """Write the bundle to path; stats from file_stats, context any extra facts"""
+        # The tracer's own bookkeeping is noise in the snapshots
+        noise = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        self.first = self.first.filter_traces(noise)
+        self.last = self.last.filter_traces(noise)
+        self.profile.create_stats()
+        cpu_stats = anonymized_stats(self.profile.stats)
+        manifest = {
+            'format': BUNDLE_FORMAT,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'duration_s': round(self.duration, 3),
+            'samples': self.sampler.samples,
+            'sample_interval_s': self.sampler.interval,
+            'peak_traced_mb': round(self.peak / 2 ** 20, 1),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'context': context or {},
+            'stats': stats,
+        }
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as z:
+            z.writestr('manifest.json', json.dumps(manifest))
+            # Same format as pstats.Stats.dump_stats, so pstats and snakeviz open it
+            z.writestr('cpu.prof', marshal.dumps(cpu_stats))
+            z.writestr('cpu.txt', self._cpu_report(cpu_stats))
+            z.writestr('samples.folded', self.sampler.folded())
+            # Statistics only: raw snapshots carry full paths
+            z.writestr('memory.txt', self._memory_report())
+
+
+def read_manifest(path):
+    with zipfile.ZipFile(path) as z:
+        manifest = json.loads(z.read('manifest.json'))
+    if manifest.get('format') != BUNDLE_FORMAT:
+        raise ValueError(f'{path}: unsupported profile bundle format {manifest.get("format")}')
+    return manifest
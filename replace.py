@@ -0,0 +1,222 @@
+"""Find and replace over equation names, expressions and comments.
+
+A ReplaceSpec is turned into a Plan: every hit with its before and after
+text, plus the renames, expressions and comments to write. Renaming a
+variable also rewrites every reference to it, so a plan never leaves
+dangling names; renames onto a name that already exists are reported as
+conflicts and left out. Quoted references in expressions change only
+through those renames: text replacement applies outside the quotes, and
+an expression that would end up referencing an undefined name is
+reported as a conflict instead of being planned. Expressions in
+configuration overlays are replaced the same way as base expressions.
+
+With whole_reference set, a hit must be a complete variable name: the
+whole name, or a whole quoted reference in an expression or comment.
+
+replace_in_files runs the same plan over many files in worker processes
+and rewrites only the files that change.
+"""
+import re
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from config_io import cfg_path_for, load_cfg, rename_in_cfg, save_cfg
+from expressions import REF_RE, references, rename_references
+from parsing import parse_equations, serialize_equations
+
+NAMES = 'name'
+EXPRESSIONS = 'expression'
+COMMENTS = 'comment'
+FIELDS = (NAMES, EXPRESSIONS, COMMENTS)
+
+ReplaceSpec = namedtuple('ReplaceSpec', 'find replacement regex whole_reference case_sensitive fields')
+Hit = namedtuple('Hit', 'name field old new')
+# renames: {old: new}; expressions, comments and overlays ({configuration:
+# {name: expr}}) are keyed by the name before renaming
+Plan = namedtuple('Plan', 'hits renames expressions comments conflicts overlays')
+FileResult = namedtuple('FileResult', 'path hits conflicts written')
+
+QUOTED_RE = re.compile(r'("[^"]*")')
+
+
+class ReplaceError(ValueError):
+    pass
+
+
+def compile_spec(spec: ReplaceSpec):
+    if not spec.find:
+        raise ReplaceError('Nothing to find')
+    pattern = spec.find if spec.regex else re.escape(spec.find)
+    try:
+        return re.compile(pattern, 0 if spec.case_sensitive else re.IGNORECASE)
+    except re.error as e:
+        raise ReplaceError(f'Invalid pattern: {e}') from None
+
+
+def substituter(spec: ReplaceSpec):
+    """(name substitution, text substitution) functions for a spec"""
+    pattern = compile_spec(spec)
+    if spec.regex:
+        def repl(m):
+            try:
+                return m.expand(spec.replacement)
+            except (re.error, IndexError) as e:
+                raise ReplaceError(f'Invalid replacement: {e}') from None
+    else:
+        def repl(m):
+            return spec.replacement
+
+    if not spec.whole_reference:
+        def sub(text):
+            return pattern.sub(repl, text)
+        return sub, sub
+
+    def sub_name(name):
+        m = pattern.fullmatch(name)
+        return repl(m) if m else name
+
+    def sub_text(text):
+        return REF_RE.sub(lambda m: f'"{sub_name(m.group(1))}"', text)
+
+    return sub_name, sub_text
+
+
+def sub_outside_references(text, sub):
+    """text with sub applied to everything outside quoted references"""
+    parts = QUOTED_RE.split(text)
+    parts[0::2] = [sub(part) for part in parts[0::2]]
+    return ''.join(parts)
+
+
+def overlay_field(configuration):
+    """Hit field of an expression in a configuration overlay"""
+    return f'{EXPRESSIONS} [{configuration}]'
+
+
+def plan_replace(rows, comments, spec: ReplaceSpec, configurations=None) -> Plan:
+    """Plan a replacement over (name, expr) rows, a {name: comment} map and
+    {configuration: {name: expr}} overlays"""
+    rows = list(rows)
+    sub_name, sub_text = substituter(spec)
+    hits = []
+    conflicts = []
+
+    renames = {}
+    if NAMES in spec.fields:
+        existing = {name for name, _ in rows}
+        taken = set()
+        for name, _ in rows:
+            new = sub_name(name).strip()
+            if new == name:
+                continue
+            if not new or '"' in new:
+                conflicts.append(f'"{name}": "{new}" is not a valid name')
+            elif new in existing or new in taken:
+                conflicts.append(f'"{name}": "{new}" already exists')
+            else:
+                renames[name] = new
+                taken.add(new)
+                hits.append(Hit(name, NAMES, name, new))
+
+    # Outside quotes there are no whole names, so whole_reference leaves
+    # expressions to the renames alone
+    substitute_expr = EXPRESSIONS in spec.fields and not spec.whole_reference
+    defined = {renames.get(name, name) for name, _ in rows}
+    def plan_expressions(exprs, field):
+        planned = {}
+        for name, expr in exprs:
+            new = sub_outside_references(expr, sub_text) if substitute_expr else expr
+            if renames:
+                new = rename_references(new, renames)
+            if new == expr:
+                continue
+            known = defined | {renames.get(ref, ref) for ref in references(expr)}
+            undefined = [ref for ref in dict.fromkeys(references(new)) if ref not in known]
+            if undefined:
+                missing = ', '.join(f'"{ref}"' for ref in undefined)
+                conflicts.append(f'"{name}": {field} would reference undefined {missing}')
+            else:
+                planned[name] = new
+                hits.append(Hit(name, field, expr, new))
+        return planned
+
+    expressions = plan_expressions(rows, EXPRESSIONS)
+    overlays = {}
+    for configuration, overrides in (configurations or {}).items():
+        planned = plan_expressions(overrides.items(), overlay_field(configuration))
+        if planned:
+            overlays[configuration] = planned
+
+    new_comments = {}
+    if COMMENTS in spec.fields:
+        for name, comment in comments.items():
+            new = sub_text(comment)
+            if new != comment:
+                new_comments[name] = new
+                hits.append(Hit(name, COMMENTS, comment, new))
+    return Plan(hits, renames, expressions, new_comments, conflicts, overlays)
+
+
+def is_empty(plan: Plan) -> bool:
+    return not (plan.renames or plan.expressions or plan.comments or plan.overlays)
+
+
+def apply_to_cfg(cfg, plan: Plan):
+    """Comments, section membership and per-name entries of a cfg after a plan"""
+    comments = cfg.setdefault('comments', {})
+    for name, comment in plan.comments.items():
+        if comment:
+            comments[name] = comment
+        else:
+            comments.pop(name, None)
+    configurations = cfg.get('configurations', {})
+    for configuration, planned in plan.overlays.items():
+        configurations.setdefault(configuration, {}).update(planned)
+    if not plan.renames:
+        return
+    for sec, names in cfg.get('sections', {}).items():
+        cfg['sections'][sec] = [plan.renames.get(n, n) for n in names]
+    for old, new in plan.renames.items():
+        rename_in_cfg(cfg, old, new)
+    # Configuration overlays hold expressions that may reference renamed names
+    for overrides in cfg.get('configurations', {}).values():
+        for name, expr in overrides.items():
+            overrides[name] = rename_references(expr, plan.renames)
+
+
+def replace_in_file(path, spec: ReplaceSpec, write=False) -> FileResult:
+    """Plan (and with write, apply) a replacement in one equations file and its cfg"""
+    from file_lock import FileHandleLock
+    path = Path(path)
+    try:
+        eqs = parse_equations(path.read_text(encoding='utf-8'))
+    except (OSError, UnicodeDecodeError) as e:
+        return FileResult(str(path), [], [f'cannot be read: {e}'], False)
+    cfg = load_cfg(cfg_path_for(path))
+    plan = plan_replace(((e['name'], e['expr']) for e in eqs), cfg.get('comments', {}), spec,
+                        cfg.get('configurations', {}))
+    if not write or is_empty(plan):
+        return FileResult(str(path), plan.hits, plan.conflicts, False)
+
+    lock = FileHandleLock(path)
+    if not lock.try_acquire():
+        return FileResult(str(path), plan.hits, plan.conflicts + ['locked by another program; not written'], False)
+    try:
+        rewritten = [{'name': plan.renames.get(e['name'], e['name']),
+                      'expr': plan.expressions.get(e['name'], e['expr'])} for e in eqs]
+        apply_to_cfg(cfg, plan)
+        lock.write_all(serialize_equations(rewritten))
+        save_cfg(cfg_path_for(path), cfg)
+    finally:
+        lock.release()
+    return FileResult(str(path), plan.hits, plan.conflicts, True)
+
+
+def replace_in_files(paths, spec: ReplaceSpec, write=False, jobs=None):
+    """replace_in_file over many files, in parallel worker processes"""
+    paths = [str(p) for p in paths]
+    if len(paths) <= 1 or jobs == 1:
+        return [replace_in_file(p, spec, write) for p in paths]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(replace_in_file, paths, [spec] * len(paths), [write] * len(paths)))
@@ -0,0 +1,252 @@
+from pathlib import Path
+
+from PyQt6.QtCore import QObject, QThread, Qt, pyqtSignal, pyqtSlot
+from PyQt6.QtGui import QUndoCommand
+from PyQt6.QtWidgets import QCheckBox, QComboBox, QGridLayout, QHBoxLayout, QLabel, QLineEdit, QMessageBox, \
+    QPushButton, QTreeWidget, QTreeWidgetItem, QVBoxLayout, QWidget
+
+from configurations import CONFIGURATIONS_KEY
+from replace import COMMENTS, EXPRESSIONS, NAMES, ReplaceError, ReplaceSpec, compile_spec, is_empty, \
+    plan_replace, replace_in_files
+
+# Cap on hits listed; counts always cover every hit
+MAX_ITEMS = 5000
+
+THIS_FILE = 'This file'
+WORKSPACE = 'This file and workspace files'
+
+PATH_ROLE = Qt.ItemDataRole.UserRole
+
+
+class ReplaceCommand(QUndoCommand):
+    """One replacement in the open file; undo and redo swap the edits with their inverse"""
+
+    def __init__(self, model, plan, text):
+        super().__init__(text)
+        self.model = model
+        self.edits = (plan.renames, plan.expressions, plan.comments, plan.overlays)
+
+    def redo(self):
+        self.edits = self.model.apply_edits(*self.edits)
+
+    undo = redo
+
+
+class ReplaceWorker(QObject):
+    # plan for the open file (or None), [FileResult], write, generation
+    finished = pyqtSignal(object, object, bool, int)
+    failed = pyqtSignal(str, int)
+
+    @pyqtSlot(object, object, object, object, object, bool, int)
+    def run(self, spec, rows, comments, configurations, paths, write, generation):
+        try:
+            plan = plan_replace(rows, comments, spec, configurations) if rows is not None else None
+            # Other files are planned, and with write rewritten, in worker processes
+            results = replace_in_files(paths, spec, write) if paths else []
+        except (ReplaceError, OSError) as e:
+            self.failed.emit(str(e), generation)
+            return
+        self.finished.emit(plan, results, write, generation)
+
+
+class ReplacePanel(QWidget):
+    """Regex find and replace over names, expressions and comments, with a preview"""
+    activated = pyqtSignal(object, str)  # path (None for the open file), variable name
+    requested = pyqtSignal(object, object, object, object, object, bool, int)
+
+    def __init__(self, undo_stack, parent=None):
+        super().__init__(parent)
+        self.undo_stack = undo_stack
+        self.model = None
+        self.cfg = None
+        self.path = None
+        self.workspace = None
+        self.generation = 0
+        self.target = None  # model a request was made for
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        grid = QGridLayout()
+        self.find_edit = QLineEdit()
+        self.find_edit.setPlaceholderText('Find (e.g. (.*) panel thickness)')
+        self.replace_edit = QLineEdit()
+        self.replace_edit.setPlaceholderText('Replace with (\\1 for a group in regex mode)')
+        self.find_edit.returnPressed.connect(self.preview)
+        self.replace_edit.returnPressed.connect(self.preview)
+        grid.addWidget(QLabel('Find:'), 0, 0)
+        grid.addWidget(self.find_edit, 0, 1)
+        grid.addWidget(QLabel('Replace:'), 1, 0)
+        grid.addWidget(self.replace_edit, 1, 1)
+        layout.addLayout(grid)
+
+        options = QHBoxLayout()
+        self.regex_box = QCheckBox('Regex')
+        self.whole_box = QCheckBox('Whole reference')
+        self.whole_box.setToolTip('Match complete variable names only')
+        self.case_box = QCheckBox('Match case')
+        self.case_box.setChecked(True)
+        for box in (self.regex_box, self.whole_box, self.case_box):
+            options.addWidget(box)
+        options.addStretch(1)
+        layout.addLayout(options)
+
+        fields = QHBoxLayout()
+        fields.addWidget(QLabel('In:'))
+        self.field_boxes = {}
+        for field, label in ((NAMES, 'Names'), (EXPRESSIONS, 'Expressions'), (COMMENTS, 'Comments')):
+            box = QCheckBox(label)
+            box.setChecked(field != COMMENTS)
+            self.field_boxes[field] = box
+            fields.addWidget(box)
+        self.scope = QComboBox()
+        self.scope.addItems([THIS_FILE, WORKSPACE])
+        fields.addWidget(self.scope)
+        fields.addStretch(1)
+        layout.addLayout(fields)
+
+        buttons = QHBoxLayout()
+        self.preview_button = QPushButton('Preview')
+        self.preview_button.clicked.connect(self.preview)
+        self.apply_button = QPushButton('Replace All')
+        self.apply_button.setEnabled(False)
+        self.apply_button.clicked.connect(self.apply)
+        buttons.addWidget(self.preview_button)
+        buttons.addWidget(self.apply_button)
+        buttons.addStretch(1)
+        layout.addLayout(buttons)
+
+        self.summary = QLabel('')
+        self.summary.setWordWrap(True)
+        layout.addWidget(self.summary)
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(['File', 'Variable', 'In', 'Before', 'After'])
+        self.tree.setRootIsDecorated(False)
+        self.tree.itemActivated.connect(
+            lambda item, col: self.activated.emit(item.data(0, PATH_ROLE), item.text(1)))
+        layout.addWidget(self.tree, 1)
+
+        for widget in (self.find_edit, self.replace_edit):
+            widget.textChanged.connect(self._invalidate)
+        for box in (self.regex_box, self.whole_box, self.case_box, *self.field_boxes.values()):
+            box.toggled.connect(self._invalidate)
+        self.scope.currentIndexChanged.connect(self._invalidate)
+
+        self.thread = QThread(self)
+        self.worker = ReplaceWorker()
+        self.worker.moveToThread(self.thread)
+        self.requested.connect(self.worker.run)
+        self.worker.finished.connect(self._on_finished)
+        self.worker.failed.connect(self._on_failed)
+        self.thread.start()
+
+    def set_source(self, model, cfg, path):
+        self.model = model
+        self.cfg = cfg
+        self.path = path
+        self._invalidate()
+
+    def set_workspace(self, workspace):
+        self.workspace = workspace
+        self._invalidate()
+
+    def spec(self):
+        return ReplaceSpec(self.find_edit.text(), self.replace_edit.text(), self.regex_box.isChecked(),
+                           self.whole_box.isChecked(), self.case_box.isChecked(),
+                           tuple(f for f, box in self.field_boxes.items() if box.isChecked()))
+
+    def _other_paths(self):
+        if self.scope.currentText() != WORKSPACE or self.workspace is None:
+            return []
+        self.workspace.rescan()
+        current = Path(self.path).resolve() if self.path else None
+        return [p for p in self.workspace.paths if p != current]
+
+    def _invalidate(self, *_):
+        # Any change to the search makes the shown preview stale
+        self.generation += 1
+        self.apply_button.setEnabled(False)
+
+    def _request(self, write):
+        if self.model is None:
+            return
+        spec = self.spec()
+        try:
+            compile_spec(spec)
+        except ReplaceError as e:
+            self.summary.setText(str(e))
+            return
+        self.generation += 1
+        self.target = self.model
+        self.apply_button.setEnabled(False)
+        self.summary.setText('Replacing…' if write else 'Searching…')
+        configurations = {c: dict(overrides) for c, overrides in self.cfg.get(CONFIGURATIONS_KEY, {}).items()}
+        self.requested.emit(spec, list(self.model.base_rows()), dict(self.cfg.get('comments', {})),
+                            configurations, self._other_paths(), write, self.generation)
+
+    def preview(self):
+        self._request(False)
+
+    def apply(self):
+        others = sum(1 for i in range(self.tree.topLevelItemCount())
+                     if self.tree.topLevelItem(i).data(0, PATH_ROLE) is not None)
+        if others and QMessageBox.question(
+                self, 'Replace All', 'Files other than the open one are rewritten on disk, '
+                'and that part cannot be undone. Continue?') != QMessageBox.StandardButton.Yes:
+            return
+        self._request(True)
+
+    def _on_failed(self, message, generation):
+        if generation == self.generation:
+            self.summary.setText(message)
+
+    def _on_finished(self, plan, results, write, generation):
+        if write:
+            # Applied even if the search changed meanwhile: the files are already rewritten
+            self._applied(plan, results)
+        elif generation == self.generation:
+            self._show(plan, results)
+
+    def _show(self, plan, results):
+        self.tree.clear()
+        items = []
+        count = len(plan.hits)
+        files = 1 if plan.hits else 0
+        conflicts = [f'{Path(self.path).name}: {c}' for c in plan.conflicts]
+        rows = [(None, Path(self.path).name, h) for h in plan.hits]
+        for r in results:
+            if r.hits:
+                files += 1
+                count += len(r.hits)
+                label = self.workspace.relative(Path(r.path)) if self.workspace else r.path
+                rows.extend((r.path, label, h) for h in r.hits)
+            conflicts.extend(f'{Path(r.path).name}: {c}' for c in r.conflicts)
+        for path, label, hit in rows[:MAX_ITEMS]:
+            item = QTreeWidgetItem([label, hit.name, hit.field, hit.old, hit.new])
+            item.setData(0, PATH_ROLE, path)
+            items.append(item)
+        self.tree.addTopLevelItems(items)
+        for col in range(3):
+            self.tree.resizeColumnToContents(col)
+        text = f'{count} hit(s) in {files} file(s)'
+        if conflicts:
+            text += f'; {len(conflicts)} skipped: ' + '; '.join(conflicts[:5])
+        self.summary.setText(text)
+        self.apply_button.setEnabled(count > 0)
+
+    def _applied(self, plan, results):
+        if not is_empty(plan) and self.target is self.model:
+            self.undo_stack.push(ReplaceCommand(self.model, plan, f'Replace "{self.find_edit.text()}"'))
+        written = sum(1 for r in results if r.written)
+        failed = [f'{Path(r.path).name}: {r.conflicts[-1]}' for r in results
+                  if r.hits and not r.written and r.conflicts]
+        text = f'Replaced {len(plan.hits)} hit(s) in this file'
+        if results:
+            text += f' and rewrote {written} other file(s)'
+        if failed:
+            text += '; not written: ' + '; '.join(failed[:5])
+        self.tree.clear()
+        self.summary.setText(text)
+
+    def shutdown(self):
+        self.thread.quit()
+        self.thread.wait()
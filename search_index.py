@@ -0,0 +1,160 @@
+import hashlib
+import re
+import sqlite3
+import threading
+from pathlib import Path
+
+from config_io import cfg_path_for, load_cfg
+from parsing import parse_equations
+from storage import cache_dir
+
+EQUATION_GLOB = '*.txt'
+
+SCHEMA = '''
+PRAGMA journal_mode = WAL;
+PRAGMA synchronous = NORMAL;
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    signature TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS docs USING fts5(name, expr, comment, section, prefix = '2 3');
+'''
+# A document's rowid is (file id << ROW_BITS) | row, so one file's documents
+# form a contiguous rowid range that can be replaced without a table scan
+ROW_BITS = 32
+# bm25 column weights: name, expr, comment, section
+RANK = 'bm25(docs, 10.0, 2.0, 5.0, 1.0)'
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def index_path_for(root: Path) -> Path:
+    key = hashlib.sha1(str(Path(root).resolve()).encode('utf-8')).hexdigest()
+    return cache_dir() / f'search-{key}.sqlite'
+
+
+def to_fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query: every word must match as a prefix"""
+    return ' '.join(f'"{t}"*' for t in TERM_RE.findall(text))
+
+
+class SearchIndex:
+    """Persistent full-text index over names, expressions and cfg comments.
+
+    Backed by SQLite FTS5. Files are re-indexed only when the signature
+    (mtime and size) of the .txt or its .cfg sidecar changes. Safe to share
+    between a background updater and GUI queries: the lock is released
+    between files, so queries never wait for a whole reindex.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+
+    @classmethod
+    def for_root(cls, root: Path):
+        return cls(index_path_for(root))
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    @staticmethod
+    def _signature(path: Path) -> str:
+        parts = []
+        for p in (path, cfg_path_for(path)):
+            try:
+                st = p.stat()
+                parts.append(f'{st.st_mtime_ns}:{st.st_size}')
+            except OSError:
+                parts.append('-')
+        return '|'.join(parts)
+
+    def update(self, paths, progress=None, cancelled=lambda: False):
+        """Re-index the given files where they changed; returns how many did"""
+        paths = [Path(p).resolve() for p in paths]
+        with self._lock:
+            known = dict(self.conn.execute('SELECT path, signature FROM files'))
+        changed = 0
+        for i, path in enumerate(paths):
+            if cancelled():
+                break
+            sig = self._signature(path)
+            if known.get(str(path)) != sig:
+                self._index_file(path, sig)
+                changed += 1
+            if progress is not None:
+                progress(i + 1, len(paths))
+        return changed
+
+    def update_directory(self, root: Path, progress=None, cancelled=lambda: False):
+        """Sync the index with every equation file under root"""
+        root = Path(root).resolve()
+        paths = sorted(p.resolve() for p in root.rglob(EQUATION_GLOB) if p.is_file())
+        present = {str(p) for p in paths}
+        with self._lock:
+            stale = [p for (p,) in self.conn.execute('SELECT path FROM files')
+                     if p not in present and Path(p).is_relative_to(root)]
+        for p in stale:
+            self.remove(p)
+        return self.update(paths, progress, cancelled)
+
+    def _delete_docs(self, file_id):
+        self.conn.execute('DELETE FROM docs WHERE rowid >= ? AND rowid < ?',
+                          (file_id << ROW_BITS, (file_id + 1) << ROW_BITS))
+
+    def remove(self, path):
+        with self._lock, self.conn:
+            row = self.conn.execute('SELECT id FROM files WHERE path = ?', (str(path),)).fetchone()
+            if row is not None:
+                self._delete_docs(row[0])
+                self.conn.execute('DELETE FROM files WHERE id = ?', (row[0],))
+
+    def _index_file(self, path: Path, sig: str):
+        try:
+            eqs = parse_equations(path.read_text(encoding='utf-8'))
+        except (OSError, UnicodeDecodeError):
+            eqs = []
+        cfg = load_cfg(cfg_path_for(path))
+        comments = cfg.get('comments', {})
+        section_of = {n: sec for sec, names in cfg.get('sections', {}).items() for n in names}
+        with self._lock, self.conn:
+            found = self.conn.execute('SELECT id FROM files WHERE path = ?', (str(path),)).fetchone()
+            if found is None:
+                file_id = self.conn.execute('INSERT INTO files (path, signature) VALUES (?, ?)',
+                                            (str(path), sig)).lastrowid
+            else:
+                file_id = found[0]
+                self._delete_docs(file_id)
+                self.conn.execute('UPDATE files SET signature = ? WHERE id = ?', (sig, file_id))
+            base = file_id << ROW_BITS
+            self.conn.executemany(
+                'INSERT INTO docs (rowid, name, expr, comment, section) VALUES (?, ?, ?, ?, ?)',
+                ((base | row, e['name'], e['expr'], comments.get(e['name'], ''), section_of.get(e['name'], ''))
+                 for row, e in enumerate(eqs))
+            )
+
+    def search(self, text: str, limit=50):
+        """Ranked hits for free text; each word matches as a prefix"""
+        query = to_fts_query(text)
+        if not query:
+            return []
+        with self._lock:
+            cur = self.conn.execute(
+                f'SELECT files.path, docs.rowid, name, expr, comment, section, {RANK} AS score '
+                f'FROM docs JOIN files ON files.id = (docs.rowid >> {ROW_BITS}) '
+                f'WHERE docs MATCH ? ORDER BY score LIMIT ?',
+                (query, limit)
+            )
+            mask = (1 << ROW_BITS) - 1
+            return [
+                {'path': Path(p), 'row': rid & mask, 'name': n, 'expr': x, 'comment': c, 'section': s, 'score': sc}
+                for p, rid, n, x, c, s, sc in cur
+            ]
+
+    def file_count(self) -> int:
+        with self._lock:
+            return self.conn.execute('SELECT COUNT(*) FROM files').fetchone()[0]
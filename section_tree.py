@@ -0,0 +1,269 @@
+from bisect import bisect_left
+
+from PyQt6.QtCore import Qt, QAbstractItemModel, QModelIndex
+
+# "Body/Holes" is shown as section "Holes" nested under "Body"
+SEPARATOR = '/'
+NAME_ROLE = Qt.ItemDataRole.UserRole
+# Equation rows handed to the view per fetchMore on an expanded section
+FETCH_BATCH = 500
+
+
+def split_path(path):
+    parts = path.split(SEPARATOR)
+    if all(p.strip() for p in parts):
+        return parts
+    return [path]
+
+
+class _Node:
+    __slots__ = ('label', 'path', 'parent', 'children', 'real', 'count', 'total', 'fetched')
+
+    def __init__(self, label, path, parent):
+        self.label = label
+        self.path = path
+        self.parent = parent
+        self.children = []
+        # False for groups that only exist because a nested section names them
+        self.real = False
+        self.count = 0  # own members
+        self.total = 0  # own members plus those of nested sections
+        self.fetched = 0  # equation rows handed to the view
+
+    def row(self):
+        return self.parent.children.index(self)
+
+    def child(self, label):
+        # The synthetic All row has no path; a section named "All" is separate
+        for c in self.children:
+            if c.label == label and c.path is not None:
+                return c
+        return None
+
+
+class SectionTreeModel(QAbstractItemModel):
+    """Sections as a tree, with the equations of each section as its leaves.
+
+    Equation leaves are paged in through fetchMore when a section is
+    expanded. Counts are adjusted along one path of the tree when the
+    EquationModel reports which sections changed, so nothing is rebuilt
+    after an edit.
+    """
+
+    def __init__(self, source, parent=None):
+        super().__init__(parent)
+        self.source = source
+        self._root = _Node('', None, None)
+        self._all = _Node('All', None, self._root)
+        self._root.children.append(self._all)
+        self._build()
+        source.sectionsChanged.connect(self.sections_changed)
+
+    def _build(self):
+        self._all.total = len(self.source.equations)
+        for path, members in sorted(self.source.cfg.get('sections', {}).items(),
+                                    key=lambda item: item[0].casefold()):
+            node = self._root
+            for i, label in enumerate(split_path(path)):
+                child = node.child(label)
+                if child is None:
+                    sub_path = SEPARATOR.join(split_path(path)[:i + 1])
+                    child = _Node(label, sub_path, node)
+                    node.children.append(child)
+                node = child
+            node.real = True
+            node.count = len(members)
+            while node is not self._root:
+                node.total += len(members)
+                node = node.parent
+
+    # ------------ Item model ------------
+    def _node(self, index):
+        """Section node an index refers to; None for equation leaves"""
+        if not index.isValid():
+            return self._root
+        parent = index.internalPointer()
+        row = index.row()
+        return parent.children[row] if row < len(parent.children) else None
+
+    def _index(self, node):
+        if node is self._root:
+            return QModelIndex()
+        return self.createIndex(node.row(), 0, node.parent)
+
+    def index(self, row, column, parent=QModelIndex()):
+        node = self._node(parent)
+        if node is None or column != 0 or not 0 <= row < len(node.children) + node.fetched:
+            return QModelIndex()
+        return self.createIndex(row, column, node)
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        return self._index(index.internalPointer())
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        node = self._node(parent)
+        return 0 if node is None else len(node.children) + node.fetched
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        node = self._node(parent)
+        return node is not None and bool(node.children or node.count)
+
+    def canFetchMore(self, parent):
+        node = self._node(parent)
+        return node is not None and node.fetched < node.count
+
+    def fetchMore(self, parent):
+        node = self._node(parent)
+        if node is None or node.fetched >= node.count:
+            return
+        first = len(node.children) + node.fetched
+        count = min(FETCH_BATCH, node.count - node.fetched)
+        self.beginInsertRows(parent, first, first + count - 1)
+        node.fetched += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        node = self._node(index)
+        if node is None:
+            parent = index.internalPointer()
+            if role in (Qt.ItemDataRole.DisplayRole, NAME_ROLE):
+                members = self.source.cfg['sections'].get(parent.path, [])
+                row = index.row() - len(parent.children)
+                return members[row] if row < len(members) else None
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return f'{node.label} ({node.total})'
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return node.path
+        return None
+
+    # ------------ Queries ------------
+    def is_section(self, index):
+        return self._node(index) is not None
+
+    def name_at(self, index):
+        """Variable name of an equation leaf, else None"""
+        if not index.isValid() or self.is_section(index):
+            return None
+        return self.data(index, NAME_ROLE)
+
+    def path_at(self, index):
+        """Section name of a section row; None for All, groups and leaves"""
+        node = self._node(index) if index.isValid() else None
+        return node.path if node is not None and node.real else None
+
+    def subset_at(self, index):
+        """Sections shown when a row is chosen: the section and every section
+        nested under it, or None for All"""
+        node = self._node(index)
+        if node is None or node is self._all:
+            return None
+        paths = set()
+        stack = [node]
+        while stack:
+            n = stack.pop()
+            if n.real:
+                paths.add(n.path)
+            stack.extend(n.children)
+        return paths
+
+    def all_index(self):
+        return self._index(self._all)
+
+    def index_of_section(self, path):
+        node = self._find(path)
+        return self._index(node) if node is not None else QModelIndex()
+
+    def _find(self, path):
+        node = self._root
+        for label in split_path(path):
+            node = node.child(label)
+            if node is None:
+                return None
+        return node
+
+    # ------------ Incremental updates ------------
+    def sections_changed(self, paths):
+        """Sections whose member list changed, appeared or disappeared"""
+        sections = self.source.cfg.get('sections', {})
+        for path in sorted(paths):
+            members = sections.get(path)
+            node = self._find(path)
+            if members is None:
+                if node is not None and node.real:
+                    node.real = False
+                    self._set_count(node, 0)
+                    self._prune(node)
+                continue
+            if node is None:
+                node = self._insert(path)
+            node.real = True
+            self._set_count(node, len(members))
+        total = len(self.source.equations)
+        if total != self._all.total:
+            self._all.total = total
+            index = self.all_index()
+            self.dataChanged.emit(index, index)
+
+    def _set_count(self, node, count):
+        old = node.count
+        node.count = count
+        index = self._index(node)
+        # Keep an expanded section's leaves in step with its member list
+        base = len(node.children)
+        target = node.fetched
+        if node.fetched and node.fetched >= old:
+            target = max(node.fetched, min(count, FETCH_BATCH))
+        target = min(target, count)
+        if target < node.fetched:
+            self.beginRemoveRows(index, base + target, base + node.fetched - 1)
+            node.fetched = target
+            self.endRemoveRows()
+        elif target > node.fetched:
+            self.beginInsertRows(index, base + node.fetched, base + target - 1)
+            node.fetched = target
+            self.endInsertRows()
+        if node.fetched:
+            self.dataChanged.emit(self.index(base, 0, index), self.index(base + node.fetched - 1, 0, index))
+        delta = count - old
+        while node is not self._root:
+            node.total += delta
+            index = self._index(node)
+            self.dataChanged.emit(index, index)
+            node = node.parent
+
+    def _insert(self, path):
+        node = self._root
+        parts = split_path(path)
+        for i, label in enumerate(parts):
+            child = node.child(label)
+            if child is None:
+                # All stays first
+                start = 1 if node is self._root else 0
+                keys = [c.label.casefold() for c in node.children[start:]]
+                row = start + bisect_left(keys, label.casefold())
+                child = _Node(label, SEPARATOR.join(parts[:i + 1]), node)
+                self.beginInsertRows(self._index(node), row, row)
+                node.children.insert(row, child)
+                self.endInsertRows()
+            node = child
+        return node
+
+    def _prune(self, node):
+        # Drop groups left with neither members nor nested sections
+        while node is not self._root and not node.real and not node.children and not node.count:
+            parent = node.parent
+            row = node.row()
+            self.beginRemoveRows(self._index(parent), row, row)
+            del parent.children[row]
+            self.endRemoveRows()
+            node = parent
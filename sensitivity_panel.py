@@ -0,0 +1,68 @@
+from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtWidgets import QDoubleSpinBox, QHBoxLayout, QLabel, QTreeWidget, QTreeWidgetItem, QVBoxLayout, QWidget
+
+from evaluation import EvaluationError, Program, sensitivities
+
+
+class SensitivityPanel(QWidget):
+    """Partial derivatives of one output with respect to its driving values"""
+    activated = pyqtSignal(str)  # variable name
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.output = None
+        self.value = None
+        self.ranked = []
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.summary = QLabel('Right-click an equation and choose Sensitivity')
+        self.summary.setWordWrap(True)
+        layout.addWidget(self.summary)
+
+        step_row = QHBoxLayout()
+        step_row.addWidget(QLabel('Input step:'))
+        self.step = QDoubleSpinBox()
+        self.step.setDecimals(4)
+        self.step.setRange(0.0001, 1000.0)
+        self.step.setValue(0.01)
+        self.step.valueChanged.connect(lambda _: self._populate())
+        step_row.addWidget(self.step)
+        step_row.addStretch(1)
+        layout.addLayout(step_row)
+
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(['Input', 'Derivative', 'Change per step'])
+        self.tree.setRootIsDecorated(False)
+        self.tree.itemActivated.connect(lambda item, col: self.activated.emit(item.text(0)))
+        layout.addWidget(self.tree)
+
+    def analyze(self, rows, output):
+        """Run the forward-mode pass for output over (name, expr) rows"""
+        self.output = output
+        try:
+            self.value, self.ranked = sensitivities(Program(rows), output)
+        except EvaluationError as e:
+            self.value, self.ranked = None, []
+            self.summary.setText(f'"{output}" cannot be evaluated: {e}')
+            self.tree.clear()
+            return
+        self._populate()
+
+    def _populate(self):
+        if self.output is None or self.value is None:
+            return
+        self.tree.clear()
+        step = self.step.value()
+        if self.ranked:
+            self.summary.setText(f'"{self.output}" = {self.value:.6g}, depends on {len(self.ranked)} input(s)')
+        else:
+            self.summary.setText(f'"{self.output}" = {self.value:.6g} does not depend on any other equation')
+        items = []
+        for name, d in self.ranked:
+            item = QTreeWidgetItem([name, f'{d:.6g}', f'{d * step:+.6g}'])
+            item.setTextAlignment(1, Qt.AlignmentFlag.AlignRight)
+            item.setTextAlignment(2, Qt.AlignmentFlag.AlignRight)
+            items.append(item)
+        self.tree.addTopLevelItems(items)
+        self.tree.resizeColumnToContents(0)
@@ -0,0 +1,377 @@
+"""Local JSON-RPC service that evaluates equation files for other tools.
+
+Runs without Qt::
+
+    python app.py serve [--port 8765 | --unix /tmp/equations.sock] [FILES...]
+
+Each line a client sends is a JSON-RPC 2.0 request or a batch (array) of
+them; each answer is one line. Requests on a connection are answered in
+order as they arrive, so a client may pipeline any number of them before
+reading. Files stay loaded between requests and are re-read when their
+modification time or size changes, the lint engine reworking only the
+changed rows.
+
+Methods (params by name):
+
+- ``evaluate(path, names=None)``: values in document units, how the
+  editor shows them, and errors
+- ``sweep(path, input, values, outputs)``: outputs for each input value
+- ``dependents(path, names, transitive=True)`` and
+  ``dependencies(path, names, transitive=False)``
+- ``load(path)``, ``files()``, ``ping()``
+"""
+import asyncio
+import inspect
+import json
+import os
+import socket
+from pathlib import Path
+
+from config_io import cfg_path_for, load_cfg
+from dependencies import invert
+from evaluation import Program, format_value
+from linting import ERROR, LintEngine
+from parsing import parse_equations
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# Longest request line accepted (a batch is one line)
+MAX_LINE = 16 * 1024 * 1024
+MAX_SWEEP_POINTS = 10000
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+
+class RpcError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _signature(path):
+    def stat(p):
+        try:
+            st = os.stat(p)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+    return stat(path), stat(cfg_path_for(path))
+
+
+class LoadedFile:
+    """An equations file kept in memory with the lint engine's results"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.signature = None
+        self.engine = LintEngine()
+        self.exprs = {}
+        self.cfg = None
+        self.loads = 0
+        self.program = None
+        self.dependents = {}
+
+    def stale(self):
+        return _signature(self.path) != self.signature
+
+    def refresh(self):
+        """Re-read the file; an unchanged file costs two stat calls"""
+        signature = _signature(self.path)
+        if signature == self.signature:
+            return False
+        if signature[0] is None:
+            raise RpcError(SERVER_ERROR, f'File not found: {self.path}')
+        text = self.path.read_text(encoding='utf-8')
+        rows = [(e['name'], e['expr']) for e in parse_equations(text)]
+        self.engine.run(rows)
+        self.exprs = dict(rows)
+        self.cfg = load_cfg(cfg_path_for(self.path))
+        # Built here, off the event loop, so requests only look things up
+        self.program = Program(rows)
+        self.dependents = invert(self.program.graph)
+        self.signature = signature
+        self.loads += 1
+        return True
+
+    def check_names(self, names, param='names'):
+        if not isinstance(names, list) or not all(isinstance(n, str) for n in names):
+            raise RpcError(INVALID_PARAMS, f'{param} must be a list of names')
+        unknown = [n for n in names if n not in self.exprs]
+        if unknown:
+            raise RpcError(INVALID_PARAMS, 'Unknown name(s): ' + ', '.join(f'"{n}"' for n in unknown[:10]))
+
+
+def _walk(graph, names, transitive):
+    result = {}
+    for name in names:
+        found = set(graph.get(name, ()))
+        if transitive:
+            stack = list(found)
+            while stack:
+                for r in graph.get(stack.pop(), ()):
+                    if r not in found:
+                        found.add(r)
+                        stack.append(r)
+            found.discard(name)
+        result[name] = sorted(found)
+    return result
+
+
+class EquationService:
+    """Method implementations and the JSON-RPC plumbing around them"""
+
+    def __init__(self):
+        self._files = {}
+        self._locks = {}
+        self.requests = 0
+
+    async def file(self, path) -> LoadedFile:
+        path = Path(path).resolve()
+        lock = self._locks.setdefault(path, asyncio.Lock())
+        async with lock:
+            loaded = self._files.get(path)
+            if loaded is None:
+                loaded = self._files[path] = LoadedFile(path)
+            if loaded.stale():
+                # Parsing and linting a large file would stall every client
+                await asyncio.get_running_loop().run_in_executor(None, loaded.refresh)
+            return loaded
+
+    # ------------ Methods ------------
+    async def rpc_ping(self):
+        return 'pong'
+
+    async def rpc_load(self, path):
+        loaded = await self.file(path)
+        return {'path': str(loaded.path), 'equations': len(loaded.exprs), 'loads': loaded.loads}
+
+    async def rpc_files(self):
+        return [{'path': str(f.path), 'equations': len(f.exprs), 'loads': f.loads} for f in self._files.values()]
+
+    async def rpc_evaluate(self, path, names=None):
+        loaded = await self.file(path)
+        engine = loaded.engine
+        if names is None:
+            names = list(loaded.exprs)
+        loaded.check_names(names)
+        values, display, errors = {}, {}, {}
+        for name in names:
+            value = engine.values.get(name)
+            if value is not None:
+                values[name] = value
+                display[name] = format_value(value, engine.dimensions.get(name))
+            problems = [d.message for d in engine.diagnostics.get(name, ()) if d.severity == ERROR]
+            if problems:
+                errors[name] = problems[0]
+            elif value is None:
+                errors[name] = 'No value'
+        return {'values': values, 'display': display, 'errors': errors}
+
+    async def rpc_sweep(self, path, input, values, outputs):
+        loaded = await self.file(path)
+        if not isinstance(input, str):
+            raise RpcError(INVALID_PARAMS, 'input must be a name')
+        loaded.check_names(outputs, 'outputs')
+        loaded.check_names([input])
+        if not isinstance(values, list) or not all(isinstance(v, (int, float)) for v in values):
+            raise RpcError(INVALID_PARAMS, 'values must be a list of numbers')
+        if len(values) > MAX_SWEEP_POINTS:
+            raise RpcError(INVALID_PARAMS, f'At most {MAX_SWEEP_POINTS} sweep points per request')
+        results = loaded.program.sweep(input, values, outputs)
+        points = [{'input': v, 'outputs': out, 'errors': errors} for v, (out, errors) in zip(values, results)]
+        return {'input': input, 'points': points}
+
+    async def rpc_dependents(self, path, names, transitive=True):
+        loaded = await self.file(path)
+        loaded.check_names(names)
+        return _walk(loaded.dependents, names, transitive)
+
+    async def rpc_dependencies(self, path, names, transitive=False):
+        loaded = await self.file(path)
+        loaded.check_names(names)
+        return _walk(loaded.program.graph, names, transitive)
+
+    # ------------ JSON-RPC ------------
+    async def handle_line(self, line: bytes):
+        """Response line for one request line, or None for notifications only"""
+        try:
+            message = json.loads(line)
+        except ValueError as e:
+            return self._encode(_error(None, PARSE_ERROR, f'Parse error: {e}'))
+        if isinstance(message, list):
+            if not message:
+                return self._encode(_error(None, INVALID_REQUEST, 'Empty batch'))
+            responses = [r for r in [await self.handle(m) for m in message] if r is not None]
+            return self._encode(responses) if responses else None
+        response = await self.handle(message)
+        return None if response is None else self._encode(response)
+
+    async def handle(self, request):
+        self.requests += 1
+        if not isinstance(request, dict) or request.get('jsonrpc') != '2.0' \
+                or not isinstance(request.get('method'), str):
+            return _error(None, INVALID_REQUEST, 'Invalid request')
+        rid = request.get('id')
+        method = getattr(self, 'rpc_' + request['method'], None)
+        if method is None:
+            return None if 'id' not in request else _error(rid, METHOD_NOT_FOUND, f"Unknown method {request['method']}")
+        params = request.get('params', {})
+        try:
+            if isinstance(params, list):
+                bound = inspect.signature(method).bind(*params)
+            elif isinstance(params, dict):
+                bound = inspect.signature(method).bind(**params)
+            else:
+                raise TypeError('params must be an object or array')
+        except TypeError as e:
+            return _error(rid, INVALID_PARAMS, str(e))
+        try:
+            result = await method(*bound.args, **bound.kwargs)
+        except RpcError as e:
+            return _error(rid, e.code, e.message)
+        except (TypeError, KeyError) as e:
+            # Params of the wrong shape fail inside the method
+            return _error(rid, INVALID_PARAMS, f'Invalid params: {e}')
+        except (OSError, ValueError) as e:
+            return _error(rid, SERVER_ERROR, str(e))
+        if 'id' not in request:
+            return None
+        return {'jsonrpc': '2.0', 'id': rid, 'result': result}
+
+    @staticmethod
+    def _encode(obj):
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8') + b'\n'
+
+    async def connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    writer.write(self._encode(_error(None, INVALID_REQUEST, 'Request line too long')))
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                response = await self.handle_line(line)
+                if response is not None:
+                    writer.write(response)
+                    # Returns at once unless the client has stopped reading
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def _error(rid, code, message):
+    return {'jsonrpc': '2.0', 'id': rid, 'error': {'code': code, 'message': message}}
+
+
+async def start(service, host=DEFAULT_HOST, port=DEFAULT_PORT, unix=None):
+    if unix is not None:
+        return await asyncio.start_unix_server(service.connection, path=str(unix), limit=MAX_LINE)
+    return await asyncio.start_server(service.connection, host, port, limit=MAX_LINE)
+
+
+def serve(files=(), host=DEFAULT_HOST, port=DEFAULT_PORT, unix=None, ready=None):
+    """Run until interrupted; ready(address) is called once listening"""
+    async def main():
+        service = EquationService()
+        for path in files:
+            await service.file(path)
+        server = await start(service, host, port, unix)
+        address = str(unix) if unix is not None else '%s:%d' % server.sockets[0].getsockname()[:2]
+        if ready is not None:
+            ready(address)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if unix is not None and os.path.exists(unix):
+            os.unlink(unix)
+
+
+class Client:
+    """Blocking client for scripts.
+
+        with Client(port=8765) as c:
+            c.call('evaluate', path='part.txt', names=['width'])
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix=None, timeout=60):
+        if unix is not None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(timeout)
+            sock.connect(str(unix))
+        else:
+            sock = socket.create_connection((host, port), timeout=timeout)
+        self._sock = sock
+        self._file = sock.makefile('rwb')
+        self._next_id = 0
+
+    def _request(self, method, params):
+        self._next_id += 1
+        return {'jsonrpc': '2.0', 'id': self._next_id, 'method': method, 'params': params}
+
+    def _send(self, obj):
+        self._file.write(json.dumps(obj, separators=(',', ':')).encode('utf-8') + b'\n')
+
+    def _receive(self):
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError('server closed the connection')
+        return json.loads(line)
+
+    @staticmethod
+    def _result(response):
+        if 'error' in response:
+            raise RpcError(response['error']['code'], response['error']['message'])
+        return response['result']
+
+    def call(self, method, **params):
+        self._send(self._request(method, params))
+        self._file.flush()
+        return self._result(self._receive())
+
+    def batch(self, calls):
+        """Results of [(method, params)] sent as one JSON-RPC batch; failed
+        calls come back as RpcError instances"""
+        requests = [self._request(m, p) for m, p in calls]
+        self._send(requests)
+        self._file.flush()
+        by_id = {r.get('id'): r for r in self._receive()}
+        return [self._outcome(by_id[r['id']]) for r in requests]
+
+    def pipeline(self, calls):
+        """Like batch, but as separate requests written before any answer is read"""
+        for m, p in calls:
+            self._send(self._request(m, p))
+        self._file.flush()
+        return [self._outcome(self._receive()) for _ in calls]
+
+    def _outcome(self, response):
+        try:
+            return self._result(response)
+        except RpcError as e:
+            return e
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
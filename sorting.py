@@ -0,0 +1,32 @@
+"""Sort keys for the equations table."""
+import re
+from math import inf
+
+# Sort key for the dependency depth, which has no column of its own
+DEPTH_KEY = 'depth'
+DEPTH_LABEL = 'Dependency depth'
+
+_DIGITS = re.compile(r'(\d+)')
+
+
+def natural_key(text):
+    """Case-insensitive key that orders digit runs by value ("panel 2" < "panel 10")"""
+    parts = _DIGITS.split(text.casefold())
+    parts[1::2] = map(int, parts[1::2])
+    return tuple(parts)
+
+
+def value_key(value):
+    # Rows without a value (or NaN, which compares unequal to everything) go last
+    if value is None or value != value:
+        return (1, 0.0)
+    return (0, value)
+
+
+def range_key(interval):
+    # By width: the values that vary most over the input ranges sort last
+    return value_key(None if interval is None else interval.hi - interval.lo)
+
+
+def depth_key(depth):
+    return inf if depth is None else depth
@@ -0,0 +1,249 @@
+import hashlib
+import sqlite3
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+
+from parsing import iter_equations
+
+# Files at least this large are opened through an EquationStore instead of a list
+LAZY_THRESHOLD_BYTES = 4 * 1024 * 1024
+PAGE_SIZE = 2000
+CACHE_PAGES = 8
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS eq (
+    id INTEGER PRIMARY KEY,
+    pos INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    expr TEXT NOT NULL,
+    line_index INTEGER
+);
+CREATE INDEX IF NOT EXISTS eq_pos ON eq (pos);
+CREATE INDEX IF NOT EXISTS eq_name ON eq (name);
+'''
+
+
+def cache_dir() -> Path:
+    return Path(tempfile.gettempdir()) / 'SWEquationsEditor'
+
+
+def cache_path_for(txt_path: Path) -> Path:
+    key = hashlib.sha1(str(Path(txt_path).resolve()).encode('utf-8')).hexdigest()
+    return cache_dir() / f'{key}.sqlite'
+
+
+def should_use_store(txt_path: Path) -> bool:
+    try:
+        return Path(txt_path).stat().st_size >= LAZY_THRESHOLD_BYTES
+    except OSError:
+        return False
+
+
+class StoredRow(dict):
+    """Equation dict whose field assignments are written through to its store"""
+
+    def __init__(self, store, rowid, data):
+        super().__init__(data)
+        self._store = store
+        self._rowid = rowid
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        if key in ('name', 'expr'):
+            self._store._write(self._rowid, key, value)
+
+
+class EquationStore:
+    """List-like sequence of equation dicts kept in an on-disk SQLite cache.
+
+    Rows are read in pages through a small LRU cache, so only the part of a
+    file that is actually shown is ever materialised as Python objects.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(str(db_path))
+        self.conn.executescript(SCHEMA)
+        self._pages = OrderedDict()
+        self._len = self.conn.execute('SELECT COUNT(*) FROM eq').fetchone()[0]
+        self._dirty = self._meta('dirty') == '1'
+
+    @classmethod
+    def open(cls, txt_path: Path, read_text=None):
+        """Open the cache for txt_path, rebuilding it if the file changed.
+
+        read_text is called only when a rebuild is needed; by default the
+        file is streamed from disk line by line.
+        """
+        txt_path = Path(txt_path)
+        db_path = cache_path_for(txt_path)
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        store = cls(db_path)
+        if not store.is_fresh(txt_path):
+            store.rebuild(txt_path, read_text)
+        return store
+
+    # ------------ Cache bookkeeping ------------
+    def _meta(self, key):
+        row = self.conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self.conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, str(value)))
+
+    @staticmethod
+    def _signature(txt_path: Path):
+        st = txt_path.stat()
+        return f'{st.st_mtime_ns}:{st.st_size}'
+
+    def is_fresh(self, txt_path: Path) -> bool:
+        try:
+            sig = self._signature(txt_path)
+        except OSError:
+            return False
+        return not self._dirty and self._meta('source') == sig
+
+    def rebuild(self, txt_path: Path, read_text=None):
+        if read_text is not None:
+            rows = iter_equations(read_text())
+        else:
+            f = open(txt_path, 'r', encoding='utf-8')
+            rows = iter_equations(f)
+        try:
+            with self.conn:
+                self.conn.execute('DELETE FROM eq')
+                self.conn.executemany(
+                    'INSERT INTO eq (pos, name, expr, line_index) VALUES (?, ?, ?, ?)',
+                    ((pos, e['name'], e['expr'], e['line_index']) for pos, e in enumerate(rows))
+                )
+                self._set_meta('dirty', 0)
+                self._set_meta('source', self._signature(txt_path))
+        finally:
+            if read_text is None:
+                f.close()
+        self._pages.clear()
+        self._dirty = False
+        self._len = self.conn.execute('SELECT COUNT(*) FROM eq').fetchone()[0]
+
+    def mark_synced(self, txt_path: Path):
+        """Record that the cache matches txt_path again (e.g. after a save)"""
+        with self.conn:
+            self._set_meta('dirty', 0)
+            self._set_meta('source', self._signature(txt_path))
+        self._dirty = False
+
+    def _touch(self):
+        if not self._dirty:
+            self._set_meta('dirty', 1)
+            self._dirty = True
+
+    def close(self):
+        try:
+            self.conn.commit()
+            self.conn.close()
+        except Exception:
+            pass
+
+    # ------------ Paging ------------
+    def _page(self, number):
+        page = self._pages.get(number)
+        if page is not None:
+            self._pages.move_to_end(number)
+            return page
+        start = number * PAGE_SIZE
+        cur = self.conn.execute(
+            'SELECT id, name, expr, line_index FROM eq WHERE pos >= ? AND pos < ? ORDER BY pos',
+            (start, start + PAGE_SIZE)
+        )
+        page = [StoredRow(self, rid, {'name': n, 'expr': x, 'line_index': li}) for rid, n, x, li in cur]
+        self._pages[number] = page
+        while len(self._pages) > CACHE_PAGES:
+            self._pages.popitem(last=False)
+        return page
+
+    def _invalidate_from(self, pos):
+        first = pos // PAGE_SIZE
+        for number in [n for n in self._pages if n >= first]:
+            del self._pages[number]
+
+    # ------------ Sequence protocol ------------
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, pos):
+        if pos < 0:
+            pos += self._len
+        if not 0 <= pos < self._len:
+            raise IndexError('equation index out of range')
+        return self._page(pos // PAGE_SIZE)[pos % PAGE_SIZE]
+
+    def __iter__(self):
+        # Stream in pages so a full pass never holds every row at once
+        for number in range((self._len + PAGE_SIZE - 1) // PAGE_SIZE):
+            yield from self._page(number)
+
+    def names(self):
+        for (name,) in self.conn.execute('SELECT name FROM eq ORDER BY pos'):
+            yield name
+
+    def items(self):
+        for name, expr in self.conn.execute('SELECT name, expr FROM eq ORDER BY pos'):
+            yield name, expr
+
+    def index_of(self, name) -> int:
+        row = self.conn.execute('SELECT MIN(pos) FROM eq WHERE name = ?', (name,)).fetchone()
+        return -1 if row is None or row[0] is None else row[0]
+
+    def append(self, item):
+        self._touch()
+        cur = self.conn.execute(
+            'INSERT INTO eq (pos, name, expr, line_index) VALUES (?, ?, ?, ?)',
+            (self._len, item['name'], item['expr'], item.get('line_index'))
+        )
+        self.conn.commit()
+        self._invalidate_from(self._len)
+        self._len += 1
+        return cur.lastrowid
+
+    def extend(self, items):
+        items = list(items)
+        if not items:
+            return
+        self._touch()
+        with self.conn:
+            self.conn.executemany(
+                'INSERT INTO eq (pos, name, expr, line_index) VALUES (?, ?, ?, ?)',
+                ((self._len + i, e['name'], e['expr'], e.get('line_index')) for i, e in enumerate(items))
+            )
+        self._invalidate_from(self._len)
+        self._len += len(items)
+
+    def pop(self, pos=-1):
+        item = self[pos]
+        if pos < 0:
+            pos += self._len
+        self._touch()
+        with self.conn:
+            self.conn.execute('DELETE FROM eq WHERE id = ?', (item._rowid,))
+            self.conn.execute('UPDATE eq SET pos = pos - 1 WHERE pos > ?', (pos,))
+        self._invalidate_from(pos)
+        self._len -= 1
+        return dict(item)
+
+    def delete_range(self, start, stop):
+        """Delete rows start..stop-1 with a single shift of later positions"""
+        if stop <= start:
+            return
+        self._touch()
+        with self.conn:
+            self.conn.execute('DELETE FROM eq WHERE pos >= ? AND pos < ?', (start, stop))
+            self.conn.execute('UPDATE eq SET pos = pos - ? WHERE pos >= ?', (stop - start, stop))
+        self._invalidate_from(start)
+        self._len -= stop - start
+
+    def _write(self, rowid, key, value):
+        self._touch()
+        self.conn.execute(f'UPDATE eq SET {key} = ? WHERE id = ?', (value, rowid))
+        self.conn.commit()
@@ -0,0 +1,102 @@
+"""Change log shared by editor sessions that have the same file open.
+
+The session holding the file lock appends one JSON line per save to
+<name>.changes next to the .cfg: the equations added or changed, the
+names removed and the top-level cfg entries that changed, together with
+the file signature before and after the save. Read-only sessions tail the
+log and apply each delta whose 'before' signature is the one they mirror,
+which then moves on to 'after'. A delta that does not line up (one they
+missed, or a save without a usable baseline) means they cannot catch up
+incrementally and have to reload.
+"""
+import json
+from collections import namedtuple
+
+from config_io import cfg_path_for
+
+LOG_SUFFIX = '.changes'
+# The writer starts the log afresh once it grows past this
+MAX_LOG_BYTES = 4 * 1024 * 1024
+# Per-session cfg entries that are not shared
+LOCAL_KEYS = ('active_configuration', 'last_opened')
+
+# before and after are file signatures; changed maps names to expressions
+# (None when the writer had no baseline), cfg holds replaced top-level entries
+Delta = namedtuple('Delta', 'before after changed removed cfg')
+
+
+def log_path_for(txt_path):
+    return cfg_path_for(txt_path).with_suffix(LOG_SUFFIX)
+
+
+def diff_rows(old, new):
+    """({name: expr} added or changed, [names removed]) between two {name: expr} maps"""
+    changed = {n: x for n, x in new.items() if old.get(n) != x}
+    removed = [n for n in old if n not in new]
+    return changed, removed
+
+
+def cfg_state(cfg):
+    """Comparable form of the shared cfg entries"""
+    return {k: json.dumps(v, sort_keys=True) for k, v in cfg.items() if k not in LOCAL_KEYS}
+
+
+def diff_cfg(old_state, cfg):
+    new_state = cfg_state(cfg)
+    changed = {k: cfg[k] for k, v in new_state.items() if old_state.get(k) != v}
+    # Entries dropped from the cfg come across as empty
+    changed.update({k: {} for k in old_state if k not in new_state})
+    return changed, new_state
+
+
+def append_delta(log_path, delta):
+    line = json.dumps({'before': delta.before, 'after': delta.after, 'changed': delta.changed,
+                       'removed': delta.removed, 'cfg': delta.cfg}) + '\n'
+    try:
+        size = log_path.stat().st_size
+    except OSError:
+        size = 0
+    mode = 'w' if size > MAX_LOG_BYTES else 'a'
+    with open(log_path, mode, encoding='utf-8') as f:
+        f.write(line)
+
+
+def _signature(value):
+    return tuple(value) if value is not None else None
+
+
+class ChangeLogReader:
+    """Reads the deltas appended to a change log since the last read"""
+
+    def __init__(self, log_path):
+        self.path = log_path
+        # Only what is appended from now on is of interest
+        try:
+            self.offset = log_path.stat().st_size
+        except OSError:
+            self.offset = 0
+
+    def read(self):
+        try:
+            size = self.path.stat().st_size
+        except OSError:
+            return []
+        if size < self.offset:
+            self.offset = 0  # started afresh by the writer
+        if size == self.offset:
+            return []
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+        # A line still being written is picked up by the next read
+        end = data.rfind(b'\n') + 1
+        self.offset += end
+        deltas = []
+        for line in data[:end].splitlines():
+            try:
+                entry = json.loads(line)
+                deltas.append(Delta(_signature(entry['before']), _signature(entry['after']),
+                                    entry['changed'], entry['removed'], entry['cfg']))
+            except (ValueError, KeyError, TypeError):
+                continue
+        return deltas
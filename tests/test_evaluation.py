@@ -0,0 +1,58 @@
+import pytest
+
+from evaluation import FLOAT, Program, compile_expression
+from intervals import INTERVAL, Interval
+from linting import LintEngine
+
+WRONG_ARITY = ['sin()', 'abs()', 'min(4)', 'max("x")', 'sqrt(4, 9)', 'max(1, 2, 3)', 'if(1, 2)']
+
+
+@pytest.mark.parametrize('expr', WRONG_ARITY)
+def test_wrong_arity_is_a_compile_error(expr):
+    compiled = compile_expression(expr)
+    assert compiled.fn is None
+    assert 'argument' in compiled.error
+
+
+@pytest.mark.parametrize('expr', WRONG_ARITY)
+def test_wrong_arity_is_a_diagnostic(expr):
+    engine = LintEngine()
+    engine.run([('x', '1'), ('y', expr)])
+    assert 'y' not in engine.values
+    assert any('argument' in d.message for d in engine.diagnostics['y'])
+
+
+def test_wrong_arity_does_not_stop_evaluation():
+    values, errors = Program([('x', '2'), ('y', 'sin()'), ('z', '"x" * 3')]).run()
+    assert values['z'] == 6.0
+    assert 'argument' in errors['y']
+
+
+def test_max_and_min_take_two_arguments():
+    assert compile_expression('max(1, 2)').value == 2.0
+    assert compile_expression('min(1, 2)').value == 1.0
+    fn = compile_expression('max("a", "b")').fn
+    assert fn({'a': 1.0, 'b': 3.0}, FLOAT) == 3.0
+    assert fn({'a': Interval(0, 1), 'b': Interval(2, 3)}, INTERVAL) == Interval(2, 3)
+    with pytest.raises(TypeError):
+        FLOAT.call('max', [1.0, 2.0, 3.0])
+
+
+def test_interval_power_with_negative_base_and_integer_exponents():
+    fn = compile_expression('"x" ^ "y"').fn
+    x, y = Interval(-2.0, 3.0), Interval(1.5, 3.5)
+    bound = fn({'x': x, 'y': y}, INTERVAL)
+    for xv in (-2.0, -1.0, 0.5, 3.0):
+        for yv in (2.0, 3.0):
+            assert bound.lo <= fn({'x': xv, 'y': yv}, FLOAT) <= bound.hi
+    # No integer exponent in range: only the non-negative part of the base evaluates
+    assert fn({'x': x, 'y': Interval(1.25, 1.75)}, INTERVAL).lo >= 0.0
+
+
+def test_interval_if_keeps_branch_valid_at_integer_exponents():
+    fn = compile_expression('if("y" = 3, 4, "x" ^ "y")').fn
+    env = {'x': Interval(-1.5, -1.0), 'y': Interval(1.5, 3.5)}
+    bound = fn(env, INTERVAL)
+    for yv in (2.0, 3.0):
+        value = fn({'x': -1.5, 'y': yv}, FLOAT)
+        assert bound.lo <= value <= bound.hi
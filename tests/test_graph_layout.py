@@ -0,0 +1,35 @@
+from graph_layout import GraphLayout
+
+FILLER = [(f'filler {i}', f'{i}mm') for i in range(40)]
+
+
+def full_layout(rows):
+    layout = GraphLayout()
+    return layout.run(rows, {})
+
+
+def test_incremental_layout_matches_full_relayout_with_a_cycle():
+    rows = [('c', '1mm'), ('a', '"b" + "c"'), ('b', '"a" + 1mm'), ('d', '"a" + 1mm')] + FILLER
+    layout = GraphLayout()
+    layout.run(rows, {})
+    for i in range(5):
+        rows[0] = ('c', f'{i + 2}mm')
+        snapshot = layout.run(rows, {})
+    expected = full_layout(rows)
+    assert layout.full_layouts == 1
+    assert snapshot.layer_of == expected.layer_of
+    assert len(snapshot.layers) == len(expected.layers)
+    assert snapshot.layer_of['a'] == snapshot.layer_of['b'] == 1
+    assert snapshot.layer_of['d'] == 2
+
+
+def test_creating_and_breaking_a_cycle_matches_full_relayout():
+    rows = [('c', '1mm'), ('a', '"c" * 2'), ('b', '"a" + 1mm'), ('d', '"b" + 1mm')] + FILLER
+    layout = GraphLayout()
+    layout.run(rows, {})
+    for expr in ['"d" + "c"', '"c" * 3']:
+        rows[1] = ('a', expr)
+        snapshot = layout.run(rows, {})
+        expected = full_layout(rows)
+        assert snapshot.layer_of == expected.layer_of
+        assert all(snapshot.layers)
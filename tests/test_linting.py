@@ -0,0 +1,63 @@
+import pytest
+
+from linting import LintEngine
+
+FILLER = [(f'filler {i}', f'{i}mm') for i in range(40)]
+CHAIN = [
+    ('width', '10mm'),
+    ('height', '"width" * 2'),
+    ('area', '"height" * "width"'),
+    ('volume', '"area" * 3'),
+    ('mass', '"volume" * 2'),
+] + FILLER
+
+
+def full_pass(rows, specs=None):
+    engine = LintEngine()
+    if specs:
+        engine.set_range_specs(specs)
+    engine.run(rows)
+    return engine
+
+
+def test_new_cycle_clears_values_below_it():
+    engine = full_pass(CHAIN)
+    assert engine.values['mass'] == 1200.0
+    edited = [('width', '"height" / 2')] + CHAIN[1:]
+    engine.run(edited)
+    expected = full_pass(edited)
+    assert engine.values == expected.values
+    assert 'volume' not in engine.values and 'mass' not in engine.values
+
+
+def test_range_specs_skip_nothing_below_a_cycle():
+    rows = [('c', '1mm'), ('a', '"b" + "c"'), ('b', '"a" + 1mm'), ('d', '"a" + "c"')] + FILLER
+    engine = full_pass(rows)
+    engine.set_range_specs({'c': (0.0, 2.0, False)})
+    expected = full_pass(rows, {'c': (0.0, 2.0, False)})
+    assert engine.ranges == expected.ranges
+    assert not {'a', 'b', 'd'} & engine.ranges.keys()
+
+
+@pytest.mark.parametrize('edit', ['"height" / 2', '"mass"'])
+def test_incremental_matches_full_pass_with_cycles(edit):
+    specs = {'filler 3': (0.0, 1.0, False), 'width': (-1.0, 1.0, True)}
+    engine = full_pass(CHAIN, specs)
+    edited = [('width', edit)] + CHAIN[1:]
+    engine.run(edited)
+    expected = full_pass(edited, specs)
+    assert engine.values == expected.values
+    assert engine.ranges == expected.ranges
+    # Cycle paths may start at a different member
+    assert engine.diagnostics.keys() == expected.diagnostics.keys()
+
+
+def test_depth_of_a_cycle_does_not_grow_with_edits():
+    rows = [('c', '1mm'), ('a', '"b" + "c"'), ('b', '"a" + 1mm'), ('d', '"a" + 1mm')] + FILLER
+    engine = full_pass(rows)
+    for i in range(5):
+        rows[0] = ('c', f'{i + 2}mm')
+        engine.run(rows)
+    assert engine.depths == full_pass(rows).depths
+    assert engine.depths['a'] == engine.depths['b'] == 1
+    assert engine.depths['d'] == 2
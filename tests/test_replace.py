@@ -0,0 +1,45 @@
+from replace import EXPRESSIONS, FIELDS, NAMES, ReplaceSpec, apply_to_cfg, overlay_field, plan_replace
+
+ROWS = [('width', '10mm'), ('width2', '20mm'), ('w', '"width" + "width2"'),
+        ('outer panel', '3mm'), ('x', '"outer panel" * 2 + 5mm')]
+
+
+def spec(find, replacement, whole=False, fields=FIELDS):
+    return ReplaceSpec(find, replacement, False, whole, True, fields)
+
+
+def test_conflicting_rename_leaves_references_alone():
+    for whole in (True, False):
+        plan = plan_replace(ROWS, {}, spec('width', 'width2', whole))
+        assert '"width": "width2" already exists' in plan.conflicts
+        assert 'width' not in plan.renames
+        assert plan.expressions.get('w', '"width" + "width2"').startswith('"width" + ')
+
+
+def test_expression_text_outside_quotes_only():
+    plan = plan_replace(ROWS, {}, spec('panel', 'plate', fields=(EXPRESSIONS,)))
+    assert plan.expressions == {}
+    plan = plan_replace(ROWS, {}, spec('5mm', '6mm', fields=(EXPRESSIONS,)))
+    assert plan.expressions == {'x': '"outer panel" * 2 + 6mm'}
+
+
+def test_undefined_reference_is_a_conflict():
+    plan = plan_replace(ROWS, {}, spec('5mm', '"nope"', fields=(EXPRESSIONS,)))
+    assert not plan.expressions
+    assert any('"nope"' in c for c in plan.conflicts)
+
+
+def test_configuration_overlays_are_replaced():
+    configurations = {'Long': {'x': '"outer panel" * 4 + 5mm'}}
+    plan = plan_replace(ROWS, {}, spec('5mm', '7mm', fields=(EXPRESSIONS,)), configurations)
+    assert plan.overlays == {'Long': {'x': '"outer panel" * 4 + 7mm'}}
+    assert any(h.field == overlay_field('Long') for h in plan.hits)
+
+
+def test_rename_follows_into_overlays():
+    cfg = {'sections': {'Unassigned': [n for n, _ in ROWS]}, 'comments': {},
+           'configurations': {'Long': {'x': '"outer panel" * 4 + 5mm'}}}
+    plan = plan_replace(ROWS, {}, spec('outer panel', 'outer', True, (NAMES, EXPRESSIONS)),
+                        cfg['configurations'])
+    apply_to_cfg(cfg, plan)
+    assert cfg['configurations'] == {'Long': {'x': '"outer" * 4 + 5mm'}}
@@ -0,0 +1,316 @@
+from PyQt6.QtCore import QObject, QPointF, QRectF, Qt, QThread, pyqtSignal, pyqtSlot
+from PyQt6.QtGui import QColor, QDoubleValidator, QPainter, QPen
+from PyQt6.QtWidgets import (
+    QComboBox, QDoubleSpinBox, QHBoxLayout, QHeaderView, QLabel, QLineEdit, QProgressBar,
+    QPushButton, QSpinBox, QTableWidget, QTableWidgetItem, QTreeWidget, QTreeWidgetItem, QVBoxLayout, QWidget
+)
+
+from evaluation import Program
+from tolerances import (
+    DEFAULT_SAMPLES, DISTRIBUTIONS, ToleranceError, limits_of, monte_carlo, tolerances_of
+)
+
+
+class StackupWorker(QObject):
+    progress = pyqtSignal(int, int, int)  # done, total, generation
+    finished = pyqtSignal(object, str, int)  # {output: Stackup} or None, error, generation
+
+    def __init__(self):
+        super().__init__()
+        # Set from the GUI thread; a run for an older generation stops early
+        self.latest = 0
+
+    @pyqtSlot(object, object, object, object, int, int)
+    def run(self, rows, tolerances, outputs, limits, samples, generation):
+        try:
+            results = monte_carlo(Program(rows), tolerances, outputs, samples, limits,
+                                  progress=lambda done, total: self.progress.emit(done, total, generation),
+                                  cancelled=lambda: generation != self.latest)
+        except ToleranceError as e:
+            self.finished.emit(None, str(e), generation)
+            return
+        self.finished.emit(results, '', generation)
+
+
+class HistogramView(QWidget):
+    """Bars of a Stackup histogram with the nominal value and spec limits marked"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.stackup = None
+        self.setMinimumHeight(140)
+
+    def set_stackup(self, stackup):
+        self.stackup = stackup
+        self.update()
+
+    def paintEvent(self, event):
+        if self.stackup is None or not self.stackup.histogram[0]:
+            return
+        counts, edges = self.stackup.histogram
+        painter = QPainter(self)
+        area = QRectF(self.rect()).adjusted(4, 4, -4, -4)
+        low, high = edges[0], edges[-1]
+        peak = max(counts) or 1
+
+        def x_of(value):
+            return area.left() + (value - low) / (high - low) * area.width()
+
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(QColor(90, 140, 220))
+        width = area.width() / len(counts)
+        for i, count in enumerate(counts):
+            height = count / peak * area.height()
+            painter.drawRect(QRectF(area.left() + i * width, area.bottom() - height, max(width - 1, 1), height))
+        marks = [(self.stackup.nominal, QColor(230, 230, 230))] if self.stackup.nominal is not None else []
+        marks += [(limit, QColor(255, 100, 100)) for limit in (self.stackup.lower, self.stackup.upper)
+                  if limit is not None]
+        for value, color in marks:
+            if low <= value <= high:
+                painter.setPen(QPen(color, 2))
+                painter.drawLine(QPointF(x_of(value), area.top()), QPointF(x_of(value), area.bottom()))
+        painter.end()
+
+
+class TolerancePanel(QWidget):
+    """Monte Carlo stack-up of one output over the toleranced driving values.
+
+    Tolerances and spec limits are edited straight into the cfg, so they
+    are written with the next save.
+    """
+    activated = pyqtSignal(str)  # variable name
+    changed = pyqtSignal()  # tolerances edited
+    requested = pyqtSignal(object, object, object, object, int, int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.cfg = None
+        self.model = None
+        self.output = None
+        self.generation = 0
+
+        self.thread = QThread(self)
+        self.worker = StackupWorker()
+        self.worker.moveToThread(self.thread)
+        self.requested.connect(self.worker.run)
+        self.worker.progress.connect(self._on_progress)
+        self.worker.finished.connect(self._on_finished)
+        self.thread.start()
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.summary = QLabel('Right-click an equation and choose Tolerance Stack-up')
+        self.summary.setWordWrap(True)
+        layout.addWidget(self.summary)
+
+        limits_row = QHBoxLayout()
+        self.lower = QLineEdit()
+        self.upper = QLineEdit()
+        for label, edit in (('Lower limit:', self.lower), ('Upper limit:', self.upper)):
+            edit.setValidator(QDoubleValidator())
+            edit.setPlaceholderText('none')
+            edit.editingFinished.connect(self._limits_edited)
+            limits_row.addWidget(QLabel(label))
+            limits_row.addWidget(edit)
+        layout.addLayout(limits_row)
+
+        self.inputs = QTableWidget(0, 4)
+        self.inputs.setHorizontalHeaderLabels(['Toleranced input', 'Distribution', 'Minus', 'Plus'])
+        self.inputs.verticalHeader().setVisible(False)
+        self.inputs.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.inputs.cellDoubleClicked.connect(lambda row, col: self.activated.emit(self.inputs.item(row, 0).text()))
+        layout.addWidget(self.inputs)
+
+        run_row = QHBoxLayout()
+        remove = QPushButton('Remove Input')
+        remove.clicked.connect(self._remove_selected)
+        run_row.addWidget(remove)
+        run_row.addStretch(1)
+        run_row.addWidget(QLabel('Samples:'))
+        self.samples = QSpinBox()
+        self.samples.setRange(1000, 10000000)
+        self.samples.setSingleStep(10000)
+        self.samples.setValue(DEFAULT_SAMPLES)
+        run_row.addWidget(self.samples)
+        self.run_button = QPushButton('Run')
+        self.run_button.clicked.connect(self.run)
+        run_row.addWidget(self.run_button)
+        self.cancel_button = QPushButton('Cancel')
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel)
+        run_row.addWidget(self.cancel_button)
+        layout.addLayout(run_row)
+
+        self.progress = QProgressBar()
+        self.progress.setVisible(False)
+        layout.addWidget(self.progress)
+
+        self.histogram = HistogramView()
+        layout.addWidget(self.histogram)
+
+        self.stats = QTreeWidget()
+        self.stats.setHeaderLabels(['Statistic', 'Value'])
+        self.stats.setRootIsDecorated(False)
+        layout.addWidget(self.stats)
+
+    # ------------ Setup ------------
+    def set_source(self, model, cfg):
+        """Analyze the rows of an EquationModel with the tolerances in cfg"""
+        if model is not self.model:
+            self.cancel()
+            self.output = None
+            self.histogram.set_stackup(None)
+            self.stats.clear()
+            # Renames and deletions move or drop tolerances in the cfg
+            model.dataChanged.connect(lambda *_: self.sync())
+            model.rowsRemoved.connect(lambda *_: self.sync())
+        self.model = model
+        self.cfg = cfg
+        self._populate_inputs()
+
+    def sync(self):
+        shown = {self.inputs.item(row, 0).text() for row in range(self.inputs.rowCount())}
+        if self.cfg is not None and shown != set(self.cfg.get('tolerances', {})):
+            self._populate_inputs()
+
+    def set_output(self, name):
+        self.output = name
+        lower, upper = limits_of(self.cfg, name)
+        self.lower.setText('' if lower is None else f'{lower:g}')
+        self.upper.setText('' if upper is None else f'{upper:g}')
+        self.summary.setText(f'Output "{name}"')
+
+    def add_input(self, name):
+        tolerances = self.cfg.setdefault('tolerances', {})
+        if name not in tolerances:
+            tolerances[name] = {'distribution': 'normal', 'minus': 0.0, 'plus': 0.0}
+            self._populate_inputs()
+            self.changed.emit()
+        for row in range(self.inputs.rowCount()):
+            if self.inputs.item(row, 0).text() == name:
+                self.inputs.selectRow(row)
+
+    def _populate_inputs(self):
+        specs = self.cfg.get('tolerances', {}) if self.cfg else {}
+        _, errors = tolerances_of(self.cfg)
+        self.inputs.setRowCount(0)
+        for name in sorted(specs, key=str.casefold):
+            spec = specs[name] if isinstance(specs[name], dict) else {}
+            row = self.inputs.rowCount()
+            self.inputs.insertRow(row)
+            item = QTableWidgetItem(name)
+            item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
+            if name in errors:
+                item.setForeground(QColor(255, 100, 100))
+                item.setToolTip(errors[name])
+            self.inputs.setItem(row, 0, item)
+            combo = QComboBox()
+            combo.addItems(DISTRIBUTIONS)
+            combo.setCurrentText(str(spec.get('distribution', 'normal')))
+            combo.currentTextChanged.connect(lambda text, n=name: self._set_spec(n, 'distribution', text))
+            self.inputs.setCellWidget(row, 1, combo)
+            for col, key in ((2, 'minus'), (3, 'plus')):
+                spin = QDoubleSpinBox()
+                spin.setDecimals(4)
+                spin.setRange(0.0, 1e9)
+                spin.setSingleStep(0.01)
+                try:
+                    spin.setValue(float(spec.get(key, 0.0)))
+                except (TypeError, ValueError):
+                    pass
+                spin.valueChanged.connect(lambda value, n=name, k=key: self._set_spec(n, k, value))
+                self.inputs.setCellWidget(row, col, spin)
+
+    def _set_spec(self, name, key, value):
+        spec = self.cfg.get('tolerances', {}).get(name)
+        if isinstance(spec, dict):
+            spec[key] = value
+            self.changed.emit()
+
+    def _remove_selected(self):
+        rows = sorted({i.row() for i in self.inputs.selectedIndexes()}, reverse=True)
+        tolerances = self.cfg.get('tolerances', {}) if self.cfg else {}
+        for row in rows:
+            tolerances.pop(self.inputs.item(row, 0).text(), None)
+        if rows:
+            self._populate_inputs()
+            self.changed.emit()
+
+    def _limits_edited(self):
+        if self.cfg is None or self.output is None:
+            return
+        spec = {}
+        for key, edit in (('lower', self.lower), ('upper', self.upper)):
+            try:
+                spec[key] = float(edit.text())
+            except ValueError:
+                pass
+        limits = self.cfg.setdefault('spec_limits', {})
+        if spec:
+            limits[self.output] = spec
+        else:
+            limits.pop(self.output, None)
+
+    # ------------ Running ------------
+    def run(self):
+        if self.output is None or self.model is None:
+            return
+        self._limits_edited()
+        tolerances, errors = tolerances_of(self.cfg)
+        if errors:
+            name = sorted(errors)[0]
+            self.summary.setText(f'Tolerance of "{name}" is invalid: {errors[name]}')
+            return
+        self.generation += 1
+        self.worker.latest = self.generation
+        self.progress.setValue(0)
+        self.progress.setVisible(True)
+        self.run_button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        self.summary.setText(f'Sampling "{self.output}"…')
+        limits = {self.output: limits_of(self.cfg, self.output)}
+        self.requested.emit(self.model.snapshot(), tolerances, [self.output], limits, self.samples.value(), self.generation)
+
+    def cancel(self):
+        self.generation += 1
+        self.worker.latest = self.generation
+        self._idle()
+
+    def _idle(self):
+        self.progress.setVisible(False)
+        self.run_button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+
+    def _on_progress(self, done, total, generation):
+        if generation == self.generation:
+            self.progress.setMaximum(total)
+            self.progress.setValue(done)
+
+    def _on_finished(self, results, error, generation):
+        if generation != self.generation:
+            return  # cancelled or superseded
+        self._idle()
+        if results is None:
+            self.summary.setText(f'"{self.output}" cannot be sampled: {error}')
+            return
+        self._show(results[self.output])
+
+    def _show(self, s):
+        self.summary.setText(f'"{s.name}": {s.samples:,} samples, mean {s.mean:.6g}, std {s.std:.6g}')
+        self.histogram.set_stackup(s)
+        nominal = 'no value' if s.nominal is None else f'{s.nominal:.6g}'
+        rows = [('Nominal', nominal), ('Mean', f'{s.mean:.6g}'), ('Std deviation', f'{s.std:.6g}'),
+                ('Minimum', f'{s.minimum:.6g}'), ('Maximum', f'{s.maximum:.6g}')]
+        rows += [(f'P{p:g}', f'{v:.6g}') for p, v in s.percentiles.items()]
+        if s.out_of_spec is not None:
+            rows.append(('Out of spec', f'{s.out_of_spec:.4%}'))
+        if s.invalid:
+            rows.append(('Failed samples', f'{s.invalid:,}'))
+        self.stats.clear()
+        self.stats.addTopLevelItems([QTreeWidgetItem(list(r)) for r in rows])
+        self.stats.resizeColumnToContents(0)
+
+    def shutdown(self):
+        self.cancel()
+        self.thread.quit()
+        self.thread.wait()
@@ -0,0 +1,223 @@
+"""Monte Carlo tolerance stack-up.
+
+Driving values get a tolerance band in cfg['tolerances'], in document
+units (mm, deg) around their nominal value::
+
+    "tolerances": {"cf thickness": {"distribution": "normal", "minus": 0.02, "plus": 0.02}}
+
+A normal band is ±3 sigma (an asymmetric band moves the mean to its
+middle), a uniform band is sampled evenly and a triangular one peaks at
+the nominal value. Derived values may have spec limits in
+cfg['spec_limits'] ({"lower": ..., "upper": ...}, either may be left out).
+
+Samples are NumPy arrays pushed through the compiled Program in one pass,
+so only names downstream of a toleranced input are evaluated per sample
+and everything else stays a cached plain value. NumPy is only needed
+here and is imported on first use.
+"""
+import math
+from collections import namedtuple
+
+from evaluation import COMPARE, DEG, RAD, EvaluationError, FloatBackend, gc_paused
+
+DISTRIBUTIONS = ('normal', 'uniform', 'triangular')
+DEFAULT_SAMPLES = 100000
+# Samples per pass; bounds the memory of the live part of the graph
+CHUNK = 25000
+# Median and the ±2 and ±3 sigma equivalents
+PERCENTILES = (0.135, 2.275, 50.0, 97.725, 99.865)
+HISTOGRAM_BINS = 40
+
+Tolerance = namedtuple('Tolerance', 'distribution minus plus')
+Stackup = namedtuple('Stackup', 'name nominal mean std minimum maximum percentiles histogram '
+                                'invalid samples lower upper out_of_spec')
+# nominal is None when the output has no value at the nominal inputs
+
+
+class ToleranceError(ValueError):
+    pass
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ToleranceError('Monte Carlo analysis needs NumPy (pip install numpy)') from None
+    return numpy
+
+
+def parse_tolerance(spec) -> Tolerance:
+    if not isinstance(spec, dict):
+        raise ToleranceError('a tolerance is an object with distribution, minus and plus')
+    distribution = spec.get('distribution', 'normal')
+    if distribution not in DISTRIBUTIONS:
+        raise ToleranceError(f'unknown distribution {distribution!r}')
+    try:
+        minus, plus = float(spec.get('minus', 0.0)), float(spec.get('plus', 0.0))
+    except (TypeError, ValueError):
+        raise ToleranceError('minus and plus must be numbers') from None
+    if minus < 0 or plus < 0 or not math.isfinite(minus + plus):
+        raise ToleranceError('minus and plus must be finite and not negative')
+    return Tolerance(distribution, minus, plus)
+
+
+def tolerances_of(cfg):
+    """Valid tolerances from a cfg; returns ({name: Tolerance}, {name: error})"""
+    tolerances, errors = {}, {}
+    for name, spec in (cfg or {}).get('tolerances', {}).items():
+        try:
+            tolerances[name] = parse_tolerance(spec)
+        except ToleranceError as e:
+            errors[name] = str(e)
+    return tolerances, errors
+
+
+def limits_of(cfg, name):
+    """(lower, upper) spec limits of name; None where not set"""
+    spec = (cfg or {}).get('spec_limits', {}).get(name) or {}
+    return spec.get('lower'), spec.get('upper')
+
+
+def draw(np, rng, tolerance, nominal, count):
+    distribution, minus, plus = tolerance
+    if minus == plus == 0:
+        return np.full(count, float(nominal))
+    if distribution == 'normal':
+        return rng.normal(nominal + (plus - minus) / 2, (plus + minus) / 6, count)
+    if distribution == 'uniform':
+        return rng.uniform(nominal - minus, nominal + plus, count)
+    return rng.triangular(nominal - minus, nominal, nominal + plus, count)
+
+
+class ArrayBackend(FloatBackend):
+    """Elementwise evaluation over NumPy arrays of samples.
+
+    Failed samples become NaN or inf instead of raising, and if() with an
+    array condition evaluates both branches and picks per sample.
+    """
+
+    def __init__(self, np):
+        self.np = np
+        self.functions = {
+            'sin': lambda x: np.sin(x * RAD),
+            'cos': lambda x: np.cos(x * RAD),
+            'tan': lambda x: np.tan(x * RAD),
+            'sec': lambda x: 1.0 / np.cos(x * RAD),
+            'cosec': lambda x: 1.0 / np.sin(x * RAD),
+            'cotan': lambda x: 1.0 / np.tan(x * RAD),
+            'arcsin': lambda x: np.arcsin(x) * DEG,
+            'arccos': lambda x: np.arccos(x) * DEG,
+            'arctan': lambda x: np.arctan(x) * DEG,
+            'arcsec': lambda x: np.arccos(1.0 / x) * DEG,
+            'arccotan': lambda x: np.arctan(1.0 / x) * DEG,
+            'abs': np.abs,
+            'exp': np.exp,
+            'log': np.log,
+            'ln': np.log,
+            'sqr': lambda x: x * x,
+            'sqrt': np.sqrt,
+            'int': np.floor,
+            'sgn': np.sign,
+            'max': np.maximum,
+            'min': np.minimum,
+        }
+
+    def _arrays(self, *args):
+        return any(isinstance(a, self.np.ndarray) for a in args)
+
+    def call(self, func, args):
+        if not self._arrays(*args):
+            return super().call(func, args)
+        return self.functions[func](*args)
+
+    def pow(self, a, b):
+        if not self._arrays(a, b):
+            return super().pow(a, b)
+        return self.np.power(a, b)
+
+    def compare(self, op, a, b):
+        if not self._arrays(a, b):
+            return super().compare(op, a, b)
+        return COMPARE[op](a, b).astype(float)
+
+    def select(self, cond, when_true, when_false):
+        if not self._arrays(cond):
+            return super().select(cond, when_true, when_false)
+        return self.np.where(cond != 0, self._branch(when_true), self._branch(when_false))
+
+    def _branch(self, thunk):
+        # A branch that fails outright only fails the samples that take it
+        try:
+            return thunk()
+        except (EvaluationError, ArithmeticError, ValueError):
+            return math.nan
+
+
+def monte_carlo(program, tolerances, outputs, samples=DEFAULT_SAMPLES, limits=None, seed=None,
+                progress=None, cancelled=None):
+    """Distributions of outputs with tolerances {name: Tolerance} applied.
+
+    limits maps output names to (lower, upper). progress(done, total) is
+    called after each chunk of samples; when cancelled() returns True the
+    run stops and None is returned. Returns {output: Stackup}; raises
+    ToleranceError if an output cannot be evaluated at all.
+    """
+    np = _numpy()
+    limits = limits or {}
+    unknown = [n for n in [*outputs, *tolerances] if n not in program.exprs]
+    if unknown:
+        raise ToleranceError(f'Unknown name "{unknown[0]}"')
+    with gc_paused():
+        scope = program.upstream(outputs)
+    driving = [n for n in tolerances if n in scope]
+    nominal, errors = program.run(names=scope)
+    for name in driving:
+        if name not in nominal:
+            raise ToleranceError(f'"{name}": {errors.get(name, "no value")}')
+
+    backend = ArrayBackend(np)
+    rng = np.random.default_rng(seed)
+    collected = {o: [] for o in outputs}
+    done = 0
+    with np.errstate(all='ignore'):
+        while done < samples:
+            if cancelled is not None and cancelled():
+                return None
+            count = min(CHUNK, samples - done)
+            overrides = {n: draw(np, rng, tolerances[n], nominal[n], count) for n in driving}
+            values, errors = program.run(backend, overrides, scope)
+            for o in outputs:
+                if o not in values:
+                    raise ToleranceError(f'"{o}": {errors.get(o, "no value")}')
+                collected[o].append(np.broadcast_to(np.asarray(values[o], dtype=float), (count,)))
+            done += count
+            if progress is not None:
+                progress(done, samples)
+
+    return {o: _summarize(np, o, nominal.get(o), np.concatenate(collected[o]), *limits.get(o, (None, None)))
+            for o in outputs}
+
+
+def _summarize(np, name, nominal, values, lower, upper):
+    finite = np.isfinite(values)
+    valid = values[finite]
+    invalid = int(values.size - valid.size)
+    out_of_spec = None
+    if lower is not None or upper is not None:
+        outside = np.zeros(valid.size, dtype=bool)
+        if lower is not None:
+            outside |= valid < lower
+        if upper is not None:
+            outside |= valid > upper
+        # Samples that could not be evaluated count as failures
+        out_of_spec = (int(outside.sum()) + invalid) / values.size
+    if not valid.size:
+        return Stackup(name, nominal, math.nan, math.nan, math.nan, math.nan, {}, ([], []),
+                       invalid, values.size, lower, upper, out_of_spec)
+    low, high = float(valid.min()), float(valid.max())
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    counts, edges = np.histogram(valid, bins=HISTOGRAM_BINS, range=(low, high))
+    percentiles = dict(zip(PERCENTILES, (float(p) for p in np.percentile(valid, PERCENTILES))))
+    return Stackup(name, nominal, float(valid.mean()), float(valid.std()), float(valid.min()), float(valid.max()),
+                   percentiles, (counts.tolist(), edges.tolist()), invalid, values.size, lower, upper, out_of_spec)
@@ -0,0 +1,150 @@
+import threading
+from pathlib import Path
+
+from completion import PrefixIndex
+from expressions import references
+from parsing import parse_equations
+
+EQUATION_GLOB = '*.txt'
+
+
+class Workspace:
+    """A directory of equation files sharing one cross-file symbol index.
+
+    Files are parsed on first access (or by index_all, typically from a
+    background thread) and re-parsed only when their mtime or size changes.
+    The index maps every variable name to the files and rows defining it and
+    to the equations referencing it, so project-wide lookups are dictionary
+    hits rather than file reads.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root).resolve()
+        self._lock = threading.RLock()
+        self._signatures = {}    # path -> (mtime_ns, size) of the parsed version
+        self._equations = {}     # path -> parsed equations
+        self._file_symbols = {}  # path -> (defined names, referenced names)
+        self._definitions = {}   # name -> {path: row}
+        self._usages = {}        # name -> {path: set of names whose expr uses it}
+        self.names = PrefixIndex()
+        self.paths = []
+        self.rescan()
+
+    def rescan(self):
+        """Pick up added and removed files; changed files re-parse lazily"""
+        found = sorted(p.resolve() for p in self.root.rglob(EQUATION_GLOB) if p.is_file())
+        with self._lock:
+            for path in set(self._equations) - set(found):
+                self._drop(path)
+            self.paths = found
+
+    def relative(self, path: Path) -> str:
+        try:
+            return str(Path(path).relative_to(self.root))
+        except ValueError:
+            return str(path)
+
+    @staticmethod
+    def _signature(path: Path):
+        st = path.stat()
+        return st.st_mtime_ns, st.st_size
+
+    def is_indexed(self, path: Path) -> bool:
+        try:
+            return self._signatures.get(path) == self._signature(path)
+        except OSError:
+            return False
+
+    def equations(self, path: Path):
+        """Parsed equations of path, reading the file only if it changed"""
+        path = Path(path).resolve()
+        with self._lock:
+            if self.is_indexed(path):
+                return self._equations[path]
+        try:
+            sig = self._signature(path)
+            text = path.read_text(encoding='utf-8')
+        except (OSError, UnicodeDecodeError):
+            with self._lock:
+                self._drop(path)
+            return []
+        eqs = parse_equations(text)
+        with self._lock:
+            self._store(path, eqs, sig)
+        return eqs
+
+    def update(self, path: Path, equations):
+        """Re-index path from in-memory equations (e.g. right after a save)"""
+        path = Path(path).resolve()
+        eqs = [{'name': e['name'], 'expr': e['expr']} for e in equations]
+        with self._lock:
+            try:
+                sig = self._signature(path)
+            except OSError:
+                sig = None
+            self._store(path, eqs, sig)
+
+    def index_all(self, progress=None, cancelled=lambda: False):
+        """Parse every file not yet indexed; progress(done, total) is optional"""
+        total = len(self.paths)
+        for i, path in enumerate(list(self.paths)):
+            if cancelled():
+                return
+            if not self.is_indexed(path):
+                self.equations(path)
+            if progress is not None:
+                progress(i + 1, total)
+
+    # ------------ Index maintenance ------------
+    def _drop(self, path):
+        defined, referenced = self._file_symbols.pop(path, ((), ()))
+        for name in defined:
+            rows = self._definitions.get(name)
+            if rows is not None:
+                rows.pop(path, None)
+                if not rows:
+                    del self._definitions[name]
+                    self.names.discard(name)
+        for name in referenced:
+            users = self._usages.get(name)
+            if users is not None:
+                users.pop(path, None)
+                if not users:
+                    del self._usages[name]
+        self._equations.pop(path, None)
+        self._signatures.pop(path, None)
+
+    def _store(self, path, eqs, sig):
+        self._drop(path)
+        defined = []
+        referenced = set()
+        for row, e in enumerate(eqs):
+            name = e['name']
+            defined.append(name)
+            rows = self._definitions.setdefault(name, {})
+            if not rows:
+                self.names.add(name)
+            rows.setdefault(path, row)
+            for ref in set(references(e['expr'])):
+                self._usages.setdefault(ref, {}).setdefault(path, set()).add(name)
+                referenced.add(ref)
+        self._equations[path] = eqs
+        self._file_symbols[path] = (defined, referenced)
+        if sig is not None:
+            self._signatures[path] = sig
+
+    # ------------ Queries ------------
+    def definitions(self, name):
+        """[(path, row)] of every indexed file defining name"""
+        with self._lock:
+            return sorted(self._definitions.get(name, {}).items())
+
+    def usages(self, name):
+        """[(path, using name)] for every indexed equation referencing name"""
+        with self._lock:
+            users = self._usages.get(name, {})
+            return sorted((path, user) for path, names in users.items() for user in names)
+
+    def find_names(self, prefix, limit=200):
+        with self._lock:
+            return self.names.complete(prefix, limit)
@@ -0,0 +1,177 @@
+from pathlib import Path
+
+from PyQt6.QtCore import QObject, QThread, Qt, pyqtSignal, pyqtSlot
+from PyQt6.QtWidgets import QLabel, QLineEdit, QListWidget, QListWidgetItem, QTreeWidget, QTreeWidgetItem, \
+    QVBoxLayout, QWidget
+
+from search_index import SearchIndex
+from workspace import Workspace
+
+PATH_ROLE = Qt.ItemDataRole.UserRole
+NAME_ROLE = Qt.ItemDataRole.UserRole + 1
+
+
+class IndexWorker(QObject):
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal()
+
+    def __init__(self, workspace, search_index=None):
+        super().__init__()
+        self.workspace = workspace
+        self.search_index = search_index
+        self.cancelled = False
+
+    @pyqtSlot()
+    def run(self):
+        self.workspace.index_all(progress=self.progress.emit, cancelled=lambda: self.cancelled)
+        if self.search_index is not None and not self.cancelled:
+            # The persistent index only re-reads files whose mtime changed
+            self.search_index.update_directory(self.workspace.root, cancelled=lambda: self.cancelled)
+        self.finished.emit()
+
+
+class WorkspacePanel(QWidget):
+    """File list and project-wide "where is this defined / used" search"""
+    fileActivated = pyqtSignal(object)             # Path
+    locationActivated = pyqtSignal(object, str)    # Path, variable name
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.workspace: Workspace | None = None
+        self.search_index: SearchIndex | None = None
+        self._thread = None
+        self._worker = None
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.status = QLabel('')
+        layout.addWidget(self.status)
+
+        self.file_list = QListWidget()
+        self.file_list.itemActivated.connect(lambda item: self.fileActivated.emit(item.data(PATH_ROLE)))
+        layout.addWidget(self.file_list, 1)
+
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText('Find variable in workspace...')
+        self.search_edit.textChanged.connect(self.search)
+        layout.addWidget(self.search_edit)
+
+        self.results = QTreeWidget()
+        self.results.setHeaderHidden(True)
+        self.results.itemActivated.connect(self._on_result_activated)
+        layout.addWidget(self.results, 2)
+
+    def set_workspace(self, workspace: Workspace):
+        self.stop_indexing()
+        if self.search_index is not None:
+            self.search_index.close()
+        self.workspace = workspace
+        self.search_index = SearchIndex.for_root(workspace.root)
+        self.file_list.clear()
+        for path in workspace.paths:
+            item = QListWidgetItem(workspace.relative(path))
+            item.setData(PATH_ROLE, path)
+            self.file_list.addItem(item)
+        self.results.clear()
+        self._start_indexing()
+
+    # ------------ Background indexing ------------
+    def _start_indexing(self):
+        self._thread = QThread(self)
+        self._worker = IndexWorker(self.workspace, self.search_index)
+        self._worker.moveToThread(self._thread)
+        self._thread.started.connect(self._worker.run)
+        self._worker.progress.connect(self._on_progress)
+        self._worker.finished.connect(self._on_indexed)
+        self._worker.finished.connect(self._thread.quit)
+        self.status.setText(f'{self.workspace.root.name}: indexing {len(self.workspace.paths)} files...')
+        self._thread.start()
+
+    def _on_progress(self, done, total):
+        self.status.setText(f'{self.workspace.root.name}: indexed {done}/{total} files')
+
+    def _on_indexed(self):
+        self.status.setText(f'{self.workspace.root.name}: {len(self.workspace.paths)} files, '
+                            f'{len(self.workspace.names)} variables')
+        if self.search_edit.text():
+            self.search(self.search_edit.text())
+
+    def stop_indexing(self):
+        if self._thread is not None:
+            self._worker.cancelled = True
+            self._thread.quit()
+            self._thread.wait()
+            self._thread = None
+
+    def close_index(self):
+        self.stop_indexing()
+        if self.search_index is not None:
+            self.search_index.close()
+            self.search_index = None
+
+    def file_saved(self, path: Path, equations):
+        self.workspace.update(path, equations)
+        if self.search_index is not None:
+            self.search_index.update([path])
+
+    def show_text_hits(self, text, limit=100):
+        """Ranked full-text hits for the main filter box across all files"""
+        if self.search_index is None or not text.strip():
+            self.search(self.search_edit.text())
+            return
+        hits = self.search_index.search(text, limit=limit)
+        self.results.clear()
+        self._add_group(f'Workspace matches for "{text.strip()}" ({len(hits)})',
+                        [(h['path'], h['name'], f"{self.workspace.relative(h['path'])} : \"{h['name']}\""
+                                                + (f"  # {h['comment']}" if h['comment'] else ''))
+                         for h in hits])
+
+    # ------------ Search ------------
+    def find(self, name):
+        """Show definitions and usages of name across the workspace"""
+        self.search_edit.blockSignals(True)
+        self.search_edit.setText(name)
+        self.search_edit.blockSignals(False)
+        self.search(name)
+
+    def search(self, text):
+        self.results.clear()
+        if self.workspace is None:
+            return
+        text = text.strip().strip('"')
+        if not text:
+            return
+        defs = self.workspace.definitions(text)
+        uses = self.workspace.usages(text)
+        if defs or uses:
+            self._add_group(f'Defined in ({len(defs)})',
+                            [(path, text, f'{self.workspace.relative(path)} : row {row + 1}') for path, row in defs])
+            self._add_group(f'Used by ({len(uses)})',
+                            [(path, user, f'{self.workspace.relative(path)} : "{user}"') for path, user in uses])
+        names = [n for n in self.workspace.find_names(text) if n != text]
+        if names:
+            group = QTreeWidgetItem([f'Matching names ({len(names)})'])
+            for n in names:
+                child = QTreeWidgetItem([n])
+                child.setData(0, NAME_ROLE, n)
+                group.addChild(child)
+            self.results.addTopLevelItem(group)
+            group.setExpanded(not (defs or uses))
+
+    def _add_group(self, title, rows):
+        group = QTreeWidgetItem([title])
+        for path, name, label in rows:
+            child = QTreeWidgetItem([label])
+            child.setData(0, PATH_ROLE, path)
+            child.setData(0, NAME_ROLE, name)
+            group.addChild(child)
+        self.results.addTopLevelItem(group)
+        group.setExpanded(True)
+
+    def _on_result_activated(self, item, column):
+        path = item.data(0, PATH_ROLE)
+        name = item.data(0, NAME_ROLE)
+        if path is not None:
+            self.locationActivated.emit(Path(path), name)
+        elif name:
+            self.find(name)